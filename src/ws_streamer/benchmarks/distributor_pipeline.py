@@ -0,0 +1,615 @@
+# -*- coding: utf-8 -*-
+
+"""
+Deribit distributor (caching_distributing_data) throughput, latency and
+allocations per channel class: ticker, chart, orders, trades, portfolio.
+
+Frames are synthetic or taken from a frame capture (--capture), parsed the
+way the receiver does and fed through queue_general. Redis is an
+in-process stand-in, SQLite a temporary database (the working directory
+is switched to a temporary folder for the run). REST lookups made at
+distributor start-up are answered locally.
+
+per class:
+    frames_per_second   bulk: N frames queued at once, time to publish all
+    p50_ms, p99_ms      one frame at a time, queue put to pipeline done
+    alloc_kb_per_frame  one frame at a time, tracemalloc peak above baseline
+    retained_blocks     memory blocks still held per frame afterwards
+
+Usage:
+    python -m ws_streamer.benchmarks.distributor_pipeline --save base.json
+    python -m ws_streamer.benchmarks.distributor_pipeline --compare base.json
+        exit code 1 when a class lost more than --threshold of its frames/s
+"""
+
+# built ins
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# installed
+import orjson
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.data_announcer.deribit import distributing_ws_data
+from ws_streamer.data_receiver.frame_capture import reading_frames
+from ws_streamer.utilities.latency_tracing import LatencyTracer, channel_class
+from ws_streamer.utilities.lazy_message import parsing_deribit_frame
+from ws_streamer.utilities.priority_lanes import PriorityLaneQueue
+
+POLL_INTERVAL = 0.0005  # seconds
+
+INSTRUMENTS = ["BTC-PERPETUAL", "ETH-PERPETUAL", "BTC-27JUN25"]
+
+CHANNEL_CLASSES = {
+    "ticker": "incremental_ticker",
+    "chart": "chart.trades",
+    "orders": "user.orders",
+    "trades": "user.trades",
+    "portfolio": "user.portfolio",
+}
+
+REDIS_CHANNELS = dict(
+    chart_low_high_tick="chart_low_high_tick",
+    portfolio="portfolio",
+    sub_account_cache_updating="sub_account_cache_updating",
+    sqlite_record_updating="sqlite_record_updating",
+    order_cache_updating="order_cache_updating",
+    my_trade_receiving="my_trade_receiving",
+    my_trades_cache_updating="my_trades_cache_updating",
+    abnormal_trading_notices="abnormal_trading_notices",
+    ticker_cache_updating="ticker_cache_updating",
+)
+
+SCHEMA = """
+CREATE TABLE my_trades_all_json (data TEXT, is_open INTEGER DEFAULT 1);
+CREATE VIEW v_trading_all_active AS
+    SELECT
+        json_extract(data, '$.instrument_name') AS instrument_name,
+        json_extract(data, '$.label') AS label,
+        json_extract(data, '$.amount') AS amount,
+        json_extract(data, '$.price') AS price,
+        json_extract(data, '$.trade_id') AS trade_id,
+        json_extract(data, '$.order_id') AS order_id,
+        data
+    FROM my_trades_all_json
+    WHERE is_open = 1;
+CREATE TABLE ohlc1_btc_perp_json (data TEXT, open_interest REAL, tick INTEGER);
+CREATE TABLE ohlc1_eth_perp_json (data TEXT, open_interest REAL, tick INTEGER);
+"""
+
+
+class FakePipeline:
+    """redis.asyncio pipeline stand-in: commands are only counted"""
+
+    def __init__(self, client_redis: object):
+        self.client_redis = client_redis
+        self.command_stack = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def publish(self, channel: str, message: bytes):
+        self.command_stack.append((channel, message))
+        return self
+
+    async def hset(self, keys: str, channel: str, message: bytes):
+        self.command_stack.append((keys, message))
+        return self
+
+    async def execute(self) -> list:
+
+        self.client_redis.published += len(self.command_stack)
+        self.client_redis.published_bytes += sum(len(o[1]) for o in self.command_stack)
+
+        result, self.command_stack = [1] * len(self.command_stack), []
+
+        return result
+
+
+class FakePubSub:
+
+    async def subscribe(self, *channels):
+        return None
+
+
+class FakeRedis:
+    """in-process Redis stand-in"""
+
+    def __init__(self):
+        self.published = 0
+        self.published_bytes = 0
+
+    def pubsub(self):
+        return FakePubSub()
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    async def publish(self, channel: str, message: bytes):
+        self.published += 1
+        self.published_bytes += len(message)
+        return 1
+
+    async def hset(self, keys: str, channel: str, message: bytes):
+        return 1
+
+
+def preparing_database(folder: str) -> None:
+    """temporary databases/trading.sqlite3 with what the handlers query"""
+
+    os.makedirs(os.path.join(folder, "databases"), exist_ok=True)
+
+    conn = sqlite3.connect(os.path.join(folder, "databases", "trading.sqlite3"))
+
+    conn.executescript(SCHEMA)
+
+    for i in range(20):
+        conn.execute(
+            "INSERT INTO my_trades_all_json (data) VALUES (?)",
+            (
+                orjson.dumps(
+                    dict(
+                        instrument_name="BTC-PERPETUAL",
+                        label=f"hedgingSpot-open-{i}",
+                        amount=10.0,
+                        price=101650.5,
+                        trade_id=f"BTC-{i}",
+                        order_id=f"BTC-ORDER-{i}",
+                    )
+                ).decode(),
+            ),
+        )
+
+    for currency in ("btc", "eth"):
+        conn.execute(
+            f"INSERT INTO ohlc1_{currency}_perp_json (data, open_interest, tick)"
+            " VALUES (?, 0, ?)",
+            (orjson.dumps(dict(tick=1738407480000)).decode(), 1738407480000),
+        )
+
+    conn.commit()
+    conn.close()
+
+
+def building_ticker(instrument_name: str) -> dict:
+    """ """
+
+    return dict(
+        timestamp=1738407481107,
+        state="open",
+        stats=dict(high=106245.0, low=101550.0, volume=107.12364526),
+        index_price=101645.32,
+        instrument_name=instrument_name,
+        last_price=101787.5,
+        open_interest=18836380,
+        mark_price=101781.52,
+        best_ask_price=101780.0,
+        best_bid_price=101775.0,
+        estimated_delivery_price=101645.32,
+        best_ask_amount=15500.0,
+        best_bid_amount=11310.0,
+    )
+
+
+def building_params(
+    bench_class: str,
+    i: int,
+) -> dict:
+    """one synthetic subscription params payload"""
+
+    instrument_name = INSTRUMENTS[i % len(INSTRUMENTS)]
+
+    if bench_class == "ticker":
+        return dict(
+            channel=f"incremental_ticker.{instrument_name}",
+            data=dict(
+                timestamp=1738407481107 + i,
+                instrument_name=instrument_name,
+                best_bid_price=101775.0 + i % 7,
+                best_ask_price=101780.0 + i % 7,
+                mark_price=101781.52,
+                open_interest=18836380 + i,
+                stats=dict(volume=107.12364526 + i),
+            ),
+        )
+
+    if bench_class == "chart":
+        return dict(
+            channel=f"chart.trades.{INSTRUMENTS[i % 2]}.1",
+            data=dict(
+                tick=1738407480000 + 60000 * i,
+                open=101650.5,
+                high=101700.0,
+                low=101600.0,
+                close=101650.5,
+                volume=1.5,
+                cost=152475.0,
+            ),
+        )
+
+    order = dict(
+        order_id=f"BTC-ORDER-{i % 50}",
+        order_state="open" if i % 3 else "filled",
+        instrument_name="BTC-PERPETUAL",
+        label=f"hedgingSpot-open-{i % 50}",
+        price=101650.5,
+        amount=10.0,
+        direction="sell",
+        timestamp=1738407481107 + i,
+    )
+
+    if bench_class == "orders":
+        return dict(channel="user.orders.any.any.raw", data=order)
+
+    if bench_class == "trades":
+        return dict(
+            channel="user.trades.any.any.raw",
+            data=[
+                dict(
+                    order,
+                    trade_id=f"BTC-{i}",
+                    state="filled",
+                    fee=0.0,
+                )
+            ],
+        )
+
+    currency = "btc" if i % 2 else "eth"
+
+    return dict(
+        channel=f"user.portfolio.{currency}",
+        data=dict(
+            currency=currency.upper(),
+            balance=0.00214241,
+            equity=0.00213253 + i * 1e-8,
+            margin_balance=0.00269254,
+            delta_total=0.002373,
+            total_pl=-1.442e-05,
+        ),
+    )
+
+
+def building_frames(
+    bench_class: str,
+    count: int,
+    capture_path: str = None,
+) -> list:
+    """
+    encoded frames: from the capture when given (frames of this class,
+    cycled up to count), synthetic otherwise
+    """
+
+    if capture_path:
+
+        prefix = CHANNEL_CLASSES[bench_class]
+
+        captured = []
+
+        for _, frame in reading_frames(capture_path):
+
+            message = parsing_deribit_frame(frame)
+
+            channel = getattr(message, "channel", None)
+
+            if channel and channel_class(channel) == prefix:
+                captured.append(frame)
+
+        if captured:
+            return [captured[i % len(captured)] for i in range(count)]
+
+        log.warning(f"no {bench_class} frames in capture, using synthetic ones")
+
+    return [
+        orjson.dumps(
+            dict(
+                jsonrpc="2.0",
+                method="subscription",
+                params=building_params(bench_class, i),
+            )
+        )
+        for i in range(count)
+    ]
+
+
+def preparing_messages(frames: list) -> list:
+    """what the receiver queues"""
+
+    messages = []
+
+    for frame in frames:
+
+        message_params = parsing_deribit_frame(frame)
+
+        message_params["exchange"] = "deribit"
+        message_params["account_id"] = "benchmark"
+
+        messages.append(message_params)
+
+    return messages
+
+
+def processed_count(
+    latency_tracer: LatencyTracer,
+    bench_class: str,
+) -> int:
+    """ """
+
+    histogram = latency_tracer.histograms.get(
+        (CHANNEL_CLASSES[bench_class], "in_process")
+    )
+
+    return histogram.count if histogram else 0
+
+
+async def waiting_processed(
+    latency_tracer: LatencyTracer,
+    bench_class: str,
+    target: int,
+    timeout: float = 60,
+) -> None:
+    """ """
+
+    deadline = time.monotonic() + timeout
+
+    while processed_count(latency_tracer, bench_class) < target:
+
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{bench_class}: distributor stopped processing")
+
+        # short naps: spinning would compete with the aiosqlite threads
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def measuring_class(
+    bench_class: str,
+    frames: int,
+    single_frames: int,
+    capture_path: str = None,
+) -> dict:
+    """ """
+
+    client_redis = FakeRedis()
+
+    queue_general = PriorityLaneQueue(
+        {lane: frames * 2 for lane in ("private", "market", "ticker")}
+    )
+
+    latency_tracer = LatencyTracer(export_interval=sys.maxsize)
+
+    distributor = asyncio.create_task(
+        distributing_ws_data.caching_distributing_data(
+            client_redis,
+            ["BTC", "ETH"],
+            dict(params=dict(data=dict(orders_cached=[], positions_cached=[]))),
+            REDIS_CHANNELS,
+            {},
+            [dict(settlement_period=["perpetual"])],
+            queue_general,
+            latency_tracer,
+        )
+    )
+
+    encoded = building_frames(bench_class, frames, capture_path)
+
+    try:
+
+        # warm up: caches, sqlite connections, code paths
+        warm_up = preparing_messages(encoded[:50])
+
+        for message_params in warm_up:
+            message_params["received_at"] = time.monotonic_ns()
+
+        await queue_general.put_batch(warm_up)
+        await waiting_processed(latency_tracer, bench_class, len(warm_up))
+
+        # throughput: everything queued at once, batches as in production
+        messages = preparing_messages(encoded)
+
+        done_before = processed_count(latency_tracer, bench_class)
+
+        started = time.perf_counter()
+
+        for message_params in messages:
+            message_params["received_at"] = time.monotonic_ns()
+
+        await queue_general.put_batch(messages)
+        await waiting_processed(latency_tracer, bench_class, done_before + frames)
+
+        elapsed = time.perf_counter() - started
+
+        # latency: one frame at a time, no queueing behind others
+        latency_tracer.snapshot()
+
+        for message_params in preparing_messages(encoded[:single_frames]):
+
+            message_params["received_at"] = time.monotonic_ns()
+
+            target = processed_count(latency_tracer, bench_class) + 1
+
+            await queue_general.put(message_params)
+            await waiting_processed(latency_tracer, bench_class, target)
+
+        in_process = latency_tracer.histograms[
+            (CHANNEL_CLASSES[bench_class], "in_process")
+        ].summary()
+
+        # allocations: tracemalloc peak per frame, blocks kept afterwards
+        tracemalloc.start()
+
+        peaks = 0
+
+        blocks_before = sys.getallocatedblocks()
+
+        for message_params in preparing_messages(encoded[:single_frames]):
+
+            tracemalloc.reset_peak()
+
+            baseline, _ = tracemalloc.get_traced_memory()
+
+            message_params["received_at"] = time.monotonic_ns()
+
+            target = processed_count(latency_tracer, bench_class) + 1
+
+            await queue_general.put(message_params)
+            await waiting_processed(latency_tracer, bench_class, target)
+
+            peaks += tracemalloc.get_traced_memory()[1] - baseline
+
+        retained_blocks = (sys.getallocatedblocks() - blocks_before) / single_frames
+
+        tracemalloc.stop()
+
+    finally:
+        distributor.cancel()
+
+    return dict(
+        frames=frames,
+        frames_per_second=frames / elapsed if elapsed else 0,
+        p50_ms=in_process["p50_ms"],
+        p99_ms=in_process["p99_ms"],
+        alloc_kb_per_frame=peaks / single_frames / 1024,
+        retained_blocks=retained_blocks,
+        published=client_redis.published,
+    )
+
+
+async def benchmarking(
+    classes: list,
+    frames: int,
+    single_frames: int,
+    capture_path: str = None,
+) -> dict:
+    """ """
+
+    return {
+        bench_class: await measuring_class(
+            bench_class,
+            frames,
+            single_frames,
+            capture_path,
+        )
+        for bench_class in classes
+    }
+
+
+def comparing(
+    results: dict,
+    baseline: dict,
+    threshold: float,
+) -> list:
+    """classes whose throughput dropped more than threshold (0.1 = 10%)"""
+
+    regressions = []
+
+    for bench_class, result in results.items():
+
+        before = baseline.get(bench_class)
+
+        if not before or not before["frames_per_second"]:
+            continue
+
+        change = result["frames_per_second"] / before["frames_per_second"] - 1
+
+        if change < -threshold:
+            regressions.append((bench_class, change))
+
+    return regressions
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--classes", nargs="+", default=list(CHANNEL_CLASSES), choices=CHANNEL_CLASSES
+    )
+    parser.add_argument("--frames", type=int, default=20_000)
+    parser.add_argument("--single-frames", type=int, default=1_000)
+    parser.add_argument("--capture", default=None, help="frame capture path")
+    parser.add_argument("--save", default=None, help="write results as JSON")
+    parser.add_argument("--compare", default=None, help="baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    # handlers log whole payloads: keep that out of the measurement
+    log.remove()
+
+    capture_path = os.path.abspath(args.capture) if args.capture else None
+    save_path = os.path.abspath(args.save) if args.save else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as folder:
+
+        preparing_database(folder)
+
+        # the handlers use relative paths (databases/, pickles)
+        os.chdir(folder)
+
+        # start-up lookups answered locally
+        async def get_futures_instruments(currencies, settlement_periods) -> dict:
+            return dict(instruments_name=INSTRUMENTS)
+
+        distributing_ws_data.get_instrument_summary.get_futures_instruments = (
+            get_futures_instruments
+        )
+        async def combining_ticker_data(instruments_name) -> list:
+            return [building_ticker(o) for o in instruments_name]
+
+        distributing_ws_data.combining_ticker_data = combining_ticker_data
+
+        try:
+            results = asyncio.run(
+                benchmarking(
+                    args.classes,
+                    args.frames,
+                    args.single_frames,
+                    capture_path,
+                )
+            )
+
+        finally:
+            os.chdir(cwd)
+
+    print(
+        f"{'class':>10} {'frames/s':>10} {'p50 ms':>8} {'p99 ms':>8}"
+        f" {'alloc kB':>9} {'kept blk':>9}"
+    )
+
+    for bench_class, result in results.items():
+        print(
+            f"{bench_class:>10} {result['frames_per_second']:>10.0f}"
+            f" {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f}"
+            f" {result['alloc_kb_per_frame']:>9.2f} {result['retained_blocks']:>9.2f}"
+        )
+
+    if save_path:
+        with open(save_path, "wb") as handle:
+            handle.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+
+    if compare_path:
+
+        with open(compare_path, "rb") as handle:
+            baseline = orjson.loads(handle.read())
+
+        regressions = comparing(results, baseline, args.threshold)
+
+        for bench_class, change in regressions:
+            print(f"REGRESSION {bench_class}: frames/s {change:+.1%}")
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-frame overhead of the WebSocket receive loop: one frame at a time
+(the original ws_manager path) against the batched path.
+
+A local stand-in server, in its own process, pushes synthetic Deribit
+subscription frames at a fixed rate. The client process only receives,
+decodes and queues, so its CPU time divided by the frames received is the
+per-frame cost of the receive path.
+
+Usage:
+    python -m ws_streamer.benchmarks.receive_loop --rates 10000 50000 100000
+"""
+
+# built ins
+import argparse
+import asyncio
+import multiprocessing
+import random
+import time
+
+# installed
+import orjson
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+
+# user defined formula
+from ws_streamer.data_receiver.frame_batching import decoding_frames, draining_frames
+from ws_streamer.utilities.priority_lanes import (
+    PriorityLaneQueue,
+    getting_batch,
+    putting_batch,
+)
+
+HOST = "127.0.0.1"
+PORT = 8765
+TICK_SECONDS = 0.001
+
+
+def building_frames(count: int = 1000) -> list:
+    """
+    a pool of encoded frames, mixed like production traffic:
+    mostly tickers, some candles, a few private events
+    """
+
+    frames = []
+
+    for i in range(count):
+
+        draw = random.random()
+
+        if draw < 0.70:
+            instrument = random.choice(
+                ["BTC-PERPETUAL", "ETH-PERPETUAL", "BTC-27JUN25"]
+            )
+            params = dict(
+                channel=f"incremental_ticker.{instrument}",
+                data=dict(
+                    timestamp=1738407481107 + i,
+                    instrument_name=instrument,
+                    best_bid_price=101775.0,
+                    best_ask_price=101780.0,
+                    mark_price=101781.52,
+                    stats=dict(volume=107.12364526),
+                ),
+            )
+
+        elif draw < 0.95:
+            params = dict(
+                channel="chart.trades.BTC-PERPETUAL.1",
+                data=dict(
+                    tick=1738407480000,
+                    open=101650.5,
+                    high=101650.5,
+                    low=101650.5,
+                    close=101650.5,
+                    volume=0.0,
+                    cost=0.0,
+                ),
+            )
+
+        else:
+            params = dict(
+                channel="user.orders.any.any.raw",
+                data=dict(
+                    order_id=f"ETH-{i}",
+                    order_state="open",
+                    instrument_name="ETH-PERPETUAL",
+                    price=1870.05,
+                    amount=1.0,
+                ),
+            )
+
+        frames.append(
+            orjson.dumps(dict(jsonrpc="2.0", method="subscription", params=params))
+        )
+
+    return frames
+
+
+def running_server(
+    rate: int,
+    seconds: float,
+    ready: object,
+) -> None:
+    """stand-in exchange, runs in its own process"""
+
+    frames = building_frames()
+
+    async def sending(websocket) -> None:
+
+        per_tick = max(1, int(rate * TICK_SECONDS))
+
+        started = time.monotonic()
+
+        sent = 0
+
+        while time.monotonic() - started < seconds:
+
+            for _ in range(per_tick):
+                await websocket.send(frames[sent % len(frames)], text=True)
+                sent += 1
+
+            due = started + (sent / rate)
+
+            await asyncio.sleep(max(0, due - time.monotonic()))
+
+        await websocket.close()
+
+    async def main() -> None:
+
+        async with serve(sending, HOST, PORT, compression=None):
+            ready.set()
+            await asyncio.sleep(seconds + 30)
+
+    asyncio.run(main())
+
+
+async def receiving_single(
+    websocket_client: object,
+    queue_general: object,
+    counter: dict,
+) -> None:
+    """the original ws_manager loop: one frame per pass"""
+
+    while True:
+
+        message: bytes = await websocket_client.recv()
+        message: dict = orjson.loads(message)
+
+        counter["received"] += 1
+
+        if "id" in list(message):
+            continue
+
+        elif "method" in list(message):
+            if message["method"] == "heartbeat":
+                continue
+
+        if "params" in list(message):
+
+            if message["method"] != "heartbeat":
+
+                message_params: dict = message["params"]
+
+                if message_params:
+
+                    message_params.update({"exchange": "deribit"})
+                    message_params.update({"account_id": "benchmark"})
+
+                    await queue_general.put(message_params)
+
+
+async def receiving_batched(
+    websocket_client: object,
+    queue_general: object,
+    counter: dict,
+) -> None:
+    """drain what is buffered, decode once, queue once"""
+
+    while True:
+
+        frames = await draining_frames(websocket_client)
+
+        counter["received"] += len(frames)
+
+        message_batch = []
+
+        for message in decoding_frames(frames):
+
+            message_params = message.get("params", None)
+
+            if message_params:
+                message_params["exchange"] = "deribit"
+                message_params["account_id"] = "benchmark"
+                message_batch.append(message_params)
+
+        await putting_batch(queue_general, message_batch)
+
+
+async def consuming(queue_general: object) -> None:
+    """stands in for the dispatcher"""
+
+    while True:
+        await getting_batch(queue_general)
+
+
+async def measuring(mode: str) -> dict:
+    """ """
+
+    queue_general = PriorityLaneQueue()
+
+    consumer = asyncio.create_task(consuming(queue_general))
+
+    receiver = receiving_batched if mode == "batched" else receiving_single
+
+    counter = dict(received=0)
+
+    async with connect(
+        f"ws://{HOST}:{PORT}",
+        ping_interval=None,
+        compression=None,
+    ) as websocket_client:
+
+        cpu_started = time.process_time()
+        wall_started = time.monotonic()
+
+        try:
+            await receiver(websocket_client, queue_general, counter)
+
+        except Exception:
+            # the server closes the connection when done
+            pass
+
+        cpu_used = time.process_time() - cpu_started
+        wall_used = time.monotonic() - wall_started
+
+    consumer.cancel()
+
+    received = counter["received"]
+
+    return dict(
+        mode=mode,
+        frames=received,
+        frames_per_second=received / wall_used if wall_used else 0,
+        us_per_frame=(cpu_used / received * 1_000_000) if received else 0,
+    )
+
+
+def benchmarking(
+    rate: int,
+    seconds: float,
+    mode: str,
+) -> dict:
+    """ """
+
+    ready = multiprocessing.Event()
+
+    server = multiprocessing.Process(
+        target=running_server,
+        args=(rate, seconds, ready),
+        daemon=True,
+    )
+
+    server.start()
+
+    ready.wait(10)
+
+    try:
+        result = asyncio.run(measuring(mode))
+
+    finally:
+        server.terminate()
+        server.join()
+
+    result.update({"target_rate": rate})
+
+    return result
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--rates", type=int, nargs="+", default=[10_000, 50_000, 100_000]
+    )
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'target/s':>10} {'mode':>8} {'frames':>9} {'achieved/s':>11} {'us/frame':>9}"
+    )
+
+    for rate in args.rates:
+
+        for mode in ("single", "batched"):
+
+            result = benchmarking(rate, args.seconds, mode)
+
+            print(
+                f"{result['target_rate']:>10} {result['mode']:>8}"
+                f" {result['frames']:>9} {result['frames_per_second']:>11.0f}"
+                f" {result['us_per_frame']:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+"""
+SendApiRequest.send_order latency against a local TLS stand-in of the
+Deribit REST API: a new aiohttp session per request (the former
+private_connection) versus the shared keep-alive session pool.
+
+The stand-in is an HTTP/1.1 keep-alive server on 127.0.0.1 with a
+throwaway self-signed certificate (openssl CLI), answering every
+JSON-RPC call with a filled order after --server-delay ms.
+
+per variant:
+    p50_ms, p90_ms, p99_ms, mean_ms   sequential send_order calls
+    connections                       TLS connections the server accepted
+
+Usage:
+    python -m ws_streamer.benchmarks.rest_session_pool --orders 500
+"""
+
+# built ins
+import argparse
+import asyncio
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+from typing import Dict
+
+# installed
+import aiohttp
+import orjson
+from aiohttp.helpers import BasicAuth
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.restful_api import session_pool
+from ws_streamer.restful_api.deribit import api_requests
+from ws_streamer.utilities import string_modification as str_mod
+
+WARM_UP_ORDERS = 20
+
+
+def creating_certificate(folder: str) -> tuple:
+    """self-signed localhost certificate, (cert_path, key_path)"""
+
+    cert_path = os.path.join(folder, "cert.pem")
+    key_path = os.path.join(folder, "key.pem")
+
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-days",
+            "1",
+            "-subj",
+            "/CN=localhost",
+            "-addext",
+            "subjectAltName=DNS:localhost,IP:127.0.0.1",
+            "-keyout",
+            key_path,
+            "-out",
+            cert_path,
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+    return cert_path, key_path
+
+
+class DeribitStandIn:
+    """ """
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.connections = 0
+
+    def answering(self, request: dict) -> bytes:
+        """ """
+
+        params = request.get("params") or {}
+
+        order = dict(
+            order_id=f"ETH-{64159311162 + self.connections}",
+            order_state="filled",
+            instrument_name=params.get("instrument_name"),
+            amount=params.get("amount"),
+            price=params.get("price"),
+            label=params.get("label"),
+            direction=request.get("method", "").rpartition("/")[2],
+        )
+
+        return orjson.dumps(
+            dict(
+                jsonrpc="2.0",
+                id=request.get("id"),
+                result=dict(order=order, trades=[]),
+            )
+        )
+
+    async def handling_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """keep-alive: requests are served until the client closes"""
+
+        self.connections += 1
+
+        try:
+            while True:
+
+                request_line = await reader.readline()
+
+                if not request_line:
+                    break
+
+                content_length = 0
+
+                while True:
+
+                    line = await reader.readline()
+
+                    if not line.strip():
+                        break
+
+                    name, _, value = line.decode().partition(":")
+
+                    if name.strip().lower() == "content-length":
+                        content_length = int(value)
+
+                body = await reader.readexactly(content_length)
+
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+
+                response = self.answering(orjson.loads(body) if body else {})
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(response)).encode() + b"\r\n"
+                    b"\r\n" + response
+                )
+
+                await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            pass
+
+        finally:
+            writer.close()
+
+
+def legacy_private_connection(client_ssl: ssl.SSLContext) -> callable:
+    """the former private_connection: one session per request"""
+
+    async def private_connection(
+        endpoint: str,
+        client_id: str,
+        client_secret: str,
+        connection_url: str = None,
+        params: str = {},
+    ) -> None:
+
+        connection_url = connection_url or api_requests.DERIBIT_URL
+
+        id = str_mod.id_numbering(
+            endpoint,
+            endpoint,
+        )
+
+        payload: Dict = {
+            "jsonrpc": "2.0",
+            "id": id,
+            "method": f"{endpoint}",
+            "params": params,
+        }
+
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(ssl=client_ssl)
+        ) as session:
+            async with session.post(
+                connection_url + endpoint,
+                auth=BasicAuth(client_id, client_secret),
+                json=payload,
+            ) as response:
+
+                return await response.json()
+
+    return private_connection
+
+
+def percentile(
+    values: list,
+    fraction: float,
+) -> float:
+
+    ordered = sorted(values)
+
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def measuring_send_order(
+    stand_in: DeribitStandIn,
+    orders: int,
+) -> dict:
+    """ """
+
+    private_data = api_requests.SendApiRequest("sub_account", "client", "secret")
+
+    for _ in range(WARM_UP_ORDERS):
+        await private_data.send_order("buy", "ETH-PERPETUAL", 1, "bench", 1870.05)
+
+    stand_in.connections = 0
+
+    durations = []
+
+    for i in range(orders):
+
+        started = time.perf_counter()
+
+        result = await private_data.send_order(
+            "sell" if i % 2 else "buy",
+            "ETH-PERPETUAL",
+            1,
+            f"bench-{i}",
+            1870.05,
+        )
+
+        durations.append((time.perf_counter() - started) * 1000)
+
+        assert result["result"]["order"]["order_state"] == "filled", result
+
+    return dict(
+        p50_ms=percentile(durations, 0.50),
+        p90_ms=percentile(durations, 0.90),
+        p99_ms=percentile(durations, 0.99),
+        mean_ms=sum(durations) / len(durations),
+        connections=stand_in.connections,
+    )
+
+
+async def benchmarking(
+    cert_path: str,
+    key_path: str,
+    orders: int,
+    server_delay: float,
+) -> dict:
+    """ """
+
+    server_ssl = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_ssl.load_cert_chain(cert_path, key_path)
+
+    client_ssl = ssl.create_default_context(cafile=cert_path)
+
+    stand_in = DeribitStandIn(server_delay)
+
+    server = await asyncio.start_server(
+        stand_in.handling_connection, "127.0.0.1", 0, ssl=server_ssl
+    )
+
+    port = server.sockets[0].getsockname()[1]
+
+    api_requests.DERIBIT_URL = f"https://localhost:{port}/api/v2/"
+
+    pooled_connection = api_requests.private_connection
+
+    results = {}
+
+    try:
+        api_requests.private_connection = legacy_private_connection(client_ssl)
+
+        results["session_per_request"] = await measuring_send_order(
+            stand_in, orders
+        )
+
+        api_requests.private_connection = pooled_connection
+
+        session_pool.SESSION_POOL = session_pool.SessionPool(ssl=client_ssl)
+
+        results["session_pool"] = await measuring_send_order(stand_in, orders)
+
+    finally:
+        api_requests.private_connection = pooled_connection
+
+        await session_pool.closing_sessions()
+
+        server.close()
+        await server.wait_closed()
+
+    return results
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument(
+        "--server-delay", type=float, default=0, help="ms before each answer"
+    )
+    args = parser.parse_args()
+
+    log.remove()
+
+    with tempfile.TemporaryDirectory() as folder:
+
+        cert_path, key_path = creating_certificate(folder)
+
+        results = asyncio.run(
+            benchmarking(cert_path, key_path, args.orders, args.server_delay / 1000)
+        )
+
+    print(
+        f"{'variant':>20} {'p50_ms':>8} {'p90_ms':>8} {'p99_ms':>8}"
+        f" {'mean_ms':>8} {'connections':>12}"
+    )
+
+    for variant, result in results.items():
+        print(
+            f"{variant:>20} {result['p50_ms']:>8.2f} {result['p90_ms']:>8.2f}"
+            f" {result['p99_ms']:>8.2f} {result['mean_ms']:>8.2f}"
+            f" {result['connections']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,562 @@
+# -*- coding: utf-8 -*-
+
+"""
+ns/op and allocations of the utilities called per message or per order,
+with the former implementations kept here for comparison.
+
+Every case first checks that the current implementation returns what the
+legacy one did (for the cache updaters: leaves the cache in the same
+state) on the same realistic inputs, then times both.
+
+    ns/op        best of --repeat runs of --number calls
+    peak B/op    tracemalloc peak above baseline, mean over 200 calls
+
+Usage:
+    python -m ws_streamer.benchmarks.utilities_hot_path
+"""
+
+# built ins
+import argparse
+import ast
+import copy
+import time
+import tracemalloc
+
+# installed
+import orjson
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.utilities import (
+    caching,
+    string_modification as str_mod,
+    time_modification as time_mod,
+)
+
+ALLOCATION_CALLS = 200
+
+
+# legacy implementations ------------------------------------------------------
+
+
+def legacy_extract_currency_from_text(words: str) -> str:
+    """ """
+
+    if "." in words:
+        filter1 = (words.partition(".")[2]).lower()
+
+        if "." in filter1:
+            filter1 = (filter1.partition(".")[2]).lower()
+
+            if "chart.trades" in words:
+                filter1 = (words.partition(".")[2]).lower()
+
+            if "." in filter1:
+                filter1 = (filter1.partition(".")[2]).lower()
+
+                if "." in filter1:
+                    filter1 = (filter1.partition(".")[0]).lower()
+
+    else:
+        filter1 = (words.partition(".")[0]).lower()
+
+    return (filter1.partition("-")[0]).lower()
+
+
+def legacy_id_numbering(
+    operation: str,
+    ws_channel: str,
+) -> str:
+    """ """
+
+    id_auth = 1
+    if "user" in ws_channel:
+        id_auth = 9
+
+    id_method = 0
+    if "subscribe" in operation:
+        id_method = 3
+    if "get" in operation:
+        id_method = 4
+    id_item = 0
+    if "book" in ws_channel:
+        id_item = 1
+    if "user" in ws_channel:
+        id_item = 2
+    if "chart" in ws_channel:
+        id_item = 3
+    if "index" in ws_channel:
+        id_item = 4
+    if "order" in ws_channel:
+        id_item = 5
+    if "position" in ws_channel:
+        id_item = 6
+    id_instrument = 0
+    if "BTC" or "btc" in ws_channel:
+        id_instrument = 1
+    if "ETH" or "eth" in ws_channel:
+        id_instrument = 2
+    return int(f"{id_auth}{id_method}{id_item}{id_instrument}")
+
+
+def legacy_remove_apostrophes_from_json(json_load: list) -> int:
+    """ """
+
+    return [ast.literal_eval(str(i)) for i in json_load]
+
+
+def legacy_get_now_unix_time() -> int:
+    """ """
+
+    now_utc = time_mod.convert_time_to_utc()["utc_now"]
+
+    return int(time_mod.convert_time_to_unix(now_utc))
+
+
+def legacy_update_cached_orders(
+    orders_all: list,
+    sub_account_data: dict,
+    source: str = "ws",
+):
+    """ """
+
+    if source == "ws":
+
+        try:
+
+            orders = sub_account_data["orders"]
+
+            trades = sub_account_data["trades"]
+
+            if orders:
+
+                if trades:
+
+                    for trade in trades:
+
+                        order_id = trade["order_id"]
+
+                        selected_order = [
+                            o for o in orders_all if order_id in o["order_id"]
+                        ]
+
+                        if selected_order:
+
+                            orders_all.remove(selected_order[0])
+
+                if orders:
+
+                    for order in orders:
+
+                        order_state = order["order_state"]
+
+                        if order_state == "cancelled" or order_state == "filled":
+
+                            order_id = order["order_id"]
+
+                            selected_order = [
+                                o for o in orders_all if order_id in o["order_id"]
+                            ]
+
+                            if selected_order:
+
+                                orders_all.remove(selected_order[0])
+
+                        else:
+
+                            orders_all.append(order)
+        except:
+
+            log.debug(sub_account_data)
+            try:
+                order = sub_account_data[0]
+
+            except:
+                order = sub_account_data
+
+            try:
+                order_state = order["order_state"]
+            except:
+                order_state = order["state"]
+
+            if order_state == "cancelled" or order_state == "filled":
+
+                order_id = order["order_id"]
+
+                selected_order = [o for o in orders_all if order_id in o["order_id"]]
+
+                if selected_order:
+
+                    orders_all.remove(selected_order[0])
+
+            else:
+
+                orders_all.append(order)
+
+
+def legacy_positions_updating_cached(
+    positions_cached: list,
+    sub_account_data: list,
+    source: str = "ws",
+):
+    """ """
+
+    if source == "ws":
+        positions = sub_account_data["positions"]
+
+    if source == "rest":
+
+        positions = sub_account_data
+
+    if positions:
+
+        for position in positions:
+
+            position_instrument_name = position["instrument_name"]
+
+            selected_position = [
+                o
+                for o in positions_cached
+                if position_instrument_name in o["instrument_name"]
+            ]
+
+            if selected_position:
+
+                positions_cached.remove(selected_position[0])
+
+            positions_cached.append(position)
+
+
+# realistic inputs -------------------------------------------------------------
+
+
+CHANNELS = [
+    "incremental_ticker.BTC-PERPETUAL",
+    "incremental_ticker.ETH-27JUN25",
+    "chart.trades.BTC-PERPETUAL.1",
+    "chart.trades.ETH-PERPETUAL.60",
+    "user.portfolio.btc",
+    "user.orders.any.any.raw",
+    "user.trades.any.any.raw",
+    "user.changes.future.any.raw",
+    "BTC-PERPETUAL",
+]
+
+ENDPOINTS = [
+    ("private/get_open_orders_by_currency", "private/get_open_orders_by_currency"),
+    ("subscribe", "user.orders.any.any.raw"),
+    ("get", "chart.trades.BTC-PERPETUAL.1"),
+    ("private/get_subaccounts_details", "private/get_subaccounts_details"),
+    # ws_operation subscribes a whole channel list at once
+    ("subscribe", ["user.orders.any.any.raw", "user.trades.any.any.raw"]),
+    ("unsubscribe", ["incremental_ticker.BTC-25OCT26", "chart.trades.BTC-PERPETUAL.1"]),
+]
+
+
+def building_order(
+    i: int,
+    state: str = "open",
+) -> dict:
+    """ """
+
+    return dict(
+        order_id=f"ETH-{64159311162 + i}",
+        order_state=state,
+        instrument_name="ETH-PERPETUAL",
+        label=f"customShort-open-{1743595398537 + i}",
+        price=1870.05,
+        amount=1.0,
+        direction="sell",
+        timestamp=1743595416236,
+    )
+
+
+def building_orders_cached(count: int = 40) -> list:
+    return [building_order(i) for i in range(count)]
+
+
+def building_positions_cached() -> list:
+    return [
+        dict(instrument_name=o, size=10.0 * i, average_price=101650.5)
+        for i, o in enumerate(
+            [
+                "BTC-PERPETUAL",
+                "ETH-PERPETUAL",
+                "BTC-27JUN25",
+                "ETH-27JUN25",
+                "BTC-26SEP25",
+                "ETH-26SEP25",
+            ]
+        )
+    ]
+
+
+SQLITE_ROWS = [
+    orjson.dumps(
+        dict(
+            tick=1738407480000 + 60000 * i,
+            open=101650.5,
+            high=101700.0,
+            low=101600.0,
+            close=101650.5,
+            volume=1.5,
+            cost=152475.0,
+        )
+    ).decode()
+    for i in range(5)
+]
+
+
+# cases ------------------------------------------------------------------------
+
+
+def case_extract_currency() -> tuple:
+    """ """
+
+    def running(implementation):
+        return [implementation(o) for o in CHANNELS]
+
+    return (
+        lambda: running(legacy_extract_currency_from_text),
+        lambda: running(str_mod.extract_currency_from_text),
+        len(CHANNELS),
+    )
+
+
+def case_id_numbering() -> tuple:
+    """ """
+
+    def running(implementation):
+        return [implementation(*o) for o in ENDPOINTS]
+
+    return (
+        lambda: running(legacy_id_numbering),
+        lambda: running(str_mod.id_numbering),
+        len(ENDPOINTS),
+    )
+
+
+def case_remove_redundant_elements() -> tuple:
+    """ """
+
+    data = [building_order(i % 10) for i in range(30)]
+
+    # unchanged, measured for reference
+    return (
+        lambda: str_mod.remove_redundant_elements(data),
+        lambda: str_mod.remove_redundant_elements(data),
+        1,
+    )
+
+
+def case_remove_apostrophes() -> tuple:
+    """ """
+
+    return (
+        lambda: legacy_remove_apostrophes_from_json(SQLITE_ROWS),
+        lambda: str_mod.remove_apostrophes_from_json(SQLITE_ROWS),
+        1,
+    )
+
+
+def case_get_now_unix_time() -> tuple:
+    """ """
+
+    # results only agree to the millisecond: compared with a tolerance
+    return (
+        legacy_get_now_unix_time,
+        time_mod.get_now_unix_time,
+        1,
+    )
+
+
+def case_update_cached_orders() -> tuple:
+    """
+    ws user.changes events against a 40 order cache: the oldest order is
+    filled (trade plus filled order), then a new order with the same id is
+    opened, so the cache keeps its size call after call
+    """
+
+    def running(
+        implementation,
+        orders_cached: list,
+    ) -> list:
+
+        for _ in range(10):
+
+            oldest = orders_cached[0]
+
+            implementation(
+                orders_cached,
+                dict(
+                    orders=[dict(oldest, order_state="filled")],
+                    trades=[dict(order_id=oldest["order_id"], amount=1.0)],
+                ),
+            )
+
+            implementation(
+                orders_cached,
+                dict(orders=[dict(oldest, order_state="open")], trades=[]),
+            )
+
+        return orders_cached
+
+    legacy_cached, current_cached = building_orders_cached(), building_orders_cached()
+
+    return (
+        lambda: running(legacy_update_cached_orders, legacy_cached),
+        lambda: running(caching.update_cached_orders, current_cached),
+        20,
+    )
+
+
+def case_positions_updating_cached() -> tuple:
+    """ """
+
+    sub_account_data = dict(
+        positions=[
+            dict(instrument_name="ETH-27JUN25", size=5.0, average_price=1870.05),
+            dict(instrument_name="BTC-PERPETUAL", size=20.0, average_price=101700.0),
+        ]
+    )
+
+    def running(
+        implementation,
+        positions_cached: list,
+    ) -> list:
+
+        implementation(positions_cached, sub_account_data)
+
+        return positions_cached
+
+    legacy_cached, current_cached = (
+        building_positions_cached(),
+        building_positions_cached(),
+    )
+
+    return (
+        lambda: running(legacy_positions_updating_cached, legacy_cached),
+        lambda: running(caching.positions_updating_cached, current_cached),
+        1,
+    )
+
+
+CASES = {
+    "extract_currency_from_text": case_extract_currency,
+    "id_numbering": case_id_numbering,
+    "remove_redundant_elements": case_remove_redundant_elements,
+    "remove_apostrophes_from_json": case_remove_apostrophes,
+    "get_now_unix_time": case_get_now_unix_time,
+    "update_cached_orders": case_update_cached_orders,
+    "positions_updating_cached": case_positions_updating_cached,
+}
+
+
+# measuring --------------------------------------------------------------------
+
+
+def checking(
+    name: str,
+    legacy: callable,
+    current: callable,
+) -> None:
+    """raises AssertionError when the implementations disagree"""
+
+    expected = copy.deepcopy(legacy())
+    result = current()
+
+    if name == "get_now_unix_time":
+        assert abs(result - expected) <= 5, (name, expected, result)
+
+    else:
+        assert result == expected, (name, expected, result)
+
+
+def timing(
+    function: callable,
+    ops_per_call: int,
+    number: int,
+    repeat: int,
+) -> float:
+    """best ns/op"""
+
+    best = None
+
+    for _ in range(repeat):
+
+        started = time.perf_counter_ns()
+
+        for _ in range(number):
+            function()
+
+        elapsed = time.perf_counter_ns() - started
+
+        best = elapsed if best is None or elapsed < best else best
+
+    return best / number / ops_per_call
+
+
+def measuring_allocations(
+    function: callable,
+    ops_per_call: int,
+) -> float:
+    """mean tracemalloc peak above baseline, bytes/op"""
+
+    tracemalloc.start()
+
+    total = 0
+
+    try:
+        for _ in range(ALLOCATION_CALLS):
+
+            tracemalloc.reset_peak()
+
+            baseline, _ = tracemalloc.get_traced_memory()
+
+            function()
+
+            total += tracemalloc.get_traced_memory()[1] - baseline
+
+    finally:
+        tracemalloc.stop()
+
+    return total / ALLOCATION_CALLS / ops_per_call
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=CASES)
+    parser.add_argument("--number", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # keep the output to the table
+    log.remove()
+
+    print(
+        f"{'function':>30} {'legacy ns/op':>13} {'ns/op':>9} {'speedup':>8}"
+        f" {'legacy B/op':>12} {'B/op':>8}"
+    )
+
+    for name in args.cases:
+
+        legacy, current, ops_per_call = CASES[name]()
+
+        checking(name, legacy, current)
+
+        legacy_ns = timing(legacy, ops_per_call, args.number, args.repeat)
+        current_ns = timing(current, ops_per_call, args.number, args.repeat)
+
+        legacy_bytes = measuring_allocations(legacy, ops_per_call)
+        current_bytes = measuring_allocations(current, ops_per_call)
+
+        print(
+            f"{name:>30} {legacy_ns:>13.0f} {current_ns:>9.0f}"
+            f" {legacy_ns / current_ns:>7.1f}x"
+            f" {legacy_bytes:>12.0f} {current_bytes:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
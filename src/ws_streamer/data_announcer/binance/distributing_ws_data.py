@@ -5,7 +5,12 @@ import asyncio
 
 from ws_streamer.db_management import redis_client
 from ws_streamer.messaging import telegram_bot as tlgrm
-from ws_streamer.utilities import string_modification as str_mod, system_tools
+from ws_streamer.utilities import metrics, profiling, string_modification as str_mod, system_tools
+from ws_streamer.utilities.lazy_message import (
+    RAW_DATA_PLACEHOLDER,
+    LazyMessage,
+    splicing_raw_data,
+)
 
 
 async def caching_distributing_data(
@@ -27,6 +32,10 @@ async def caching_distributing_data(
 
         result: dict = str_mod.message_template()
 
+        metrics.starting_server("binance")
+
+        profiling.starting_control(client_redis)
+
         while True:
 
             message_params: str = await queue_general.get()
@@ -39,24 +48,12 @@ async def caching_distributing_data(
 
                     if message_channel:
 
-                        data: dict = message_params["data"]
-
-                        pub_message = dict(
-                            data=data,
-                        )
-                        
                         if "abnormaltradingnotices" in message_channel:
-                            
-                            data: dict = message_params["data"]
-
-                            pub_message = dict(
-                                data=data,
-                            )
 
                             await abnormal_trading_notices_in_message_channel(
                                 pipe,
                                 abnormal_trading_notices_channel,
-                                pub_message,
+                                message_params,
                                 result,
                             )
 
@@ -79,14 +76,33 @@ async def caching_distributing_data(
 async def abnormal_trading_notices_in_message_channel(
     pipe: object,
     abnormal_trading_notices_channel: str,
-    pub_message: list,
+    message_params: dict,
     result: dict,
 ) -> None:
+    """
+    undecoded frames are published with the notice bytes as received
+    """
 
-    result["params"].update({"channel": abnormal_trading_notices_channel})
-    result["params"].update(pub_message)
+    raw_data = (
+        message_params.raw_data() if isinstance(message_params, LazyMessage) else None
+    )
 
-    await redis_client.publishing_result(
-        pipe,
-        result,
+    result["params"].update({"channel": abnormal_trading_notices_channel})
+    result["params"].update(
+        {"data": RAW_DATA_PLACEHOLDER if raw_data else message_params["data"]}
     )
+
+    if raw_data:
+
+        await redis_client.publishing_raw_result(
+            pipe,
+            abnormal_trading_notices_channel,
+            splicing_raw_data(result, raw_data),
+        )
+
+    else:
+
+        await redis_client.publishing_result(
+            pipe,
+            result,
+        )
@@ -9,7 +9,7 @@ import orjson
 from ws_streamer.db_management.redis_client import publishing_result
 from ws_streamer.db_management.sqlite_management import (
     executing_query_with_return,
-    insert_tables,
+    inserting_many,
     querying_arithmetic_operator,
     update_status_data,
 )
@@ -152,8 +152,8 @@ async def updating_ohlc(
 
                                     await publishing_result(
                                         client_redis,
-                                        chart_low_high_tick_channel,
                                         pub_message,
+                                        chart_low_high_tick_channel,
                                     )
 
                                 # is_updated = False
@@ -172,16 +172,15 @@ async def updating_ohlc(
 
                             await publishing_result(
                                 client_redis,
-                                chart_low_high_tick_channel,
                                 pub_message,
+                                chart_low_high_tick_channel,
                             )
 
-                            for result in result_all:
-
-                                await insert_tables(
-                                    table_ohlc,
-                                    result,
-                                )
+                            # one transaction for the whole catch up
+                            await inserting_many(
+                                table_ohlc,
+                                result_all,
+                            )
 
                             # is_updated = False
                             # break
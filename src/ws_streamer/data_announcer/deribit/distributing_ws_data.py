@@ -2,6 +2,7 @@
 
 # built ins
 import asyncio
+import time
 
 import uvloop
 from loguru import logger as log
@@ -12,7 +13,23 @@ from ws_streamer.db_management import redis_client, sqlite_management as db_mgt
 from ws_streamer.messaging import telegram_bot as tlgrm
 from ws_streamer.restful_api.deribit import api_requests
 from ws_streamer.data_announcer.deribit import get_instrument_summary, allocating_ohlc
-from ws_streamer.utilities import caching, pickling, string_modification as str_mod, system_tools
+from ws_streamer.data_announcer.deribit.instrument_registry import INSTRUMENT_REGISTRY
+from ws_streamer.data_receiver.subscription_reconciler import CONTROL_INSTRUMENTS
+from ws_streamer.utilities import caching, clock, metrics, pickling, profiling, string_modification as str_mod, system_tools
+from ws_streamer.utilities.latency_tracing import LatencyTracer
+from ws_streamer.utilities.lazy_message import (
+    RAW_DATA_PLACEHOLDER,
+    LazyMessage,
+    splicing_raw_data,
+)
+from ws_streamer.utilities.loop_monitor import LoopMonitor
+from ws_streamer.utilities.priority_lanes import getting_batch
+
+PIPELINE_COMMANDS = metrics.histogram(
+    "ws_streamer_redis_pipeline_commands",
+    "commands per Redis pipeline execute",
+    buckets=metrics.SIZE_BUCKETS,
+)
 
 
 async def caching_distributing_data(
@@ -23,9 +40,13 @@ async def caching_distributing_data(
     redis_keys: list,
     strategy_attributes,
     queue_general: object,
+    latency_tracer: LatencyTracer = None,
 ) -> None:
 
     """
+    latency_tracer: stage timings per channel class, see latency_tracing.
+    A default one, logged every minute, is used when not given
+
     my_trades_channel:
     + send messages that "high probabilities" trade DB has changed
         sender: redis publisher + sqlite insert, update & delete
@@ -94,7 +115,7 @@ async def caching_distributing_data(
 
         instruments_name = futures_instruments["instruments_name"]
 
-        ticker_all_cached = combining_ticker_data(instruments_name)
+        ticker_all_cached = await combining_ticker_data(instruments_name)
 
         sub_account_cached_params = initial_data_subaccount["params"]
 
@@ -108,131 +129,189 @@ async def caching_distributing_data(
 
         result = str_mod.message_template()
 
+        if latency_tracer is None:
+            latency_tracer = LatencyTracer()
+            asyncio.create_task(latency_tracer.exporting())
+
+        metrics.registering_queue(queue_general)
+
+        metrics.starting_server("deribit")
+
+        profiling.starting_control(client_redis)
+
+        # blocking calls on this loop show up as lag and slow-callback reports
+        asyncio.create_task(LoopMonitor().monitoring())
+
+        asyncio.create_task(
+            clock.CLOCK.keeping_synced({"deribit": api_requests.get_server_time})
+        )
+
         while True:
 
-            message_params: str = await queue_general.get()
+            # one message or a whole receive batch
+            message_batch: list = await getting_batch(queue_general)
+
+            dequeued_at = time.monotonic_ns()
+
+            traces = []
 
             async with client_redis.pipeline() as pipe:
 
-                try:
+                for message_params in message_batch:
 
-                    data: dict = message_params["data"]
+                    traces.append(latency_tracer.tracing(message_params, dequeued_at))
 
-                    message_channel: str = message_params["channel"]
+                    try:
 
-                    currency: str = str_mod.extract_currency_from_text(message_channel)
+                        message_channel: str = message_params["channel"]
 
-                    currency_upper = currency.upper()
+                        # subscriptions rolled over: caches follow
+                        if message_channel == CONTROL_INSTRUMENTS:
 
-                    pub_message = dict(
-                        data=data,
-                        server_time=server_time,
-                        currency_upper=currency_upper,
-                        currency=currency,
-                    )
+                            await rolling_instruments(
+                                message_params["data"],
+                                ticker_all_cached,
+                                instruments_name,
+                            )
 
-                    if "user." in message_channel:
+                            continue
 
-                        if "portfolio" in message_channel:
+                        currency: str = str_mod.extract_currency_from_text(
+                            message_channel
+                        )
+
+                        currency_upper = currency.upper()
 
-                            result["params"].update({"channel": portfolio_channel})
-                            result["params"].update({"data": pub_message})
+                        # candles are only re-wrapped: payload never decoded
+                        if "chart.trades" in message_channel:
 
-                            await updating_portfolio(
+                            await chart_trades_in_message_channel(
                                 pipe,
-                                portfolio,
-                                portfolio_channel,
+                                chart_low_high_tick_channel,
+                                message_channel,
+                                message_params,
+                                dict(
+                                    server_time=server_time,
+                                    currency_upper=currency_upper,
+                                    currency=currency,
+                                ),
                                 result,
                             )
 
-                        elif "changes" in message_channel:
-
-                            log.critical(message_channel)
-                            log.warning(data)
+                            continue
 
-                            await updating_sub_account(
-                                client_redis,
-                                orders_cached,
-                                positions_cached,
-                                query_trades,
-                                data,
-                                sub_account_cached_channel,
-                            )
+                        data: dict = message_params["data"]
 
-                        else:
+                        pub_message = dict(
+                            data=data,
+                            server_time=server_time,
+                            currency_upper=currency_upper,
+                            currency=currency,
+                        )
 
-                            log.critical(message_channel)
-                            log.warning(data)
+                        if "user." in message_channel:
 
-                            result["params"].update({"data": data})
+                            if "portfolio" in message_channel:
 
-                            if "trades" in message_channel:
+                                result["params"].update({"channel": portfolio_channel})
+                                result["params"].update({"data": pub_message})
 
-                                await trades_in_message_channel(
+                                await updating_portfolio(
                                     pipe,
-                                    data,
-                                    my_trade_receiving_channel,
-                                    orders_cached,
+                                    portfolio,
+                                    portfolio_channel,
                                     result,
                                 )
 
-                            if "order" in message_channel:
+                            elif "changes" in message_channel:
 
-                                await order_in_message_channel(
-                                    pipe,
-                                    data,
-                                    order_update_channel,
+                                log.critical(message_channel)
+                                log.warning(data)
+
+                                await updating_sub_account(
+                                    client_redis,
                                     orders_cached,
-                                    result,
+                                    positions_cached,
+                                    query_trades,
+                                    data,
+                                    sub_account_cached_channel,
                                 )
 
-                            my_trades_active_all = (
-                                await db_mgt.executing_query_with_return(query_trades)
-                            )
+                            else:
+
+                                log.critical(message_channel)
+                                log.warning(data)
+
+                                result["params"].update({"data": data})
+
+                                if "trades" in message_channel:
+
+                                    await trades_in_message_channel(
+                                        pipe,
+                                        data,
+                                        my_trade_receiving_channel,
+                                        orders_cached,
+                                        result,
+                                    )
+
+                                if "order" in message_channel:
+
+                                    await order_in_message_channel(
+                                        pipe,
+                                        data,
+                                        order_update_channel,
+                                        orders_cached,
+                                        result,
+                                    )
 
-                            result["params"].update({"channel": my_trades_channel})
-                            result["params"].update({"data": my_trades_active_all})
+                                my_trades_active_all = (
+                                    await db_mgt.executing_query_with_return(
+                                        query_trades
+                                    )
+                                )
+
+                                result["params"].update({"channel": my_trades_channel})
+                                result["params"].update({"data": my_trades_active_all})
+
+                                await redis_client.publishing_result(
+                                    pipe,
+                                    result,
+                                )
+
+                        instrument_name_future = (message_channel)[19:]
+                        if (
+                            message_channel
+                            == f"incremental_ticker.{instrument_name_future}"
+                        ):
 
-                            await redis_client.publishing_result(
+                            await incremental_ticker_in_message_channel(
                                 pipe,
-                                my_trades_channel,
+                                currency,
+                                data,
+                                instrument_name_future,
                                 result,
+                                pub_message,
+                                server_time,
+                                ticker_all_cached,
+                                ticker_cached_channel,
                             )
 
-                    instrument_name_future = (message_channel)[19:]
-                    if (
-                        message_channel
-                        == f"incremental_ticker.{instrument_name_future}"
-                    ):
-
-                        await incremental_ticker_in_message_channel(
-                            pipe,
-                            currency,
-                            data,
-                            instrument_name_future,
-                            result,
-                            pub_message,
-                            server_time,
-                            ticker_all_cached,
-                            ticker_cached_channel,
-                        )
+                    except:
 
-                    if "chart.trades" in message_channel:
+                        pass
 
-                        await chart_trades_in_message_channel(
-                            pipe,
-                            chart_low_high_tick_channel,
-                            message_channel,
-                            pub_message,
-                            result,
-                        )
+                PIPELINE_COMMANDS.observe(len(pipe.command_stack))
 
-                except:
-
-                    pass
+                execute_started = time.monotonic_ns()
 
                 await pipe.execute()
 
+            latency_tracer.recording_batch(
+                traces,
+                execute_started,
+                time.monotonic_ns(),
+            )
+
     except Exception as error:
 
         system_tools.parse_error_message(error)
@@ -294,7 +373,6 @@ async def updating_portfolio(
 
     await redis_client.publishing_result(
         pipe,
-        portfolio_channel,
         result,
     )
 
@@ -308,7 +386,7 @@ def get_settlement_period(strategy_attributes: list) -> list:
     )
 
 
-def combining_ticker_data(instruments_name: str) -> list:
+async def combining_ticker_data(instruments_name: str) -> list:
     """_summary_
     https://blog.apify.com/python-cache-complete-guide/]
     https://medium.com/@jodielovesmaths/memoization-in-python-using-cache-36b676cb21ef
@@ -322,20 +400,65 @@ def combining_ticker_data(instruments_name: str) -> list:
         _type_: _description_
     """
 
-    result = []
+    cached = {}
     for instrument_name in instruments_name:
 
         result_instrument = reading_from_pkl_data("ticker", instrument_name)
 
         if result_instrument:
-            result_instrument = result_instrument[0]
+            cached[instrument_name] = result_instrument[0]
+
+    missing = [o for o in instruments_name if o not in cached]
+
+    if missing:
+
+        # book summaries per currency, concurrently, instead of one blocking
+        # public/ticker request per instrument
+        for ticker in await caching.warming_up_tickers(missing):
+            cached[ticker["instrument_name"]] = ticker
+
+    return [cached[o] for o in instruments_name if o in cached]
+
+
+async def rolling_instruments(
+    data: dict,
+    ticker_all_cached: list,
+    instruments_name: list,
+) -> None:
+    """
+    data: dict(listed, expired) from the subscription reconciler.
+    Expired instruments leave every cache, listed ones get a ticker.
+    The lists are changed in place: every handler holds them
+    """
+
+    expired = set(data.get("expired") or [])
+
+    if expired:
+
+        ticker_all_cached[:] = [
+            o for o in ticker_all_cached if o["instrument_name"] not in expired
+        ]
+
+        instruments_name[:] = [o for o in instruments_name if o not in expired]
+
+        for instrument_name in expired:
+            INSTRUMENT_REGISTRY.removing(instrument_name)
+
+    cached = {o["instrument_name"] for o in ticker_all_cached}
 
-        else:
-            result_instrument = api_requests.get_tickers(instrument_name)
+    listed = [o for o in data.get("listed") or [] if o not in cached]
 
-        result.append(result_instrument)
+    if listed:
 
-    return result
+        known = set(instruments_name)
+
+        instruments_name.extend(o for o in listed if o not in known)
+
+        ticker_all_cached.extend(await caching.warming_up_tickers(listed))
+
+    log.info(
+        f"tickers cached {len(ticker_all_cached)}: listed {listed} expired {sorted(expired)}"
+    )
 
 
 def reading_from_pkl_data(
@@ -398,7 +521,6 @@ async def trades_in_message_channel(
 
     await redis_client.publishing_result(
         pipe,
-        my_trade_receiving_channel,
         result,
     )
 
@@ -439,7 +561,6 @@ async def order_in_message_channel(
 
     await redis_client.publishing_result(
         pipe,
-        order_update_channel,
         result,
     )
 
@@ -504,7 +625,6 @@ async def incremental_ticker_in_message_channel(
 
     await redis_client.publishing_result(
         pipe,
-        ticker_cached_channel,
         result,
     )
     if "PERPETUAL" in instrument_name_future:
@@ -527,9 +647,13 @@ async def chart_trades_in_message_channel(
     pipe: object,
     chart_low_high_tick_channel: str,
     message_channel: str,
-    pub_message: list,
+    message_params: dict,
+    pub_message: dict,
     result: dict,
 ) -> None:
+    """
+    undecoded frames are published with the candle bytes as received
+    """
 
     try:
         resolution = int(message_channel.split(".")[3])
@@ -537,17 +661,33 @@ async def chart_trades_in_message_channel(
     except:
         resolution = message_channel.split(".")[3]
 
+    raw_data = (
+        message_params.raw_data() if isinstance(message_params, LazyMessage) else None
+    )
+
+    pub_message.update(
+        {"data": RAW_DATA_PLACEHOLDER if raw_data else message_params["data"]}
+    )
     pub_message.update({"instrument_name": message_channel.split(".")[2]})
     pub_message.update({"resolution": resolution})
 
     result["params"].update({"channel": chart_low_high_tick_channel})
     result["params"].update({"data": pub_message})
 
-    await redis_client.publishing_result(
-        pipe,
-        chart_low_high_tick_channel,
-        result,
-    )
+    if raw_data:
+
+        await redis_client.publishing_raw_result(
+            pipe,
+            chart_low_high_tick_channel,
+            splicing_raw_data(result, raw_data),
+        )
+
+    else:
+
+        await redis_client.publishing_result(
+            pipe,
+            result,
+        )
 
 
 async def updating_sub_account(
@@ -592,7 +732,6 @@ async def updating_sub_account(
 
     await redis_client.publishing_result(
         client_redis,
-        sub_account_cached_channel,
         message_byte_data,
     )
 
@@ -5,11 +5,17 @@ import asyncio
 
 
 # user defined formula
+from ws_streamer.data_announcer.deribit.instrument_registry import (
+    INSTRUMENT_REGISTRY,
+)
+from ws_streamer.restful_api import request_cache
 from ws_streamer.restful_api.deribit.api_requests import get_instruments
 from ws_streamer.utilities.pickling import read_data
-from ws_streamer.utilities.string_modification import remove_double_brackets_in_list
 from ws_streamer.utilities.system_tools import provide_path_for_file
 
+# every kind but spot
+DERIVATIVE_KINDS = ("future", "option", "future_combo", "option_combo")
+
 
 def get_instruments_kind(
     currency: str,
@@ -46,14 +52,15 @@ def get_instruments_kind(
 
         result = instruments_raw[0]["result"]
 
-    non_spot_instruments = [o for o in result if o["kind"] != "spot"]
-    instruments_kind = (
-        non_spot_instruments
-        if kind == "all"
-        else [o for o in result if o["kind"] == kind]
-    )
+    # no-op when this response was applied already
+    INSTRUMENT_REGISTRY.refreshing(currency, result)
+
+    kinds = DERIVATIVE_KINDS if kind == "all" else (kind,)
 
-    return [o for o in instruments_kind if o["settlement_period"] in settlement_periods]
+    return [
+        o.instrument
+        for o in INSTRUMENT_REGISTRY.instruments_of(currency, kinds, settlement_periods)
+    ]
 
 
 async def get_futures_for_active_currencies(
@@ -65,36 +72,17 @@ async def get_futures_for_active_currencies(
         list: _description_
     """
 
-    instruments_holder_place = []
-    for currency in active_currencies:
-
-        result = await get_instruments(currency)
-
-        future_instruments = get_instruments_kind(
-            currency, settlement_periods, "future", result
-        )
-
-        future_combo_instruments = get_instruments_kind(
-            currency, settlement_periods, "future_combo", result
-        )
-
-        active_combo_perp = [
-            o for o in future_combo_instruments if "_PERP" in o["instrument_name"]
-        ]
-
-        combined_instruments = future_instruments + active_combo_perp
-        instruments_holder_place.append(combined_instruments)
-
-    # removing inner list
-    # typical result: [['BTC-30AUG24', 'BTC-6SEP24', 'BTC-27SEP24', 'BTC-27DEC24',
-    # 'BTC-28MAR25', 'BTC-27JUN25', 'BTC-PERPETUAL'], ['ETH-30AUG24', 'ETH-6SEP24',
-    # 'ETH-27SEP24', 'ETH-27DEC24', 'ETH-28MAR25', 'ETH-27JUN25', 'ETH-PERPETUAL']]
+    results = await asyncio.gather(*[get_instruments(o) for o in active_currencies])
 
-    instruments_holder_plc = []
-    for instr in instruments_holder_place:
-        instruments_holder_plc.append(instr)
+    for currency, result in zip(active_currencies, results):
+        INSTRUMENT_REGISTRY.refreshing(currency, result["result"])
 
-    return remove_double_brackets_in_list(instruments_holder_plc)
+    # typical result: [BTC-30AUG24, BTC-6SEP24, BTC-27SEP24, .. BTC-PERPETUAL,
+    # ETH-30AUG24, .. ETH-PERPETUAL], as dicts
+    return [
+        o.instrument
+        for o in INSTRUMENT_REGISTRY.futures_of(active_currencies, settlement_periods)
+    ]
 
 
 async def get_futures_instruments(
@@ -106,16 +94,41 @@ async def get_futures_instruments(
         active_currencies, settlement_periods
     )
 
-    min_expiration_timestamp = min([o["expiration_timestamp"] for o in active_futures])
+    instruments_name = []
+    active_combo = []
+
+    min_expiration_timestamp = None
+    instruments_name_with_min_expiration_timestamp = None
+
+    # one pass
+    for instrument in active_futures:
+
+        instrument_name = instrument["instrument_name"]
+
+        instruments_name.append(instrument_name)
+
+        if instrument["kind"] == "future_combo":
+            active_combo.append(instrument)
+
+        expiration_timestamp = instrument["expiration_timestamp"]
+
+        if (
+            min_expiration_timestamp is None
+            or expiration_timestamp < min_expiration_timestamp
+        ):
+            min_expiration_timestamp = expiration_timestamp
+            instruments_name_with_min_expiration_timestamp = instrument_name
+
+    # the instrument list changes when the nearest future expires
+    request_cache.REQUEST_CACHE.expiring_at(
+        "get_instruments", min_expiration_timestamp
+    )
 
     return dict(
-        instruments_name=[o["instrument_name"] for o in (active_futures)],
+        instruments_name=instruments_name,
         min_expiration_timestamp=min_expiration_timestamp,
-        active_futures=[o for o in active_futures if "future" in o["kind"]],
-        active_combo=[o for o in active_futures if "future_combo" in o["kind"]],
-        instruments_name_with_min_expiration_timestamp=[
-            o["instrument_name"]
-            for o in active_futures
-            if o["expiration_timestamp"] == min_expiration_timestamp
-        ][0],
+        # every kind here has "future" in it
+        active_futures=active_futures,
+        active_combo=active_combo,
+        instruments_name_with_min_expiration_timestamp=instruments_name_with_min_expiration_timestamp,
     )
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+"""
+Deribit instruments, indexed once.
+
+get_instruments responses are folded into compact slotted records with
+interned names and small integer ids. Every lookup the hot path needs is a
+dict access:
+
+    by name          record_of("BTC-PERPETUAL"), id_of(..), name_of(id)
+    by currency, kind and settlement period, in the exchange's order
+                     instruments_of("BTC", ("future",), ("month", "perpetual"))
+    by expiry        expiring_at(timestamp), next_expiration(), expiring(now)
+
+Refreshes are incremental: a response already applied is skipped (the
+request cache hands out the same object until it expires), otherwise only
+listed, delisted and changed instruments touch the indexes. Ids are never
+reused, so an id held elsewhere cannot point to another instrument.
+
+    registry = instrument_registry.INSTRUMENT_REGISTRY
+    listed, removed = registry.refreshing("BTC", response["result"])
+"""
+
+# built ins
+import heapq
+import itertools
+import sys
+from operator import attrgetter
+
+# installed
+from dataclassy import dataclass
+from loguru import logger as log
+
+# by_key pseudo kind: the future_combo records against the perpetual
+COMBO_PERP = "future_combo_perp"
+
+
+@dataclass(slots=True)
+class InstrumentRecord:
+    """ """
+
+    id: int
+    instrument_name: str
+    # as asked in get_instruments (USDC for BTC_USDC-PERPETUAL)
+    currency: str
+    kind: str
+    settlement_period: str
+    expiration_timestamp: int
+    # future_combo against the perpetual (BTC-FS-27SEP24_PERP)
+    is_combo_perp: bool
+    # the exchange's dict, as returned to callers
+    instrument: dict
+    # index in the exchange's list of the last refresh
+    position: int = 0
+
+
+class InstrumentRegistry:
+    """ """
+
+    def __init__(self):
+        self.ids = {}  # instrument_name: id
+        self.names = {}  # id: instrument_name
+        self.next_ids = itertools.count(1)
+        self.by_name = {}  # instrument_name: InstrumentRecord
+        # (currency, kind, settlement_period): {instrument_name: record}
+        self.by_key = {}
+        self.by_currency = {}  # currency: {instrument_name}
+        self.by_expiry = {}  # expiration_timestamp: {instrument_name}
+        self.expiries = []  # heap of (expiration_timestamp, instrument_name)
+        self.sources = {}  # currency: the instrument list applied last
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def __contains__(self, instrument_name: str) -> bool:
+        return instrument_name in self.by_name
+
+    def id_of(self, instrument_name: str) -> int:
+        """a stable small integer, assigned on first sight"""
+
+        instrument_id = self.ids.get(instrument_name)
+
+        if instrument_id is None:
+
+            instrument_name = sys.intern(instrument_name)
+
+            instrument_id = self.ids[instrument_name] = next(self.next_ids)
+
+            self.names[instrument_id] = instrument_name
+
+        return instrument_id
+
+    def name_of(self, instrument_id: int) -> str:
+        """ """
+
+        return self.names.get(instrument_id)
+
+    def record_of(self, instrument_name: str) -> InstrumentRecord:
+        """ """
+
+        return self.by_name.get(instrument_name)
+
+    def kinds_of(self, record: InstrumentRecord) -> tuple:
+        """ """
+
+        return (record.kind, COMBO_PERP) if record.is_combo_perp else (record.kind,)
+
+    def adding(
+        self,
+        currency: str,
+        instrument: dict,
+        position: int = 0,
+    ) -> InstrumentRecord:
+        """ """
+
+        instrument_id = self.id_of(instrument["instrument_name"])
+
+        instrument_name = self.names[instrument_id]
+
+        record = InstrumentRecord(
+            instrument_id,
+            instrument_name,
+            sys.intern(currency.upper()),
+            sys.intern(instrument["kind"]),
+            sys.intern(instrument.get("settlement_period") or ""),
+            instrument.get("expiration_timestamp") or 0,
+            instrument["kind"] == "future_combo" and "_PERP" in instrument_name,
+            instrument,
+            position,
+        )
+
+        self.by_name[instrument_name] = record
+
+        for kind in self.kinds_of(record):
+
+            self.by_key.setdefault(
+                (record.currency, kind, record.settlement_period), {}
+            )[instrument_name] = record
+
+        self.by_currency.setdefault(record.currency, set()).add(instrument_name)
+
+        self.by_expiry.setdefault(record.expiration_timestamp, set()).add(
+            instrument_name
+        )
+
+        heapq.heappush(self.expiries, (record.expiration_timestamp, instrument_name))
+
+        # changed records leave stale heap entries behind: keep it bounded
+        if len(self.expiries) > 2 * len(self.by_name) + 64:
+
+            self.expiries = [
+                (o.expiration_timestamp, o.instrument_name)
+                for o in self.by_name.values()
+            ]
+
+            heapq.heapify(self.expiries)
+
+        return record
+
+    def removing(self, instrument_name: str) -> InstrumentRecord:
+        """
+        the record leaves every index. Its heap entry is dropped lazily
+        """
+
+        record = self.by_name.pop(instrument_name, None)
+
+        if record is None:
+            return None
+
+        for kind in self.kinds_of(record):
+
+            key = (record.currency, kind, record.settlement_period)
+
+            self.by_key[key].pop(instrument_name, None)
+
+            if not self.by_key[key]:
+                del self.by_key[key]
+
+        self.by_currency[record.currency].discard(instrument_name)
+
+        names = self.by_expiry[record.expiration_timestamp]
+
+        names.discard(instrument_name)
+
+        if not names:
+            del self.by_expiry[record.expiration_timestamp]
+
+        return record
+
+    def refreshing(
+        self,
+        currency: str,
+        instruments: list,
+    ) -> tuple:
+        """
+        instruments: get_instruments result of currency (spot included).
+        Returns (listed, removed): instrument names
+        """
+
+        currency = currency.upper()
+
+        if self.sources.get(currency) is instruments:
+            return [], []
+
+        self.sources[currency] = instruments
+
+        instruments = [o for o in instruments if o["kind"] != "spot"]
+
+        incoming = {o["instrument_name"]: o for o in instruments}
+
+        current = self.by_currency.get(currency, set())
+
+        removed = [o for o in current if o not in incoming]
+
+        for instrument_name in removed:
+            self.removing(instrument_name)
+
+        listed = []
+
+        for position, (instrument_name, instrument) in enumerate(incoming.items()):
+
+            record = self.by_name.get(instrument_name)
+
+            if record is None:
+                listed.append(instrument_name)
+
+            elif record.instrument == instrument:
+                record.instrument = instrument
+                record.position = position
+                continue
+
+            else:
+                self.removing(instrument_name)
+
+            self.adding(currency, instrument, position)
+
+        if listed or removed:
+            log.info(f"instruments {currency} listed {listed} removed {removed}")
+
+        return listed, removed
+
+    def dropping_stale(self) -> None:
+        """heap top is a live record"""
+
+        while self.expiries:
+
+            expiration_timestamp, instrument_name = self.expiries[0]
+
+            record = self.by_name.get(instrument_name)
+
+            if record is not None and record.expiration_timestamp == expiration_timestamp:
+                return
+
+            heapq.heappop(self.expiries)
+
+    def next_expiration(self) -> int:
+        """the nearest expiration_timestamp, None when empty"""
+
+        self.dropping_stale()
+
+        return self.expiries[0][0] if self.expiries else None
+
+    def expiring(self, now_ms: int) -> list:
+        """removes every instrument expired by now_ms, their names"""
+
+        expired = []
+
+        while self.expiries and self.expiries[0][0] <= now_ms:
+
+            expiration_timestamp, instrument_name = heapq.heappop(self.expiries)
+
+            record = self.by_name.get(instrument_name)
+
+            # stale heap entry: removed or re-listed with another expiry
+            if record is None or record.expiration_timestamp != expiration_timestamp:
+                continue
+
+            self.removing(instrument_name)
+
+            expired.append(instrument_name)
+
+        return expired
+
+    def expiring_at(self, expiration_timestamp: int) -> set:
+        """ """
+
+        return self.by_expiry.get(expiration_timestamp, set())
+
+    def instruments_of(
+        self,
+        currency: str,
+        kinds: tuple,
+        settlement_periods: list,
+    ) -> list:
+        """
+        records of currency, one dict access per (kind, settlement period),
+        in the order get_instruments listed them (kinds and settlement
+        periods interleaved, as the exchange has them)
+        """
+
+        currency = currency.upper()
+
+        records = [
+            record
+            for kind in kinds
+            for settlement_period in settlement_periods
+            for record in self.by_key.get((currency, kind, settlement_period), {}).values()
+        ]
+
+        # linear when a single, unchanged group is asked for
+        records.sort(key=attrgetter("position"))
+
+        return records
+
+    def futures_of(
+        self,
+        currencies: list,
+        settlement_periods: list,
+    ) -> list:
+        """
+        futures, then combos against the perpetual, per currency. Each in
+        the exchange's order
+        """
+
+        return [
+            record
+            for currency in currencies
+            for kind in ("future", COMBO_PERP)
+            for record in self.instruments_of(currency, (kind,), settlement_periods)
+        ]
+
+
+INSTRUMENT_REGISTRY = InstrumentRegistry()
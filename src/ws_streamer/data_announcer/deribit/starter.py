@@ -2,27 +2,181 @@
 
 # built ins
 import asyncio
+import time
+from contextlib import contextmanager
+
 from loguru import logger as log
 
 # user defined formulas
-from db_management import sqlite_management as db_mgt
-from messaging import telegram_bot as tlgrm
 from transaction_management.deribit import (
     api_requests,
     cancelling_active_orders,
 )
-from utilities import (
+from ws_streamer.db_management import sqlite_management as db_mgt
+from ws_streamer.messaging.telegram_bot import alerting
+from ws_streamer.restful_api.deribit import history_fetching
+from ws_streamer.utilities import (
+    clock,
+    metrics,
     pickling,
     string_modification as str_mod,
     system_tools,
-    time_modification as time_mod,
 )
 
 
+STARTUP_CONCURRENCY = 8  # REST/db tasks in flight during startup
+
+STARTUP_STEP_SECONDS = metrics.histogram(
+    "ws_streamer_startup_step_seconds",
+    "cold start duration per step (per currency for the per currency steps)",
+    ("step",),
+)
+
+
+@contextmanager
+def timing_step(
+    timings: dict,
+    step: str,
+    currency: str = None,
+):
+    """ """
+
+    started = time.perf_counter()
+
+    try:
+        yield
+
+    finally:
+
+        elapsed = time.perf_counter() - started
+
+        timings[step if currency is None else f"{step} {currency}"] = elapsed
+
+        STARTUP_STEP_SECONDS.labels(step).observe(elapsed)
+
+
+def reporting_startup(
+    timings: dict,
+    total: float,
+) -> str:
+    """slowest steps first"""
+
+    steps = sorted(timings.items(), key=lambda o: o[1], reverse=True)
+
+    report = f"startup {total:.2f}s: " + ", ".join(
+        f"{step} {elapsed:.2f}s" for step, elapsed in steps
+    )
+
+    log.info(report)
+
+    return report
+
+
+async def storing_instruments(
+    currency: str,
+    semaphore: asyncio.Semaphore,
+    timings: dict,
+) -> None:
+    """ """
+
+    try:
+
+        async with semaphore:
+
+            with timing_step(timings, "instruments", currency):
+
+                instruments = await api_requests.get_instruments(currency)
+
+                my_path_instruments = system_tools.provide_path_for_file(
+                    "instruments", currency
+                )
+
+                # file writes off the event loop
+                await asyncio.to_thread(
+                    pickling.replace_data,
+                    my_path_instruments,
+                    instruments,
+                )
+
+    except Exception as error:
+
+        system_tools.parse_error_message(error, f"starter instruments {currency}")
+
+        await alerting(f"starter instruments {currency} - {error}")
+
+
+async def preparing_currency(
+    private_data: object,
+    order_db_table: str,
+    currency: str,
+    cancellable_strategies: list,
+    five_days_ago: int,
+    semaphore: asyncio.Semaphore,
+    timings: dict,
+) -> None:
+    """cancel, check and, when empty, refill the trades of one currency"""
+
+    try:
+
+        currency_lower = currency.lower()
+
+        archive_db_table = f"my_trades_all_{currency_lower}_json"
+
+        query_trades_active_basic = f"SELECT instrument_name, user_seq, timestamp, trade_id  FROM  {archive_db_table}"
+
+        query_trades_active_where = f"WHERE instrument_name LIKE '%{currency}%'"
+
+        query_trades = f"{query_trades_active_basic} {query_trades_active_where}"
+
+        async with semaphore:
+
+            with timing_step(timings, "cancelling", currency):
+
+                await cancelling_active_orders.cancel_the_cancellables(
+                    private_data,
+                    order_db_table,
+                    currency,
+                    cancellable_strategies,
+                )
+
+            with timing_step(timings, "querying", currency):
+
+                my_trades_currency = await db_mgt.executing_query_with_return(
+                    query_trades
+                )
+
+        if my_trades_currency == []:
+
+            # paginates with its own bounded concurrency
+            with timing_step(timings, "refilling", currency):
+
+                await refill_db(
+                    private_data,
+                    archive_db_table,
+                    currency,
+                    five_days_ago,
+                )
+
+    except Exception as error:
+
+        system_tools.parse_error_message(error, f"starter {currency}")
+
+        await alerting(f"starter {currency} - {error}")
+
+
 async def initial_procedures(
     private_data: object,
     config_app: list,
 ) -> None:
+    """
+    every currency in parallel (at most STARTUP_CONCURRENCY tasks):
+    instruments of all exchange currencies first, then cancel/query/refill
+    of the tradable ones. Ends with a timing report per step
+    """
+
+    started = time.perf_counter()
+
+    timings = {}
 
     try:
 
@@ -42,12 +196,19 @@ async def initial_procedures(
             o["strategy_label"] for o in strategy_attributes if o["cancellable"] == True
         ]
 
-        # get ALL traded currencies in deribit
-        get_currencies_all = await api_requests.get_currencies()
+        semaphore = asyncio.Semaphore(STARTUP_CONCURRENCY)
+
+        with timing_step(timings, "currencies"):
+
+            # get ALL traded currencies in deribit, while the clock syncs
+            get_currencies_all, _ = await asyncio.gather(
+                api_requests.get_currencies(),
+                clock.CLOCK.syncing("deribit", api_requests.get_server_time),
+            )
 
         all_exc_currencies = [o["currency"] for o in get_currencies_all["result"]]
 
-        server_time = time_mod.get_now_unix_time()
+        server_time = clock.now_ms("deribit")
 
         ONE_SECOND = 1000
 
@@ -57,61 +218,45 @@ async def initial_procedures(
 
         my_path_cur = system_tools.provide_path_for_file("currencies")
 
-        pickling.replace_data(
-            my_path_cur,
-            all_exc_currencies,
-        )
-
-        for currency in all_exc_currencies:
-
-            instruments = await api_requests.get_instruments(currency)
-
-            my_path_instruments = system_tools.provide_path_for_file(
-                "instruments", currency
+        with timing_step(timings, "instruments_all"):
+
+            await asyncio.gather(
+                asyncio.to_thread(
+                    pickling.replace_data,
+                    my_path_cur,
+                    all_exc_currencies,
+                ),
+                *[
+                    storing_instruments(currency, semaphore, timings)
+                    for currency in all_exc_currencies
+                ],
             )
 
-            pickling.replace_data(
-                my_path_instruments,
-                instruments,
+        with timing_step(timings, "tradable_all"):
+
+            await asyncio.gather(
+                *[
+                    preparing_currency(
+                        private_data,
+                        order_db_table,
+                        currency,
+                        cancellable_strategies,
+                        five_days_ago,
+                        semaphore,
+                        timings,
+                    )
+                    for currency in currencies
+                ]
             )
 
-        for currency in currencies:
-
-            currency_lower = currency.lower()
-
-            archive_db_table = f"my_trades_all_{currency_lower}_json"
-
-            query_trades_active_basic = f"SELECT instrument_name, user_seq, timestamp, trade_id  FROM  {archive_db_table}"
-
-            query_trades_active_where = f"WHERE instrument_name LIKE '%{currency}%'"
-
-            query_trades = f"{query_trades_active_basic} {query_trades_active_where}"
-
-            await cancelling_active_orders.cancel_the_cancellables(
-                private_data,
-                order_db_table,
-                currency,
-                cancellable_strategies,
-            )
-
-            my_trades_currency = await db_mgt.executing_query_with_return(query_trades)
-
-            if my_trades_currency == []:
-
-                await refill_db(
-                    private_data,
-                    archive_db_table,
-                    currency,
-                    five_days_ago,
-                )
-
     except Exception as error:
 
-        system_tools.parse_error_message(f"starter initial_procedures {error}")
+        system_tools.parse_error_message(error, "starter initial_procedures")
 
-        await tlgrm.telegram_bot_sendtext(
-            f"starter initial_procedures {error}", "general_error"
-        )
+        await alerting(f"starter initial_procedures - {error}")
+
+    finally:
+        reporting_startup(timings, time.perf_counter() - started)
 
 
 async def refill_db(
@@ -120,55 +265,79 @@ async def refill_db(
     currency: str,
     five_days_ago: int,
 ) -> None:
+    """
+    every trade since five_days_ago: all pages, windows fetched
+    concurrently, each page bulk inserted as it arrives. The active
+    trading view is published once, at the end
+    """
+
+    inserted = 0
+
+    async def storing(transaction_log: list) -> None:
+
+        nonlocal inserted
+
+        inserted += await distributing_transaction_log_from_exchange(
+            archive_db_table,
+            transaction_log,
+        )
 
-    transaction_log = await private_data.get_transaction_log(
+    await history_fetching.fetching_transaction_log(
+        private_data,
         currency,
         five_days_ago,
-        1000,
+        clock.now_ms("deribit"),
         "trade",
+        on_batch=storing,
     )
 
-    await distributing_transaction_log_from_exchange(
-        archive_db_table,
-        transaction_log,
-    )
+    if inserted:
+        await db_mgt.publishing_trading_update(archive_db_table)
 
 
-async def distributing_transaction_log_from_exchange(
-    archive_db_table: str,
-    transaction_log: list,
-) -> None:
+def transaction_to_trade(transaction: dict) -> dict:
+    """ """
 
-    log.warning(f"transaction_log {transaction_log}")
+    result = {}
 
-    if transaction_log:
+    if "sell" in transaction["side"]:
+        direction = "sell"
 
-        for transaction in transaction_log:
-            result = {}
+    if "buy" in transaction["side"]:
+        direction = "buy"
 
-            if "sell" in transaction["side"]:
-                direction = "sell"
+    result.update({"trade_id": transaction["trade_id"]})
+    result.update({"user_seq": transaction["user_seq"]})
+    result.update({"side": transaction["side"]})
+    result.update({"timestamp": transaction["timestamp"]})
+    result.update({"position": transaction["position"]})
+    result.update({"amount": transaction["amount"]})
+    result.update({"order_id": transaction["order_id"]})
+    result.update({"price": transaction["price"]})
+    result.update({"instrument_name": transaction["instrument_name"]})
+    result.update({"label": None})
+    result.update({"direction": direction})
+    result.update({"currency": transaction["currency"]})
 
-            if "buy" in transaction["side"]:
-                direction = "buy"
+    return result
 
-            result.update({"trade_id": transaction["trade_id"]})
-            result.update({"user_seq": transaction["user_seq"]})
-            result.update({"side": transaction["side"]})
-            result.update({"timestamp": transaction["timestamp"]})
-            result.update({"position": transaction["position"]})
-            result.update({"amount": transaction["amount"]})
-            result.update({"order_id": transaction["order_id"]})
-            result.update({"price": transaction["price"]})
-            result.update({"instrument_name": transaction["instrument_name"]})
-            result.update({"label": None})
-            result.update({"direction": direction})
-            result.update({"currency": transaction["currency"]})
 
-            await db_mgt.insert_tables(
-                archive_db_table,
-                result,
-            )
+async def distributing_transaction_log_from_exchange(
+    archive_db_table: str,
+    transaction_log: list,
+) -> int:
+    """rows inserted, the trading view is left to refill_db"""
+
+    log.warning(f"transaction_log {len(transaction_log or [])} entries")
+
+    if not transaction_log:
+        return 0
+
+    return await db_mgt.inserting_many(
+        archive_db_table,
+        [transaction_to_trade(o) for o in transaction_log],
+        publishing=False,
+    )
 
 
 def portfolio_combining(
@@ -7,7 +7,6 @@ import time
 import os, sys
 
 # installed
-import orjson
 import websockets
 from dataclassy import dataclass, fields
 from loguru import logger as log
@@ -23,8 +22,12 @@ sys.path.append(this_folder)
 
 # user defined formula
 from ws_streamer.configuration import config
+from ws_streamer.data_receiver.frame_capture import FrameRecorder
 from ws_streamer.messaging.telegram_bot import telegram_bot_sendtext
-from ws_streamer.utilities import system_tools
+from ws_streamer.restful_api.binance.download_binance import BinanceClient
+from ws_streamer.utilities import clock, metrics, profiling, system_tools
+from ws_streamer.utilities.latency_tracing import counting_frame
+from ws_streamer.utilities.lazy_message import parsing_subscription_frame
 
 
 def parse_dotenv(sub_account: str) -> dict:
@@ -32,7 +35,7 @@ def parse_dotenv(sub_account: str) -> dict:
 
 
 def get_timestamp():
-    return int(time.time() * 1000)
+    return clock.now_ms("binance")
 
 
 @dataclass(unsafe_hash=True, slots=True)
@@ -52,6 +55,11 @@ class StreamingDataBinance:
     websocket_client: websockets.WebSocketClientProtocol = None
     refresh_token: str = None
     refresh_token_expiry_time: int = None
+    # Raw frame capture (None: disabled)
+    capture_path: str = None
+    frame_recorder: FrameRecorder = None
+    # keeps the binance offset of utilities.clock fresh
+    clock_task: asyncio.Task = None
 
     async def ws_manager(
         self,
@@ -61,6 +69,15 @@ class StreamingDataBinance:
         queue_general: object,
     ) -> None:
 
+        metrics.starting_server("binance")
+
+        profiling.starting_control(client_redis)
+
+        if self.clock_task is None:
+            self.clock_task = self.loop.create_task(
+                clock.CLOCK.keeping_synced({"binance": BinanceClient().sync_server_time})
+            )
+
         async with websockets.connect(
             self.ws_connection_notice_url,
             ping_interval=None,
@@ -80,6 +97,9 @@ class StreamingDataBinance:
                     "id": 1,
                 }
 
+                if self.capture_path and self.frame_recorder is None:
+                    self.frame_recorder = FrameRecorder(self.capture_path)
+
                 while True:
 
                     ws_channel = ["abnormaltradingnotices"]
@@ -92,21 +112,25 @@ class StreamingDataBinance:
 
                     while True:
 
-                        # Receive WebSocket messages
-                        message: bytes = await self.websocket_client.recv()
-                        message: dict = orjson.loads(message)
+                        # Receive WebSocket messages (raw bytes, no utf-8 decode)
+                        frame: bytes = await self.websocket_client.recv(decode=False)
+
+                        if self.frame_recorder:
+                            self.frame_recorder.record(frame, time.monotonic_ns())
+
+                        # stream frames stay undecoded until a handler reads data
+                        message = parsing_subscription_frame(
+                            frame,
+                            exchange,
+                            self.sub_account_id,
+                        )
 
                         if message:
-                            
-                            data = message.get("data", None)
-                            
-                            if data:
-                                
-                                data.update({"exchange": exchange})
-                                data.update({"account_id": self.sub_account_id})
-                          
-                                # queing message to dispatcher
-                                await queue_general.put(data)
+
+                            counting_frame(exchange, message.channel)
+
+                            # queing message to dispatcher
+                            await queue_general.put(message)
 
             except Exception as error:
 
@@ -117,6 +141,11 @@ class StreamingDataBinance:
                     "general_error",
                 )
 
+            finally:
+
+                if self.frame_recorder:
+                    self.frame_recorder.closing()
+
 
     async def ws_operation(
         self,
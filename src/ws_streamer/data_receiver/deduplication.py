@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+First-arrival deduplication for channels subscribed over two connections.
+
+The same event reaches us over two independent TCP paths. Whichever copy
+arrives first is queued, the later copy is dropped and only used to
+measure how much earlier the winner was.
+
+dedup keys:
+    user.orders         order_id + order_state + last_update_timestamp
+    user.trades         trade_id(s)
+    incremental_ticker  channel + change_id (or timestamp)
+"""
+
+# built ins
+import time
+from collections import deque
+
+# installed
+from dataclassy import dataclass
+
+MAX_PENDING_KEYS = 10_000  # first arrivals kept while waiting for the twin
+MAX_ADVANTAGE_SAMPLES = 10_000
+MAX_SEEN_TRADES = 10_000  # trade ids remembered for backfill dedup
+
+
+def is_redundant_channel(channel: str) -> bool:
+    """
+    latency critical channels subscribed over both connections
+    """
+
+    return (
+        channel.startswith("user.orders")
+        or channel.startswith("user.trades")
+        or (channel.startswith("incremental_ticker") and "PERPETUAL" in channel)
+    )
+
+
+def building_dedup_key(message_params: dict) -> tuple:
+    """ """
+
+    channel: str = message_params["channel"]
+
+    data = message_params["data"]
+
+    if channel.startswith("user.trades"):
+        trades = data if isinstance(data, list) else [data]
+        return (channel, tuple(o["trade_id"] for o in trades))
+
+    if channel.startswith("user.orders"):
+        orders = data if isinstance(data, list) else [data]
+        return (
+            channel,
+            tuple(
+                (o["order_id"], o["order_state"], o.get("last_update_timestamp"))
+                for o in orders
+            ),
+        )
+
+    return (channel, data.get("change_id", data.get("timestamp")))
+
+
+def percentile(
+    sorted_samples: list,
+    quantile: float,
+) -> float:
+    """ """
+
+    if not sorted_samples:
+        return 0
+
+    index = min(len(sorted_samples) - 1, int(quantile * len(sorted_samples)))
+
+    return sorted_samples[index]
+
+
+@dataclass(slots=True)
+class FirstArrivalDeduplicator:
+    """
+    Shared by every connection reader of one account.
+
+    Usage:
+        if deduplicator.is_first_arrival(message_params, "ws-0", received_at):
+            await queue_general.put(message_params)
+    """
+
+    max_pending_keys: int = MAX_PENDING_KEYS
+    # Instance Variables
+    pending: dict = {}
+    first_arrivals: dict = {}
+    duplicates: int = 0
+    advantages_ns: deque = None
+    # trade_id: None, oldest first. Live or backfilled, on any connection
+    seen_trades: dict = {}
+
+    def __post_init__(self):
+        self.advantages_ns = deque(maxlen=MAX_ADVANTAGE_SAMPLES)
+
+    def is_first_arrival(
+        self,
+        message_params: dict,
+        connection_name: str,
+        received_at: int = None,
+    ) -> bool:
+        """
+        received_at: monotonic ns. Stamped here if not provided
+        """
+
+        if not is_redundant_channel(message_params["channel"]):
+            return True
+
+        if received_at is None:
+            received_at = time.monotonic_ns()
+
+        key = building_dedup_key(message_params)
+
+        if message_params["channel"].startswith("user.trades"):
+            self.marking_trades(key[1])
+
+        first = self.pending.pop(key, None)
+
+        if first is None:
+
+            self.pending[key] = (connection_name, received_at)
+
+            self.first_arrivals[connection_name] = (
+                self.first_arrivals.get(connection_name, 0) + 1
+            )
+
+            # the twin never came (connection down, message lost): forget oldest
+            if len(self.pending) > self.max_pending_keys:
+                del self.pending[next(iter(self.pending))]
+
+            return True
+
+        first_connection, first_received_at = first
+
+        # a repeat on the same connection is not a race, treat it as new
+        if first_connection == connection_name:
+            self.pending[key] = first
+            return True
+
+        self.duplicates += 1
+
+        self.advantages_ns.append(received_at - first_received_at)
+
+        return False
+
+    def marking_trades(self, trade_ids: tuple) -> None:
+        """ """
+
+        for trade_id in trade_ids:
+            self.seen_trades[trade_id] = None
+
+        while len(self.seen_trades) > MAX_SEEN_TRADES:
+            del self.seen_trades[next(iter(self.seen_trades))]
+
+    def claiming_trades(self, trades: list) -> list:
+        """
+        backfilled trades no connection delivered yet, marked as seen:
+        a gap backfill never repeats a live fill
+        """
+
+        trades = [o for o in trades if o["trade_id"] not in self.seen_trades]
+
+        self.marking_trades(tuple(o["trade_id"] for o in trades))
+
+        return trades
+
+    def stats(self) -> dict:
+        """
+        win_rate: share of first arrivals per connection
+        advantage_us: how much earlier the winning copy was
+        """
+
+        total = sum(self.first_arrivals.values())
+
+        advantages = sorted(self.advantages_ns)
+
+        return dict(
+            first_arrivals=dict(self.first_arrivals),
+            win_rate={
+                connection: (wins / total if total else 0)
+                for connection, wins in self.first_arrivals.items()
+            },
+            duplicates=self.duplicates,
+            advantage_us=dict(
+                p50=percentile(advantages, 0.5) / 1000,
+                p99=percentile(advantages, 0.99) / 1000,
+                max=(advantages[-1] / 1000) if advantages else 0,
+            ),
+        )
+
+    def collecting_metrics(self) -> list:
+        """
+        metrics collector (see utilities.metrics.registering_collector)
+        """
+
+        stats = self.stats()
+
+        return [
+            (
+                "ws_streamer_redundant_first_arrivals_total",
+                "counter",
+                "frames a connection delivered first",
+                {
+                    (("connection", connection),): wins
+                    for connection, wins in stats["first_arrivals"].items()
+                },
+            ),
+            (
+                "ws_streamer_redundant_duplicates_total",
+                "counter",
+                "late copies dropped",
+                {(): stats["duplicates"]},
+            ),
+            (
+                "ws_streamer_redundant_advantage_us",
+                "gauge",
+                "how much earlier the winning copy arrived",
+                {
+                    (("quantile", quantile),): value
+                    for quantile, value in stats["advantage_us"].items()
+                },
+            ),
+        ]
@@ -3,6 +3,8 @@
 # built ins
 import asyncio
 import json
+import random
+import time
 from datetime import datetime, timedelta, timezone
 
 # installed
@@ -10,20 +12,114 @@ import orjson
 import uvloop
 import websockets
 from dataclassy import dataclass, fields
+from loguru import logger as log
 
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 # user defined formula
 from ws_streamer.configuration import config, config_oci
-from ws_streamer.messaging.telegram_bot import telegram_bot_sendtext
-from ws_streamer.restful_api.deribit import api_requests
-from ws_streamer.utilities import string_modification as str_mod, system_tools
+from ws_streamer.data_receiver.deduplication import (
+    FirstArrivalDeduplicator,
+    is_redundant_channel,
+)
+from ws_streamer.data_receiver.deribit_sharding import allocating_channels
+from ws_streamer.data_receiver.frame_batching import (
+    MAX_BATCH,
+    decoding_frames,
+    draining_frames,
+)
+from ws_streamer.data_receiver.frame_capture import FrameRecorder
+from ws_streamer.data_receiver.subscription_reconciler import SubscriptionReconciler
+from ws_streamer.messaging.telegram_bot import alerting, telegram_bot_sendtext
+from ws_streamer.restful_api import resilience
+from ws_streamer.restful_api.deribit import api_requests, rate_limiting
+from ws_streamer.restful_api.deribit.ohlc_backfilling import resolution_in_ms
+from ws_streamer.restful_api.deribit.ws_rpc import WsRpcTransport
+from ws_streamer.utilities import (
+    metrics,
+    profiling,
+    string_modification as str_mod,
+    system_tools,
+)
+from ws_streamer.utilities.latency_tracing import counting_frame, stamping_frame
+from ws_streamer.utilities.lazy_message import LazyMessage, parsing_deribit_frame
+from ws_streamer.utilities.priority_lanes import putting_batch
+
+
+MIN_RECONNECT_DELAY = 0.5  # seconds
+MAX_RECONNECT_DELAY = 60  # seconds
+STABLE_CONNECTION_SECONDS = 60  # connected this long: backoff starts over
+BACKFILL_DEADLINE = 60  # seconds
+
+RECONNECTS = metrics.counter(
+    "ws_streamer_reconnects_total",
+    "WebSocket connections lost and re-established",
+    ("exchange", "connection"),
+)
 
 
 def parse_dotenv(sub_account: str) -> dict:
     return config.main_dotenv(sub_account)
 
 
+def reconnect_delay(
+    attempt: int,
+    max_delay: float = MAX_RECONNECT_DELAY,
+) -> float:
+    """
+    exponential backoff with full jitter:
+    uniform between MIN_RECONNECT_DELAY and
+    min(max_delay, MIN_RECONNECT_DELAY * 2 ** attempt)
+    """
+
+    ceiling = min(max_delay, MIN_RECONNECT_DELAY * 2 ** min(attempt, 16))
+
+    return random.uniform(MIN_RECONNECT_DELAY, max(MIN_RECONNECT_DELAY, ceiling))
+
+
+def building_ws_channels(
+    futures_instruments: dict,
+    resolutions: list,
+) -> list:
+    """ """
+
+    instruments_name = futures_instruments["instruments_name"]
+
+    ws_instruments = []
+
+    instrument_kinds = ["future, future_combo"]
+
+    for kind in instrument_kinds:
+
+        user_changes = f"user.changes.{kind}.any.raw"
+        ws_instruments.append(user_changes)
+
+    orders = f"user.orders.any.any.raw"
+    ws_instruments.append(orders)
+    trades = f"user.trades.any.any.raw"
+    ws_instruments.append(trades)
+
+    for instrument in instruments_name:
+
+        if "PERPETUAL" in instrument:
+
+            currency = str_mod.extract_currency_from_text(instrument)
+            portfolio = f"user.portfolio.{currency}"
+
+            ws_instruments.append(portfolio)
+
+            for resolution in resolutions:
+
+                ws_chart = f"chart.trades.{instrument}.{resolution}"
+                ws_instruments.append(ws_chart)
+
+        incremental_ticker = f"incremental_ticker.{instrument}"
+
+        ws_instruments.append(incremental_ticker)
+
+    return ws_instruments
+
+
 @dataclass(unsafe_hash=True, slots=True)
 class StreamingAccountData:
     """ """
@@ -38,8 +134,46 @@ class StreamingAccountData:
     websocket_client: websockets.WebSocketClientProtocol = None
     refresh_token: str = None
     refresh_token_expiry_time: int = None
+    # Raw frame capture (None: disabled)
+    capture_path: str = None
+    frame_recorder: FrameRecorder = None
+    # Subscription sharding (1: every channel on one connection)
+    shard_count: int = 1
+    sharding_policy: str = "private_dedicated"
+    # Redundant feed: user.orders/trades and perpetual tickers over 2 connections
+    redundant: bool = False
+    # the extra connection racing them (its channels are all on another one)
+    is_redundant_feed: bool = False
+    connection_name: str = "ws-0"
+    deduplicator: FirstArrivalDeduplicator = None
+    # Connection supervisor
+    max_reconnect_delay: float = MAX_RECONNECT_DELAY
+    refresh_task: asyncio.Task = None
+    backfill_task: asyncio.Task = None
+    # unix ms, start of a gap whose backfill was cut short by a disconnection
+    backfill_since: int = None
+    last_received_at: int = None
+    instruments_name: list = None
+    # channels of this connection, kept current by the subscription reconciler
+    ws_channels: list = None
+    reconcile_task: asyncio.Task = None
+    # Batched receive: drain all buffered frames, one decode, one queue put
+    batch_frames: bool = False
+    max_batch: int = MAX_BATCH
+    # Header-only parsing of subscription frames, payload decoded on first read
+    lazy_frames: bool = True
+    # Latency tracing: also stamp the payload timestamp (network latency)
+    trace_exchange_time: bool = False
+    # Private JSON-RPC calls (SendApiRequest) over this connection once
+    # authenticated. Kept on the first connection only, not on siblings
+    rpc_transport: WsRpcTransport = None
 
     def __post_init__(self):
+
+        # credentials already known (extra connection of the same account)
+        if isinstance(self.client_id, str) and isinstance(self.client_secret, str):
+            return
+
         self.client_id: str = parse_dotenv(self.sub_account_id)["client_id"]
         self.client_secret: str = config_oci.get_oci_key(
             parse_dotenv(self.sub_account_id)["key_ocid"]
@@ -51,6 +185,244 @@ class StreamingAccountData:
         queue_general: object,
         futures_instruments,
         resolutions: list,
+        fetching_instruments: callable = None,
+    ) -> None:
+        """
+        fetching_instruments: coroutine function returning futures_instruments
+        (get_futures_instruments of the same currencies and settlement
+        periods). When given, listed and expired instruments are
+        subscribed and unsubscribed as they come and go
+        """
+
+        metrics.starting_server("deribit")
+
+        profiling.starting_control()
+
+        ws_channels = building_ws_channels(futures_instruments, resolutions)
+
+        self.instruments_name = futures_instruments["instruments_name"]
+
+        if self.capture_path and self.frame_recorder is None:
+            self.frame_recorder = FrameRecorder(self.capture_path)
+
+        if self.shard_count <= 1 and not self.redundant:
+
+            self.reconciling_subscriptions(
+                [self],
+                exchange,
+                queue_general,
+                resolutions,
+                fetching_instruments,
+            )
+
+            await self.streaming_channels(
+                exchange,
+                queue_general,
+                ws_channels,
+            )
+
+            return
+
+        shards = allocating_channels(
+            ws_channels,
+            self.shard_count,
+            self.sharding_policy,
+        )
+
+        redundant_channels = []
+
+        # latency critical channels are raced over one more connection
+        if self.redundant:
+
+            self.deduplicator = FirstArrivalDeduplicator()
+
+            redundant_channels = [o for o in ws_channels if is_redundant_channel(o)]
+
+            if redundant_channels:
+                shards.append(redundant_channels)
+
+            self.loop.create_task(self.logging_redundancy_stats())
+
+            metrics.registering_collector(
+                self.deduplicator.collecting_metrics, "redundant_feed"
+            )
+
+        log.info(f"{len(shards)} connections: {[len(o) for o in shards]} channels")
+
+        connections = [self] + [
+            self.spawning_connection(f"ws-{i}") for i in range(1, len(shards))
+        ]
+
+        if redundant_channels:
+            connections[-1].is_redundant_feed = True
+
+        self.reconciling_subscriptions(
+            connections,
+            exchange,
+            queue_general,
+            resolutions,
+            fetching_instruments,
+            connections[-1] if redundant_channels else None,
+        )
+
+        # every connection has its own reader task, all feeding queue_general
+        await asyncio.gather(
+            *[
+                connection.streaming_channels(
+                    exchange,
+                    queue_general,
+                    shard_channels,
+                )
+                for connection, shard_channels in zip(connections, shards)
+            ]
+        )
+
+    def reconciling_subscriptions(
+        self,
+        connections: list,
+        exchange,
+        queue_general: object,
+        resolutions: list,
+        fetching_instruments: callable = None,
+        redundant_connection: "StreamingAccountData" = None,
+    ) -> None:
+        """one reconciler task over every connection of the account"""
+
+        if fetching_instruments is None or self.reconcile_task is not None:
+            return
+
+        reconciler = SubscriptionReconciler(
+            connections,
+            fetching_instruments,
+            lambda futures_instruments: building_ws_channels(
+                futures_instruments, resolutions
+            ),
+            queue_general,
+            exchange,
+            redundant_connection,
+        )
+
+        self.reconcile_task = self.loop.create_task(reconciler.running())
+
+    async def logging_redundancy_stats(
+        self,
+        interval: int = 300,
+    ) -> None:
+        """ """
+
+        while True:
+
+            await asyncio.sleep(interval)
+
+            log.info(f"redundant feed {self.deduplicator.stats()}")
+
+    def spawning_connection(
+        self,
+        connection_name: str,
+    ) -> "StreamingAccountData":
+        """
+        A sibling instance for an extra connection: same credentials,
+        frame recorder and deduplicator, its own socket and auth state
+        """
+
+        return StreamingAccountData(
+            self.sub_account_id,
+            self.client_id,
+            self.client_secret,
+            ws_connection_url=self.ws_connection_url,
+            frame_recorder=self.frame_recorder,
+            connection_name=connection_name,
+            deduplicator=self.deduplicator,
+            max_reconnect_delay=self.max_reconnect_delay,
+            instruments_name=self.instruments_name,
+            batch_frames=self.batch_frames,
+            max_batch=self.max_batch,
+            lazy_frames=self.lazy_frames,
+            trace_exchange_time=self.trace_exchange_time,
+        )
+
+    async def streaming_channels(
+        self,
+        exchange,
+        queue_general: object,
+        ws_channels: list,
+    ) -> None:
+        """
+        Connection supervisor: keeps one connection of ws_channels alive.
+
+        A dropped connection is re-established with jittered exponential
+        backoff, re-authenticated and re-subscribed. What was published
+        while we were away (candles, own fills) is then backfilled through
+        the REST API, so downstream caches need no full reload.
+        """
+
+        reconnect_attempt = 0
+
+        # the same list object: the reconciler edits it, reconnections
+        # subscribe what it holds then
+        self.ws_channels = ws_channels
+
+        try:
+
+            while True:
+
+                connected_at = time.monotonic()
+
+                try:
+
+                    await self.receiving_channels(
+                        exchange,
+                        queue_general,
+                        ws_channels,
+                    )
+
+                except asyncio.CancelledError:
+                    raise
+
+                except Exception as error:
+
+                    system_tools.parse_error_message(error)
+
+                    RECONNECTS.labels(exchange, self.connection_name).inc()
+
+                    # connected long enough: a new outage, backoff starts over
+                    if time.monotonic() - connected_at > STABLE_CONNECTION_SECONDS:
+                        reconnect_attempt = 0
+
+                    # once per outage, not once per attempt
+                    if reconnect_attempt == 0:
+                        await alerting(
+                            f"data producer {self.connection_name} - {error}",
+                        )
+
+                finally:
+                    self.cancelling_refresh_task()
+                    self.cancelling_backfill_task()
+
+                    if self.rpc_transport:
+                        self.rpc_transport.detaching()
+
+                delay = reconnect_delay(reconnect_attempt, self.max_reconnect_delay)
+
+                reconnect_attempt += 1
+
+                log.warning(
+                    f"{self.connection_name} reconnecting in {delay:.1f}s"
+                    f" (attempt {reconnect_attempt})"
+                )
+
+                await asyncio.sleep(delay)
+
+        finally:
+
+            if self.frame_recorder:
+                self.frame_recorder.closing()
+
+    async def receiving_channels(
+        self,
+        exchange,
+        queue_general: object,
+        ws_channels: list,
     ) -> None:
 
         async with websockets.connect(
@@ -60,221 +432,432 @@ class StreamingAccountData:
             close_timeout=60,
         ) as self.websocket_client:
 
-            try:
+            # a fresh connection starts unauthenticated
+            self.refresh_token = None
+            self.refresh_token_expiry_time = None
 
-                instruments_name = futures_instruments["instruments_name"]
+            # Authenticate WebSocket Connection
+            await self.ws_auth()
 
-                while True:
+            # Establish Heartbeat
+            await self.establish_heartbeat()
 
-                    # Authenticate WebSocket Connection
-                    await self.ws_auth()
+            # Start Authentication Refresh Task (exactly one per connection)
+            self.cancelling_refresh_task()
+            self.refresh_task = self.loop.create_task(self.ws_refresh_auth())
 
-                    # Establish Heartbeat
-                    await self.establish_heartbeat()
+            await self.ws_operation(
+                operation="subscribe",
+                ws_channel=ws_channels,
+                source="ws-combination",
+            )
 
-                    # Start Authentication Refresh Task
-                    self.loop.create_task(self.ws_refresh_auth())
+            # reconnected: fetch what was missed while disconnected
+            if self.last_received_at is not None:
 
-                    ws_instruments = []
+                now_unix = time.time_ns() // 1_000_000
 
-                    instrument_kinds = ["future, future_combo"]
-                    
-                    for kind in instrument_kinds:
+                # last frame of the previous connection, in unix ms
+                gap_start = (
+                    now_unix
+                    - (time.monotonic_ns() - self.last_received_at) // 1_000_000
+                )
 
-                        user_changes = f"user.changes.{kind}.any.raw"
-                        ws_instruments.append(user_changes)
+                # the previous backfill was cancelled: its gap is still open
+                if self.backfill_since is not None:
+                    gap_start = min(gap_start, self.backfill_since)
 
-                    orders = f"user.orders.any.any.raw"
-                    ws_instruments.append(orders)
-                    trades = f"user.trades.any.any.raw"
-                    ws_instruments.append(trades)
+                self.backfill_since = gap_start
 
-                    for instrument in instruments_name:
+                self.backfill_task = self.loop.create_task(
+                    self.backfilling_gap(
+                        exchange,
+                        queue_general,
+                        ws_channels,
+                        gap_start,
+                        now_unix,
+                    )
+                )
+
+            while True:
 
-                        if "PERPETUAL" in instrument:
+                if self.batch_frames:
 
-                            currency = str_mod.extract_currency_from_text(instrument)
-                            portfolio = f"user.portfolio.{currency}"
+                    # Receive every frame already buffered on the connection
+                    frames: list = await draining_frames(
+                        self.websocket_client,
+                        self.max_batch,
+                    )
 
-                            ws_instruments.append(portfolio)
+                else:
 
-                            for resolution in resolutions:
+                    # Receive WebSocket messages (raw bytes, no utf-8 decode)
+                    frames: list = [await self.websocket_client.recv(decode=False)]
 
-                                ws_chart = f"chart.trades.{instrument}.{resolution}"
-                                ws_instruments.append(ws_chart)
+                received_at = time.monotonic_ns()
 
-                        incremental_ticker = f"incremental_ticker.{instrument}"
+                if self.lazy_frames:
+                    # only channel and method are read, payloads stay encoded
+                    messages: list = [parsing_deribit_frame(o) for o in frames]
 
-                        ws_instruments.append(incremental_ticker)
+                elif self.batch_frames:
+                    messages: list = decoding_frames(frames)
 
-                    await self.ws_operation(
-                        operation="subscribe",
-                        ws_channel=ws_instruments,
-                        source="ws-combination",
+                else:
+                    messages: list = [orjson.loads(frames[0])]
+
+                self.last_received_at = received_at
+
+                if self.frame_recorder:
+                    for frame in frames:
+                        self.frame_recorder.record(frame, received_at)
+
+                message_batch = []
+
+                for message in messages:
+
+                    message_params = await self.handling_message(
+                        message,
+                        exchange,
+                        received_at,
                     )
 
-                    while True:
+                    if message_params:
+                        message_batch.append(message_params)
 
-                        # Receive WebSocket messages
-                        message: bytes = await self.websocket_client.recv()
-                        message: dict = orjson.loads(message)
+                if not message_batch:
+                    continue
 
-                        if "id" in list(message):
-                            if message["id"] == 9929:
+                # queing message to dispatcher
+                if self.batch_frames:
+                    await putting_batch(queue_general, message_batch)
 
-                                if self.refresh_token is None:
-                                    print(
-                                        "Successfully authenticated WebSocket Connection"
-                                    )
+                else:
+                    await queue_general.put(message_batch[0])
 
-                                else:
-                                    print(
-                                        "Successfully refreshed the authentication of the WebSocket Connection"
-                                    )
+    async def handling_message(
+        self,
+        message: dict,
+        exchange: str,
+        received_at: int,
+    ) -> dict:
+        """
+        Answer control frames (auth, heartbeat) and return the params of a
+        subscription frame, ready for the dispatcher (None otherwise).
+
+        message examples:
+
+        incremental_ticker = {
+            'channel': 'incremental_ticker.BTC-7FEB25',
+            'data': {
+                'timestamp': 1738407481107,
+                'type': 'snapshot',
+                'state': 'open',
+                'stats': {
+                    'high': 106245.0,
+                    'low': 101550.0,
+                    'price_change': -2.6516,
+                    'volume': 107.12364526,
+                    'volume_usd': 11081110.0,
+                    'volume_notional': 11081110.0
+                    },
+                    'index_price': 101645.32,
+                    'instrument_name': 'BTC-7FEB25',
+                    'last_price': 101787.5,
+                    'settlement_price': 102285.5,
+                    'min_price': 100252.5,
+                    'max_price': 103310.0,
+                    'open_interest': 18836380,
+                    'mark_price': 101781.52,
+                    'best_ask_price': 101780.0,
+                    'best_bid_price': 101775.0,
+                    'estimated_delivery_price': 101645.32,
+                    'best_ask_amount': 15500.0,
+                    'best_bid_amount': 11310.0
+                    }
+                    }
 
-                                self.refresh_token = message["result"]["refresh_token"]
+        chart.trades = {
+            'channel': 'chart.trades.BTC-PERPETUAL.1',
+            'data': {
+                'close': 101650.5,
+                'high': 101650.5,
+                'low': 101650.5,
+                'open': 101650.5,
+                'tick': 1738407480000,
+                'cost': 0.0,
+                'volume': 0.0}
+                }
+
+        portfolio = {
+            'channel': 'user.portfolio.btc',
+            'data': {
+                'options_pl': 0.0,
+                'balance': 0.00214241,
+                'session_rpl': 0.0,
+                'initial_margin': 0.00075353,
+                'additional_reserve': 0.0,
+                'spot_reserve': 0.0,
+                'futures_pl': -1.442e-05,
+                'total_delta_total_usd': 193.408186282,
+                'total_maintenance_margin_usd': 53.465166986729,
+                'options_theta_map': {},
+                'projected_delta_total': 0.002373,
+                'options_gamma': 0.0,
+                'total_pl': -1.442e-05,
+                'options_gamma_map': {},
+                'projected_initial_margin': 0.00075353,
+                'options_session_rpl': 0.0,
+                'options_session_upl': 0.0,
+                'total_margin_balance_usd': 273.683871785,
+                'equity': 0.00213253,
+                'cross_collateral_enabled': True,
+                'delta_total': 0.002373,
+                'delta_total_map': {
+                    'btc_usd': 0.002373282},
+                    'options_value': 0.0,
+                    'total_equity_usd': 273.683871785,
+                    'locked_balance': 0.0,
+                    'margin_balance': 0.00269254,
+                    'available_withdrawal_funds': 0.00203902,
+                    'options_delta': 0.0,
+                    'currency': 'BTC',
+                    'fee_balance': 0.0,
+                    'options_vega_map': {},
+                    'available_funds': 0.00193902,
+                    'maintenance_margin': 0.000526,
+                    'futures_session_rpl': 0.0,
+                    'total_initial_margin_usd': 76.592212527,
+                    'session_upl': -9.88e-06,
+                    'options_vega': 0.0,
+                    'options_theta': 0.0,
+                    'futures_session_upl': -9.88e-06,
+                    'portfolio_margining_enabled': True,
+                    'projected_maintenance_margin': 0.000526,
+                    'margin_model': 'cross_pm'
+                    }
+                    }
+        """
 
-                                # Refresh Authentication well before the required datetime
-                                if message["testnet"]:
-                                    expires_in: int = 300
-                                else:
-                                    expires_in: int = (
-                                        message["result"]["expires_in"] - 240
-                                    )
+        if isinstance(message, LazyMessage):
+            # subscription frame kept undecoded, it stands in for its params
+            message_params = message
 
-                                now_utc: int = datetime.now(timezone.utc)
+        else:
+            message_params = await self.handling_control_message(message)
 
-                                self.refresh_token_expiry_time = now_utc + timedelta(
-                                    seconds=expires_in
-                                )
+        if not message_params:
+            return None
 
-                            elif message["id"] == 8212:
-                                # Avoid logging Heartbeat messages
-                                continue
-
-                        elif "method" in list(message):
-                            # Respond to Heartbeat Message
-                            if message["method"] == "heartbeat":
-                                await self.heartbeat_response()
-
-                        if "params" in list(message):
-
-                            if message["method"] != "heartbeat":
-
-                                message_params: dict = message["params"]
-                                
-                                if message_params:
-
-                                    message_params.update({"exchange": exchange})
-                                    message_params.update({"account_id": self.sub_account_id})
-                                        
-                                    # queing message to dispatcher
-                                    await queue_general.put(message_params)
-
-                                """
-                                    message examples:
-                                    
-                                    incremental_ticker = {
-                                        'channel': 'incremental_ticker.BTC-7FEB25', 
-                                        'data': {
-                                            'timestamp': 1738407481107, 
-                                            'type': 'snapshot', 
-                                            'state': 'open',
-                                            'stats': {
-                                                'high': 106245.0, 
-                                                'low': 101550.0, 
-                                                'price_change': -2.6516, 
-                                                'volume': 107.12364526, 
-                                                'volume_usd': 11081110.0, 
-                                                'volume_notional': 11081110.0
-                                                }, 
-                                                'index_price': 101645.32,
-                                                'instrument_name': 'BTC-7FEB25', 
-                                                'last_price': 101787.5, 
-                                                'settlement_price': 102285.5, 
-                                                'min_price': 100252.5,
-                                                'max_price': 103310.0,
-                                                'open_interest': 18836380, 
-                                                'mark_price': 101781.52,
-                                                'best_ask_price': 101780.0, 
-                                                'best_bid_price': 101775.0,
-                                                'estimated_delivery_price': 101645.32,
-                                                'best_ask_amount': 15500.0, 
-                                                'best_bid_amount': 11310.0
-                                                }
-                                                }
-                                            
-                                    chart.trades = {
-                                        'channel': 'chart.trades.BTC-PERPETUAL.1', 
-                                        'data': {
-                                            'close': 101650.5, 
-                                            'high': 101650.5, 
-                                            'low': 101650.5, 
-                                            'open': 101650.5, 
-                                            'tick': 1738407480000, 
-                                            'cost': 0.0, 
-                                            'volume': 0.0}
-                                            }
-                                            
-                                    portfolio = {
-                                        'channel': 'user.portfolio.btc', 
-                                        'data': {
-                                            'options_pl': 0.0, 
-                                            'balance': 0.00214241, 
-                                            'session_rpl': 0.0,
-                                            'initial_margin': 0.00075353, 
-                                            'additional_reserve': 0.0, 
-                                            'spot_reserve': 0.0, 
-                                            'futures_pl': -1.442e-05,
-                                            'total_delta_total_usd': 193.408186282, 
-                                            'total_maintenance_margin_usd': 53.465166986729, 
-                                            'options_theta_map': {}, 
-                                            'projected_delta_total': 0.002373, 
-                                            'options_gamma': 0.0, 
-                                            'total_pl': -1.442e-05, 
-                                            'options_gamma_map': {},
-                                            'projected_initial_margin': 0.00075353, 
-                                            'options_session_rpl': 0.0,
-                                            'options_session_upl': 0.0, 
-                                            'total_margin_balance_usd': 273.683871785, 
-                                            'equity': 0.00213253, 
-                                            'cross_collateral_enabled': True, 
-                                            'delta_total': 0.002373, 
-                                            'delta_total_map': {
-                                                'btc_usd': 0.002373282}, 
-                                                'options_value': 0.0, 
-                                                'total_equity_usd': 273.683871785,
-                                                'locked_balance': 0.0, 
-                                                'margin_balance': 0.00269254, 
-                                                'available_withdrawal_funds': 0.00203902,
-                                                'options_delta': 0.0,
-                                                'currency': 'BTC', 
-                                                'fee_balance': 0.0,
-                                                'options_vega_map': {}, 
-                                                'available_funds': 0.00193902, 
-                                                'maintenance_margin': 0.000526, 
-                                                'futures_session_rpl': 0.0, 
-                                                'total_initial_margin_usd': 76.592212527, 
-                                                'session_upl': -9.88e-06, 
-                                                'options_vega': 0.0, 
-                                                'options_theta': 0.0,
-                                                'futures_session_upl': -9.88e-06,
-                                                'portfolio_margining_enabled': True, 
-                                                'projected_maintenance_margin': 0.000526, 
-                                                'margin_model': 'cross_pm'
-                                                }
-                                                }
-                                    """
-
-            except Exception as error:
-
-                system_tools.parse_error_message(error)
-
-                await telegram_bot_sendtext(
-                    (f"""data producer - {error}"""),
-                    "general_error",
+        counting_frame(exchange, message_params["channel"])
+
+        # the twin connection was faster
+        if self.deduplicator and not (
+            self.deduplicator.is_first_arrival(
+                message_params,
+                self.connection_name,
+                received_at,
+            )
+        ):
+            return None
+
+        message_params["exchange"] = exchange
+        message_params["account_id"] = self.sub_account_id
+
+        stamping_frame(message_params, received_at, self.trace_exchange_time)
+
+        return message_params
+
+    async def handling_control_message(
+        self,
+        message: dict,
+    ) -> dict:
+        """
+        Answer control frames (auth, heartbeat), params of a decoded
+        subscription frame (None otherwise)
+        """
+
+        if "id" in message:
+
+            # answer to a SendApiRequest call made over this connection
+            if self.rpc_transport and self.rpc_transport.resolving(message):
+                return None
+
+            if message["id"] == 9929:
+
+                if self.refresh_token is None:
+                    print("Successfully authenticated WebSocket Connection")
+
+                    if self.rpc_transport:
+                        self.rpc_transport.attaching(
+                            self.websocket_client,
+                            rate_limiting.limiter_for(self.client_id),
+                        )
+
+                else:
+                    print(
+                        "Successfully refreshed the authentication of the WebSocket Connection"
+                    )
+
+                self.refresh_token = message["result"]["refresh_token"]
+
+                # Refresh Authentication well before the required datetime
+                if message["testnet"]:
+                    expires_in: int = 300
+                else:
+                    expires_in: int = message["result"]["expires_in"] - 240
+
+                now_utc: int = datetime.now(timezone.utc)
+
+                self.refresh_token_expiry_time = now_utc + timedelta(
+                    seconds=expires_in
                 )
 
+            # responses (auth, subscribe, Heartbeat test) carry no data
+            return None
+
+        method = message.get("method", None)
+
+        # Respond to Heartbeat Message
+        if method == "heartbeat":
+            await self.heartbeat_response()
+            return None
+
+        if not method:
+            return None
+
+        return message.get("params", None)
+
+    def rate_limiter(self) -> rate_limiting.CreditLimiter:
+        """credits of this account, shared with its REST calls"""
+
+        return rate_limiting.limiter_for(self.client_id)
+
+    def cancelling_refresh_task(self) -> None:
+        """ """
+
+        if self.refresh_task is not None:
+            self.refresh_task.cancel()
+            self.refresh_task = None
+
+    def cancelling_backfill_task(self) -> None:
+        """ """
+
+        if self.backfill_task is not None:
+            self.backfill_task.cancel()
+            self.backfill_task = None
+
+    async def backfilling_gap(
+        self,
+        exchange,
+        queue_general: object,
+        ws_channels: list,
+        gap_start: int,
+        gap_end: int,
+    ) -> None:
+        """
+        Queue what was published during a disconnection, shaped like the
+        frames the socket would have delivered:
+            chart.trades    -> get_ohlc_data
+            user.trades     -> get_user_trades_by_instrument_and_time
+
+        gap_start, gap_end: unix ms
+
+        The redundant feed never backfills: the connection it races
+        delivered its channels meanwhile. Backfilled trades go through the
+        deduplicator, so none already delivered live is queued again.
+
+        Cancelled when the connection drops again: the next connection
+        backfills from gap_start on
+        """
+
+        if self.is_redundant_feed:
+            self.backfill_since = None
+            return
+
+        try:
+
+            # every REST call below (retries included) ends by then
+            with resilience.deadline(BACKFILL_DEADLINE):
+
+                chart_channels = [o for o in ws_channels if o.startswith("chart.trades.")]
+
+                trades_channels = [o for o in ws_channels if o.startswith("user.trades.")]
+
+                log.info(
+                    f"{self.connection_name} backfilling {(gap_end - gap_start) / 1000:.1f}s gap"
+                )
+
+                candles_all = await asyncio.gather(
+                    *[
+                        api_requests.get_ohlc_data(
+                            channel.split(".")[2],
+                            channel.split(".")[3],
+                            # the candle open at disconnection was still moving
+                            gap_start - resolution_in_ms(channel.split(".")[3]),
+                            gap_end,
+                        )
+                        for channel in chart_channels
+                    ]
+                )
+
+                for channel, candles in zip(chart_channels, candles_all):
+
+                    for candle in candles:
+
+                        await queue_general.put(
+                            dict(
+                                channel=channel,
+                                data=candle,
+                                exchange=exchange,
+                                account_id=self.sub_account_id,
+                            )
+                        )
+
+                if trades_channels and self.instruments_name:
+
+                    private_data = api_requests.SendApiRequest(
+                        self.sub_account_id,
+                        self.client_id,
+                        self.client_secret,
+                        transport=self.rpc_transport,
+                    )
+
+                    trades_all = await asyncio.gather(
+                        *[
+                            private_data.get_user_trades_by_instrument_and_time(
+                                instrument_name,
+                                gap_start,
+                            )
+                            for instrument_name in self.instruments_name
+                        ]
+                    )
+
+                    for trades in trades_all:
+
+                        if trades and self.deduplicator:
+                            trades = self.deduplicator.claiming_trades(trades)
+
+                        if trades:
+
+                            await queue_general.put(
+                                dict(
+                                    channel=trades_channels[0],
+                                    data=trades,
+                                    exchange=exchange,
+                                    account_id=self.sub_account_id,
+                                )
+                            )
+
+        except Exception as error:
+
+            system_tools.parse_error_message(error)
+
+            await alerting(f"data producer backfilling - {error}")
+
+        # done (or given up on): the next gap starts at the next disconnection
+        self.backfill_since = None
+
     async def establish_heartbeat(self) -> None:
         """
         reference: https://github.com/ElliotP123/crypto-exchange-code-samples/blob/master/deribit/websockets/dbt-ws-authenticated-example.py
@@ -290,6 +873,8 @@ class StreamingAccountData:
         }
 
         try:
+            self.rate_limiter().charging(msg["method"])
+
             await self.websocket_client.send(json.dumps(msg))
 
         except Exception as error:
@@ -315,6 +900,9 @@ class StreamingAccountData:
 
         try:
 
+            # owed to the exchange: counted, never delayed
+            self.rate_limiter().charging(msg["method"])
+
             await self.websocket_client.send(json.dumps(msg))
 
         except Exception as error:
@@ -343,6 +931,8 @@ class StreamingAccountData:
         }
 
         try:
+            self.rate_limiter().charging(msg["method"])
+
             await self.websocket_client.send(json.dumps(msg))
 
         except Exception as error:
@@ -377,6 +967,8 @@ class StreamingAccountData:
                         },
                     }
 
+                    self.rate_limiter().charging(msg["method"])
+
                     await self.websocket_client.send(json.dumps(msg))
 
             await asyncio.sleep(150)
@@ -423,6 +1015,11 @@ class StreamingAccountData:
             msg.update(extra_params)
 
             if msg["params"]["channels"]:
+
+                await self.rate_limiter().acquiring(
+                    msg["method"], rate_limiting.HOUSEKEEPING
+                )
+
                 await self.websocket_client.send(json.dumps(msg))
 
         if "rest_api" in source:
@@ -434,4 +1031,6 @@ class StreamingAccountData:
 
             msg.update(extra_params)
 
+            await self.rate_limiter().acquiring(msg["method"])
+
             await self.websocket_client.send(json.dumps(msg))
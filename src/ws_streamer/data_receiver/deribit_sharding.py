@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+Splitting Deribit subscriptions across several WebSocket connections.
+
+policies:
+    private_dedicated   user.* channels get their own connection,
+                        market data is spread over the others by instrument
+    by_instrument       every channel is spread by instrument,
+                        user.* channels ride along on the first connection
+    callable            any function(channel: str) -> shard index
+
+All channels of one instrument always land on the same connection, so
+their relative order is kept.
+"""
+
+PRIVATE_CHANNEL_PREFIX = "user."
+
+
+def is_private_channel(channel: str) -> bool:
+    """ """
+    return channel.startswith(PRIVATE_CHANNEL_PREFIX)
+
+
+def extract_instrument_from_channel(channel: str) -> str:
+    """
+
+    some variables:
+    chart.trades.BTC-PERPETUAL.1    -> BTC-PERPETUAL
+    incremental_ticker.BTC-4OCT24   -> BTC-4OCT24
+    user.portfolio.btc              -> user.portfolio.btc
+    """
+
+    if channel.startswith("chart.trades."):
+        return channel.split(".")[2]
+
+    if is_private_channel(channel):
+        return channel
+
+    return channel.partition(".")[2].partition(".")[0] or channel
+
+
+def spreading_by_instrument(
+    channels: list,
+    shard_count: int,
+) -> list:
+    """
+    Greedy balancing of instrument groups: heaviest group first,
+    each to the connection currently carrying the fewest channels.
+    """
+
+    groups = {}
+
+    for channel in channels:
+        groups.setdefault(extract_instrument_from_channel(channel), []).append(
+            channel
+        )
+
+    shards = [[] for _ in range(shard_count)]
+
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(group)
+
+    return shards
+
+
+def allocating_channels(
+    channels: list,
+    shard_count: int,
+    policy: str | object = "private_dedicated",
+) -> list:
+    """
+    Returns:
+        list of channel lists, one per connection. Empty shards are dropped.
+    """
+
+    shard_count = max(1, shard_count)
+
+    if shard_count == 1:
+        shards = [list(channels)]
+
+    elif callable(policy):
+
+        shards = [[] for _ in range(shard_count)]
+
+        for channel in channels:
+            shards[policy(channel) % shard_count].append(channel)
+
+    elif policy == "private_dedicated":
+
+        private_channels = [o for o in channels if is_private_channel(o)]
+        public_channels = [o for o in channels if not is_private_channel(o)]
+
+        shards = [private_channels] + spreading_by_instrument(
+            public_channels,
+            shard_count - 1,
+        )
+
+    elif policy == "by_instrument":
+
+        private_channels = [o for o in channels if is_private_channel(o)]
+        public_channels = [o for o in channels if not is_private_channel(o)]
+
+        shards = spreading_by_instrument(public_channels, shard_count)
+
+        shards[0] = private_channels + shards[0]
+
+    else:
+        raise ValueError(f"unknown sharding policy {policy}")
+
+    return [o for o in shards if o]
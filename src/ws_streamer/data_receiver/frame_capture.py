@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+"""
+Raw WebSocket frame capture and replay.
+
+Frames are appended, untouched, to a compact binary log together with the
+monotonic time they were received. Logs rotate by size, so a capture could be
+left running in production. The replay source reads the same logs back into
+`queue_general`, giving the distributors reproducible exchange traffic
+without an exchange connection.
+
+file layout:
+    header : magic (4s) | version (H) | wall clock ns (q) | monotonic ns (q)
+    record : monotonic receive ns (q) | frame length (I) | frame bytes
+
+file naming:
+    <capture_path>.<index:05d>.frames
+
+Monotonic times only compare within one process. Replay keeps them per
+file and joins files on the header anchor (wall clock at creation), the
+gap between two files bounded by MAX_FILE_GAP.
+"""
+
+# built ins
+import asyncio
+import glob
+import os
+import struct
+import time
+
+# installed
+from dataclassy import dataclass
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.utilities.lazy_message import parsing_subscription_frame
+
+CAPTURE_MAGIC = b"WSFR"
+CAPTURE_VERSION = 1
+CAPTURE_SUFFIX = "frames"
+
+FILE_HEADER = struct.Struct("<4sHqq")
+RECORD_HEADER = struct.Struct("<qI")
+
+FILE_BUFFER = 1024 * 1024  # bytes kept in memory before hitting the disk
+MAX_FILE_SIZE = 256 * 1024 * 1024  # rotate after this many bytes
+MAX_FILE_GAP = 1_000_000_000  # ns, longest replay pause between two files
+
+
+def capture_file_name(
+    capture_path: str,
+    file_index: int,
+) -> str:
+    """ """
+    return f"{capture_path}.{file_index:05d}.{CAPTURE_SUFFIX}"
+
+
+def listing_capture_files(capture_path: str) -> list:
+    """
+    capture_path could be a base path (all rotated files, in order)
+    or a single .frames file
+    """
+
+    if os.path.isfile(capture_path):
+        return [capture_path]
+
+    return sorted(glob.glob(f"{glob.escape(capture_path)}.*.{CAPTURE_SUFFIX}"))
+
+
+def next_file_index(capture_path: str) -> int:
+    """one past the highest index already on disk (gaps left as they are)"""
+
+    indexes = [
+        int(index)
+        for index in (
+            o.rsplit(".", 2)[-2] for o in listing_capture_files(capture_path)
+        )
+        if index.isdigit()
+    ]
+
+    return max(indexes) + 1 if indexes else 0
+
+
+@dataclass(slots=True)
+class FrameRecorder:
+    """
+    Append-only, size-rotated recorder for raw WebSocket frames.
+
+    Usage:
+        recorder = FrameRecorder("captures/deribit")
+        recorder.record(frame, time.monotonic_ns())
+        recorder.closing()
+    """
+
+    capture_path: str
+    max_file_size: int = MAX_FILE_SIZE
+    # Instance Variables
+    file_handle: object = None
+    file_index: int = -1
+    file_size: int = 0
+    frames_recorded: int = 0
+
+    def record(
+        self,
+        frame: bytes | str,
+        received_at: int = None,
+    ) -> None:
+        """
+        received_at: monotonic ns. Stamped here if not provided
+        """
+
+        if received_at is None:
+            received_at = time.monotonic_ns()
+
+        if isinstance(frame, str):
+            frame = frame.encode()
+
+        if self.file_handle is None or self.file_size >= self.max_file_size:
+            self.rotating()
+
+        self.file_handle.write(RECORD_HEADER.pack(received_at, len(frame)))
+        self.file_handle.write(frame)
+
+        self.file_size += RECORD_HEADER.size + len(frame)
+        self.frames_recorded += 1
+
+    def rotating(self) -> None:
+        """
+        close the current file (if any) and continue in the next one
+        """
+
+        self.closing()
+
+        if self.file_index < 0:
+
+            folder = os.path.dirname(self.capture_path)
+
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+
+            self.file_index = next_file_index(self.capture_path)
+
+        else:
+            self.file_index += 1
+
+        file_name = capture_file_name(self.capture_path, self.file_index)
+
+        # never append to a file left by an earlier session
+        self.file_handle = open(file_name, "xb", buffering=FILE_BUFFER)
+
+        self.file_handle.write(
+            FILE_HEADER.pack(
+                CAPTURE_MAGIC,
+                CAPTURE_VERSION,
+                time.time_ns(),
+                time.monotonic_ns(),
+            )
+        )
+
+        self.file_size = FILE_HEADER.size
+
+        log.info(f"capturing frames to {file_name}")
+
+    def flushing(self) -> None:
+        """ """
+        if self.file_handle is not None:
+            self.file_handle.flush()
+
+    def closing(self) -> None:
+        """ """
+        if self.file_handle is not None:
+            self.file_handle.close()
+            self.file_handle = None
+
+
+def reading_file_anchor(file_name: str) -> tuple:
+    """
+    (wall clock ns, monotonic ns) taken together when the file was
+    created, None for an empty file
+    """
+
+    with open(file_name, "rb") as handle:
+        header = handle.read(FILE_HEADER.size)
+
+    if len(header) < FILE_HEADER.size:
+        return None
+
+    _, _, wall_clock, monotonic = FILE_HEADER.unpack(header)
+
+    return wall_clock, monotonic
+
+
+def reading_capture_file(file_name: str):
+    """
+    Yield (received_at_ns, frame) from one capture file.
+    A truncated last record (process killed mid-write) ends the file quietly.
+    """
+
+    with open(file_name, "rb") as handle:
+
+        header = handle.read(FILE_HEADER.size)
+
+        if len(header) < FILE_HEADER.size:
+            return
+
+        magic, version, _, _ = FILE_HEADER.unpack(header)
+
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(f"{file_name} is not a frame capture (v{CAPTURE_VERSION})")
+
+        while True:
+
+            record_header = handle.read(RECORD_HEADER.size)
+
+            if len(record_header) < RECORD_HEADER.size:
+                return
+
+            received_at, frame_length = RECORD_HEADER.unpack(record_header)
+
+            frame = handle.read(frame_length)
+
+            if len(frame) < frame_length:
+                log.warning(f"{file_name}: truncated frame at the end of file")
+                return
+
+            yield received_at, frame
+
+
+def reading_frames(capture_path: str):
+    """
+    Yield (received_at_ns, frame) across all rotated files of a capture
+    """
+
+    for file_name in listing_capture_files(capture_path):
+        yield from reading_capture_file(file_name)
+
+
+def timing_frames(capture_path: str):
+    """
+    Yield (offset_ns, frame): replay time since the first frame.
+    Within a file, monotonic deltas. Between files, the wall clock gap of
+    their anchors, within [0, MAX_FILE_GAP]: rotated files of one session
+    follow on, separate sessions are joined back to back
+    """
+
+    offset = 0
+
+    last_wall_clock = None
+
+    for file_name in listing_capture_files(capture_path):
+
+        anchor = reading_file_anchor(file_name)
+
+        if anchor is None:
+            continue
+
+        anchor_wall_clock, anchor_monotonic = anchor
+
+        previous = None
+
+        for received_at, frame in reading_capture_file(file_name):
+
+            wall_clock = anchor_wall_clock + received_at - anchor_monotonic
+
+            if previous is not None:
+                offset += max(received_at - previous, 0)
+
+            elif last_wall_clock is not None:
+                offset += min(max(wall_clock - last_wall_clock, 0), MAX_FILE_GAP)
+
+            previous = received_at
+
+            last_wall_clock = wall_clock
+
+            yield offset, frame
+
+
+async def replaying_frames(
+    queue_general: object,
+    capture_path: str,
+    exchange: str,
+    account_id: str = "replay",
+    speed: float = 1.0,
+) -> int:
+    """
+    Feed a capture into queue_general.
+
+    speed:
+        1.0 -> original pace
+        10  -> ten times faster
+        0   -> as fast as the queue accepts
+
+    Returns:
+        number of messages queued
+    """
+
+    YIELD_EVERY = 1000  # let the consumers run when replaying at full speed
+
+    queued = 0
+
+    replay_started = time.monotonic_ns()
+
+    for offset, frame in timing_frames(capture_path):
+
+        if speed:
+
+            due = replay_started + offset / speed
+
+            delay = due - time.monotonic_ns()
+
+            if delay > 0:
+                await asyncio.sleep(delay / 1_000_000_000)
+
+        # what the receiver would have queued
+        message_params = parsing_subscription_frame(
+            frame,
+            exchange,
+            account_id,
+        )
+
+        if message_params:
+
+            # queing message to dispatcher
+            await queue_general.put(message_params)
+
+            queued += 1
+
+            if not speed and queued % YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+
+    log.info(f"replayed {queued} messages from {capture_path}")
+
+    return queued
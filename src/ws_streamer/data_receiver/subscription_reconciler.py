@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+"""
+Keeping subscriptions in line with the instruments actually listed.
+
+Every `interval` seconds the live instrument set is fetched and turned
+into channels (building_ws_channels). Against what the connections hold:
+
+    new channels        subscribed in batches, the channels of one new
+                        instrument together on the least loaded market
+                        data connection (and on the redundant one for
+                        latency critical channels)
+    gone channels       unsubscribed in batches on every connection
+                        holding them. Private user.* channels are never
+                        dropped
+
+Each connection's ws_channels list is changed in place before anything
+is sent, so a reconnection re-subscribes the current set.
+
+Listed and expired instruments are then announced on queue_general as
+one control message, for the consumers to evict or warm their caches:
+
+    dict(channel="control.instruments", data=dict(listed=[..], expired=[..]))
+"""
+
+# built ins
+import asyncio
+
+# installed
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.data_receiver.deduplication import is_redundant_channel
+from ws_streamer.data_receiver.deribit_sharding import (
+    extract_instrument_from_channel,
+    is_private_channel,
+)
+from ws_streamer.messaging.telegram_bot import alerting
+from ws_streamer.utilities import metrics, system_tools
+
+RECONCILE_INTERVAL = 60  # seconds
+SUBSCRIBE_BATCH = 100  # channels per subscribe/unsubscribe request
+
+CONTROL_INSTRUMENTS = "control.instruments"
+
+SUBSCRIPTION_CHANGES = metrics.counter(
+    "ws_streamer_subscription_changes_total",
+    "channels subscribed or unsubscribed by the reconciler",
+    ("operation",),
+)
+
+
+def instrument_of_channel(channel: str) -> str:
+    """instrument of a market data channel, None for the others"""
+
+    if channel.startswith(("chart.trades.", "incremental_ticker.")):
+        return extract_instrument_from_channel(channel)
+
+    return None
+
+
+def diffing_channels(
+    current: list,
+    desired: list,
+) -> tuple:
+    """
+    (subscribing, unsubscribing), both in their list's order.
+    Only instrument channels are ever unsubscribed
+    """
+
+    current_set = set(current)
+    desired_set = set(desired)
+
+    subscribing = [o for o in dict.fromkeys(desired) if o not in current_set]
+
+    unsubscribing = [
+        o
+        for o in dict.fromkeys(current)
+        if o not in desired_set and instrument_of_channel(o)
+    ]
+
+    return subscribing, unsubscribing
+
+
+def batching(
+    channels: list,
+    size: int = SUBSCRIBE_BATCH,
+) -> list:
+    """ """
+
+    return [channels[i : i + size] for i in range(0, len(channels), size)]
+
+
+class SubscriptionReconciler:
+    """ """
+
+    def __init__(
+        self,
+        connections: list,
+        fetching_instruments: callable,
+        building_channels: callable,
+        queue_general: object = None,
+        exchange: str = "deribit",
+        redundant_connection: object = None,
+        interval: float = RECONCILE_INTERVAL,
+    ):
+        """
+        connections: StreamingAccountData, each with its ws_channels
+        fetching_instruments: coroutine function, futures_instruments
+            (get_instrument_summary.get_futures_instruments shape)
+        building_channels: futures_instruments -> channels
+        redundant_connection: the connection racing latency critical channels
+        """
+
+        self.connections = connections
+        self.fetching_instruments = fetching_instruments
+        self.building_channels = building_channels
+        self.queue_general = queue_general
+        self.exchange = exchange
+        self.redundant_connection = redundant_connection
+        self.interval = interval
+
+    def current_channels(self) -> list:
+        """ """
+
+        return [
+            channel
+            for connection in self.connections
+            for channel in (connection.ws_channels or [])
+        ]
+
+    def placing(self, channels: list) -> dict:
+        """
+        {connection: channels to subscribe}. Instrument groups are kept
+        together on the least loaded market data connection
+        """
+
+        market_connections = [
+            o
+            for o in self.connections
+            if o is not self.redundant_connection
+            and not all(is_private_channel(c) for c in (o.ws_channels or []))
+        ] or self.connections[:1]
+
+        loads = {o: len(o.ws_channels or []) for o in market_connections}
+
+        groups = {}
+
+        for channel in channels:
+            groups.setdefault(extract_instrument_from_channel(channel), []).append(
+                channel
+            )
+
+        placed = {}
+
+        for group in groups.values():
+
+            connection = (
+                self.connections[0]
+                if is_private_channel(group[0])
+                else min(loads, key=loads.get)
+            )
+
+            placed.setdefault(connection, []).extend(group)
+
+            if connection in loads:
+                loads[connection] += len(group)
+
+            if self.redundant_connection:
+
+                redundant = [o for o in group if is_redundant_channel(o)]
+
+                if redundant:
+                    placed.setdefault(self.redundant_connection, []).extend(redundant)
+
+        return placed
+
+    async def sending(
+        self,
+        connection: object,
+        operation: str,
+        channels: list,
+    ) -> None:
+        """ """
+
+        for batch in batching(channels):
+
+            try:
+                await connection.ws_operation(
+                    operation=operation,
+                    ws_channel=batch,
+                    source="ws-combination",
+                )
+
+                SUBSCRIPTION_CHANGES.labels(operation).inc(len(batch))
+
+            except Exception as error:
+
+                # disconnected: the reconnection subscribes ws_channels as is
+                log.warning(
+                    f"{connection.connection_name} {operation} {len(batch)} channels: {error}"
+                )
+
+    async def reconciling(self) -> dict:
+        """one pass. dict(listed, expired): instrument names"""
+
+        futures_instruments = await self.fetching_instruments()
+
+        desired = self.building_channels(futures_instruments)
+
+        current = self.current_channels()
+
+        subscribing, unsubscribing = diffing_channels(current, desired)
+
+        current_instruments = {instrument_of_channel(o) for o in current}
+        desired_instruments = {instrument_of_channel(o) for o in desired}
+
+        listed = [
+            o
+            for o in dict.fromkeys(instrument_of_channel(c) for c in subscribing)
+            if o and o not in current_instruments
+        ]
+
+        expired = [
+            o
+            for o in dict.fromkeys(instrument_of_channel(c) for c in unsubscribing)
+            if o not in desired_instruments
+        ]
+
+        # the lists first: a reconnection meanwhile subscribes the new set
+        unsubscribing_set = set(unsubscribing)
+
+        removals = {}
+
+        for connection in self.connections:
+
+            channels = connection.ws_channels or []
+
+            gone = [o for o in channels if o in unsubscribing_set]
+
+            if gone:
+                channels[:] = [o for o in channels if o not in unsubscribing_set]
+                removals[connection] = gone
+
+        placed = self.placing(subscribing)
+
+        for connection, channels in placed.items():
+
+            if connection.ws_channels is None:
+                connection.ws_channels = []
+
+            connection.ws_channels.extend(channels)
+
+        instruments_name = futures_instruments["instruments_name"]
+
+        for connection in self.connections:
+            connection.instruments_name = instruments_name
+
+        await asyncio.gather(
+            *[self.sending(o, "unsubscribe", c) for o, c in removals.items()],
+            *[self.sending(o, "subscribe", c) for o, c in placed.items()],
+        )
+
+        if listed or expired:
+
+            log.info(f"subscriptions: listed {listed} expired {expired}")
+
+            if self.queue_general is not None:
+
+                await self.queue_general.put(
+                    dict(
+                        channel=CONTROL_INSTRUMENTS,
+                        data=dict(listed=listed, expired=expired),
+                        exchange=self.exchange,
+                    )
+                )
+
+        return dict(listed=listed, expired=expired)
+
+    async def running(self) -> None:
+        """ """
+
+        while True:
+
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.reconciling()
+
+            except Exception as error:
+
+                system_tools.parse_error_message(error, "subscription reconciler")
+
+                # never raises: the next pass runs whatever happened here
+                await alerting(f"subscription reconciler - {error}")
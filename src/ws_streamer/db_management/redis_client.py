@@ -140,8 +140,8 @@ async def saving_and_publishing_result(
         # publishing message
         await publishing_result(
             client_redis,
-            channel,
             message,
+            channel,
         )
 
     except Exception as error:
@@ -156,12 +156,21 @@ async def saving_and_publishing_result(
 async def publishing_result(
     client_redis: object,
     message: dict,
+    channel: str = None,
 ) -> None:
-    """ """
+    """
+    channel: defaults to the one in the message (message_template layout:
+    message["params"]["channel"])
+    """
 
     try:
-        
-        channel = message["channel"]
+
+        if channel is None:
+            channel = (
+                message["params"]["channel"]
+                if "params" in message
+                else message["channel"]
+            )
 
         # publishing message
         await client_redis.publish(
@@ -177,6 +186,30 @@ async def publishing_result(
             )
 
 
+async def publishing_raw_result(
+    client_redis: object,
+    channel: str,
+    message_bytes: bytes,
+) -> None:
+    """
+    publish an already encoded message as is (passthrough channels)
+    """
+
+    try:
+
+        await client_redis.publish(
+            channel,
+            message_bytes,
+        )
+
+    except Exception as error:
+
+        await system_tools.parse_error_message_with_redis(
+            client_redis,
+            error,
+            )
+
+
 async def saving_result(
     client_redis: object,
     channel: str,
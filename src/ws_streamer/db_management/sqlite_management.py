@@ -4,6 +4,7 @@
 import asyncio
 import json
 import sqlite3
+import time
 from contextlib import contextmanager
 
 import aiosqlite
@@ -11,9 +12,17 @@ from loguru import logger as log
 
 # user defined formulas
 from ws_streamer.db_management.redis_client import publishing_specific_purposes
+from ws_streamer.messaging.telegram_bot import alerting
 from ws_streamer.messaging.telegram_bot import telegram_bot_sendtext as telegram_bot
+from ws_streamer.utilities import metrics
 from ws_streamer.utilities.string_modification import extract_currency_from_text
 
+SQLITE_WRITE_SECONDS = metrics.histogram(
+    "ws_streamer_sqlite_write_seconds",
+    "SQLite write latency, connect to commit",
+    ("operation",),
+)
+
 
 def catch_error(error, idle: int = None) -> list:
     """ """
@@ -81,6 +90,8 @@ async def insert_tables(
     https://stackoverflow.com/questions/56910918/saving-json-data-to-sqlite-python
 
     """
+    started = time.perf_counter()
+
     try:
 
         async with aiosqlite.connect(
@@ -114,24 +125,90 @@ async def insert_tables(
 
     finally:
 
-        if "my_trades" in table_name or "order" in table_name:
+        SQLITE_WRITE_SECONDS.labels("insert").observe(time.perf_counter() - started)
 
-            query_trades = f"SELECT * FROM  v_trading_all_active"
+        await publishing_trading_update(table_name)
 
-            my_trades_currency_all_transactions: list = (
-                await executing_query_with_return(query_trades)
-            )
 
-            result = {}
-            result.update({"params": {}})
-            result.update({"method": "subscription"})
-            result["params"].update({"data": my_trades_currency_all_transactions})
+async def inserting_many(
+    table_name: str,
+    params: list,
+    publishing: bool = True,
+) -> int:
+    """
+    bulk insert of a list of dicts into a json table: one connection, one
+    transaction, bound parameters. Rows already there are ignored.
 
-            await publishing_specific_purposes(
-                "sqlite_record_updating",
-                result,
+    publishing: the active trading view is published when rows were
+    inserted. Callers inserting page by page publish once at the end
+
+    Returns the number of rows inserted, 0 when the insert failed
+    """
+
+    if not params:
+        return 0
+
+    started = time.perf_counter()
+
+    inserted = 0
+
+    try:
+
+        async with aiosqlite.connect("databases/trading.sqlite3") as db:
+
+            await db.execute("pragma journal_mode=wal;")
+
+            before = db.total_changes
+
+            await db.executemany(
+                f"INSERT OR IGNORE INTO {table_name} (data) VALUES (json (?));",
+                [(json.dumps(param),) for param in params],
             )
 
+            await db.commit()
+
+            inserted = db.total_changes - before
+
+    except Exception as error:
+
+        log.critical(f"inserting_many {table_name} {error}")
+
+        # never raises: one failed page does not end a refill
+        await alerting(
+            f"sqlite operation inserting_many {table_name} {error}", "failed_order"
+        )
+
+    SQLITE_WRITE_SECONDS.labels("insert_many").observe(time.perf_counter() - started)
+
+    if inserted and publishing:
+        await publishing_trading_update(table_name)
+
+    return inserted
+
+
+async def publishing_trading_update(table_name: str) -> None:
+    """
+    trades and orders changed: publish the active trading view
+    """
+
+    if "my_trades" in table_name or "order" in table_name:
+
+        query_trades = f"SELECT * FROM  v_trading_all_active"
+
+        my_trades_currency_all_transactions: list = (
+            await executing_query_with_return(query_trades)
+        )
+
+        result = {}
+        result.update({"params": {}})
+        result.update({"method": "subscription"})
+        result["params"].update({"data": my_trades_currency_all_transactions})
+
+        await publishing_specific_purposes(
+            "sqlite_record_updating",
+            result,
+        )
+
 
 async def querying_table(
     table: str = "mytrades",
@@ -212,6 +289,8 @@ async def deleting_row(
     if "LIKE" in operator:
         filter_val = (f"""' %{filter_value}%' """,)
 
+    started = time.perf_counter()
+
     try:
         async with aiosqlite.connect(database, isolation_level=None) as db:
 
@@ -228,6 +307,8 @@ async def deleting_row(
 
     finally:
 
+        SQLITE_WRITE_SECONDS.labels("delete").observe(time.perf_counter() - started)
+
         if "my_trades" in table or "order" in table:
 
             query_trades = f"SELECT * FROM  v_trading_all_active"
@@ -350,6 +431,8 @@ async def update_status_data(
             )
 
     # log.warning (f"query {query}")
+    started = time.perf_counter()
+
     try:
 
         async with aiosqlite.connect(
@@ -369,6 +452,8 @@ async def update_status_data(
 
     finally:
 
+        SQLITE_WRITE_SECONDS.labels("update").observe(time.perf_counter() - started)
+
         if "my_trades" in table or "order" in table:
 
             query_trades = f"SELECT * FROM  v_trading_all_active"
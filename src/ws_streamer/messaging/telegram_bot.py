@@ -1,8 +1,10 @@
 # built ins
 import asyncio
+import os
 
 # import orjson
 import httpx
+from loguru import logger as log
 
 async def private_connection(
     endpoint: str,
@@ -45,3 +47,27 @@ async def telegram_bot_sendtext(
         bot_chatID=bot_chatID,
         connection_url=connection_url,
         )
+
+
+async def alerting(
+    bot_message: str,
+    purpose: str = "general_error",
+) -> None:
+    """
+    telegram_bot_sendtext for supervisors and background loops: never
+    raises. Credentials from TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID,
+    without them (or when sending fails) the alert is only logged
+    """
+
+    bot_token = os.environ.get("TELEGRAM_BOT_TOKEN")
+    bot_chatID = os.environ.get("TELEGRAM_CHAT_ID")
+
+    if not (bot_token and bot_chatID):
+        log.warning(f"[{purpose}] {bot_message}")
+        return
+
+    try:
+        await telegram_bot_sendtext(bot_token, bot_chatID, bot_message, purpose)
+
+    except Exception as error:
+        log.warning(f"[{purpose}] {bot_message} (telegram: {error!r})")
@@ -11,13 +11,12 @@ from the Binance API as efficiently as possible using asynchronous requests.
 Key Features:
 - Asynchronous data fetching for improved performance
 - Rate limiting to comply with Binance API restrictions
-- Circuit breaker pattern to handle and recover from API errors
+- Bounded retries and circuit breaking (restful_api.resilience)
 - Adjustable request rates based on API usage feedback
 
 Classes:
 - BinanceClient: Main class for interacting with the Binance API
 - RateLimiter: Manages and adjusts request rates
-- CircuitBreaker: Implements the circuit breaker pattern for error handling
 - RateLimitManager: Manages rate limit states and ban durations
 
 Usage:
@@ -41,13 +40,15 @@ import asyncio
 import logging
 import random
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime
 from threading import Lock
 from time import time
 from typing import Any, Dict, List, Tuple
 
 import aiohttp
 
+from ws_streamer.restful_api import resilience
+
 LOG_LEVEL = logging.INFO
 
 # Increase this for increased speed at the beginning of a download/minute.
@@ -115,36 +116,6 @@ class RateLimitManager:
         self._ban_until = time() + ban_duration
 
 
-class CircuitBreaker:
-    """Circuit Breaker class."""
-
-    def __init__(self, max_failures=5, reset_time=300):
-        self.failures = 0
-        self.max_failures = max_failures
-        self.reset_time = reset_time
-        self.last_failure_time = None
-
-    def record_failure(self) -> None:
-        current_time = datetime.now()
-
-        if self.last_failure_time:
-            secs_since_reset = timedelta(seconds=self.reset_time)
-            if (current_time - self.last_failure_time) > secs_since_reset:
-                self.failures = 0
-
-        self.failures += 1
-        self.last_failure_time = current_time
-
-    def is_open(self) -> bool:
-        return self.failures >= self.max_failures
-
-    def seconds_to_reset(self) -> float:
-        if self.is_open():
-            return (self.last_failure_time + self.reset_time) - time()
-        else:
-            return 0
-
-
 @dataclass
 class RateLimiter:
     """Rate limiter class"""
@@ -227,16 +198,20 @@ class BinanceClient:
         self.timeout = aiohttp.ClientTimeout(total=timeout)
 
         self.rate_limiter = RateLimiter()
-        self.circuit_breaker = CircuitBreaker()
+        self.circuit_breaker = resilience.breaker_for(API_ENDPOINT)
         self.rate_limit_manager = RateLimitManager()
         self.semaphore = asyncio.Semaphore(self.max_workers)
 
-    async def sync_server_time(self):
+    async def sync_server_time(self) -> int:
         async with aiohttp.ClientSession() as session:
             async with session.get(f"{BASE_URL}/api/v3/time") as response:
-                server_time = (await response.json())["serverTime"] / 1000
+                server_time_ms = (await response.json())["serverTime"]
+                server_time = server_time_ms / 1000
                 self.rate_limiter.time_offset = server_time - time()
 
+        # the binance receiver keeps clock.CLOCK synced with it
+        return server_time_ms
+
     async def _get_chunk_periods(
         self, start: int, end: int, interval: str
     ) -> List[Tuple[int, int]]:
@@ -288,132 +263,92 @@ class BinanceClient:
             "limit": KLINES_LIMIT,
         }
 
-        for attempt in range(self.max_retries):
-            try:
-                async with self.semaphore:
-                    # check with the Rate Limit Manager if we need to wait
-                    # because we exceeded the API rate limit or got banned
-                    if wait_time := self.rate_limit_manager.get_wait_time() > 0:
-                        logger.warning(
-                            "[%s] Rate limit in effect. Waiting for %s seconds.",
-                            worker_id,
-                            round(wait_time),
+        async def requesting() -> List[List[Any]]:
+            async with self.semaphore:
+                # check with the Rate Limit Manager if we need to wait
+                # because we exceeded the API rate limit or got banned
+                if (wait_time := self.rate_limit_manager.get_wait_time()) > 0:
+                    logger.warning(
+                        "[%s] Rate limit in effect. Waiting for %s seconds.",
+                        worker_id,
+                        round(wait_time),
+                    )
+                    await asyncio.sleep(wait_time)
+
+                # check with the RateLimiter if we need to throttle
+                # our rate of requests and wait to avoid hitting the
+                # API rate limit(s)
+                delay, count = 0.0, 0
+                if self.rate_limiter.should_throttle():
+                    delay, count = self.rate_limiter.chill_out_bro()
+                    logger.info(
+                        "[%s] throttling %s: %s",
+                        worker_id,
+                        count,
+                        round(delay, 2),
+                    )
+                    await asyncio.sleep(delay)
+
+                # send the downlaod request to the API
+                async with session.get(
+                    f"{BASE_URL}{API_ENDPOINT}",
+                    params=params,
+                ) as response:
+                    self.rate_limiter.update(
+                        int(response.headers.get("x-mbx-used-weight-1m", 0)),
+                        int(response.headers.get("x-mbx-used-weight", 0)),
+                    )
+
+                    # simulates 429 errors (too many requests) if the
+                    # SIMULATE_429_ERROS switch has been set (at top of file)
+                    if SIMULATE_429_ERRORS and random.random() > 0.99:
+                        response.status = 429
+
+                    # handle a 429 error (too many requests): retried by
+                    # resilience.calling, a bounded number of times
+                    if response.status == 429:
+                        logger.warning("[%s] Hit a 429 error!" % worker_id)
+
+                        # get the seconds to wait for a retry from
+                        # the headers of the response, or set it to
+                        # 10 if we are only simulating a 429
+                        if SIMULATE_429_ERRORS:
+                            retry_after = 10
+                        else:
+                            retry_after = int(response.headers.get("Retry-After", 60))
+
+                        self.rate_limit_manager.set_rate_limit(retry_after)
+                        raise resilience.RateLimited("429", retry_after)
+
+                    # handle a 418 error (= banned)
+                    if response.status == 418:
+                        retry_after = int(response.headers.get("Retry-After", 120))
+                        logger.error(
+                            "[%s] We are BANNED for %s seconds"
+                            % (worker_id, retry_after)
                         )
-                        await asyncio.sleep(wait_time)
-
-                    # check with the CircuitBreaker if we need to wait because
-                    # too many erros occured
-                    if self.circuit_breaker.is_open():
-                        logger.warning(
-                            "Circuit breaker is open. Waiting before retrying..."
-                        )
-                        await asyncio.sleep(self.circuit_breaker.seconds_to_reset())
-
-                    # check with the RateLimiter if we need to throttle
-                    # our rate of requests and wait to avoid hitting the
-                    # API rate limit(s)
-                    delay, count = 0.0, 0
-                    if self.rate_limiter.should_throttle():
-                        delay, count = self.rate_limiter.chill_out_bro()
-                        logger.info(
-                            "[%s] throttling %s: %s",
-                            worker_id,
-                            count,
-                            round(delay, 2),
-                        )
-                        await asyncio.sleep(delay)
-
-                    # send the downlaod request to the API
-                    async with session.get(
-                        f"{BASE_URL}{API_ENDPOINT}",
-                        params=params,
-                    ) as response:
-                        self.rate_limiter.update(
-                            int(response.headers.get("x-mbx-used-weight-1m", 0)),
-                            int(response.headers.get("x-mbx-used-weight", 0)),
-                        )
-
-                        # simulates 429 errors (too many requests) if the
-                        # SIMULATE_429_ERROS switch has been set (at top of file)
-                        if SIMULATE_429_ERRORS and random.random() > 0.99:
-                            response.status = 429
-
-                        # handle a 429 error (too many requests)
-                        if response.status == 429:
-                            logger.warning("[%s] Hit a 429 error!" % worker_id)
-
-                            # get the seconds to wait for a retry from
-                            # the headers of the response, or set it to
-                            # 10 if we are only simulating a 429
-                            if SIMULATE_429_ERRORS:
-                                retry_after = 10
-                            else:
-                                retry_after = int(
-                                    response.headers.get("Retry-After", 60)
-                                )
-
-                            self.rate_limit_manager.set_rate_limit(retry_after)
-                            return await self._fetch_ohlcv_chunk(
-                                session,
-                                worker_id,
-                                symbol,
-                                interval,
-                                start,
-                                end,
-                            )
-
-                        # handle a 418 error (= banned)
-                        if response.status == 418:
-                            retry_after = int(response.headers.get("Retry-After", 120))
-                            logger.error(
-                                "[%s] We are BANNED for %s seconds"
-                                % (worker_id, retry_after)
-                            )
-                            self.rate_limit_manager.set_ban(retry_after)
-                            return await self._fetch_ohlcv_chunk(
-                                session,
-                                worker_id,
-                                symbol,
-                                interval,
-                                start,
-                                end,
-                            )
-
-                        response.raise_for_status()
-
-                        logger.info(
-                            "[%s] Request successful. Weight: %s-%s",
-                            worker_id,
-                            self.rate_limiter.weight_1m,
-                            self.rate_limiter.weight_total,
-                        )
-
-                        return await response.json()
-
-            except asyncio.TimeoutError:
-                logger.warning("[%s] Request timed out. Retrying..." % worker_id)
-                self.circuit_breaker.record_failure()
-                if attempt == self.max_retries - 1:
-                    raise
-
-            except (aiohttp.ClientResponseError, Exception) as e:
-                logger.error(
-                    "[%s] Error: %s for %s. Retrying in %s seconds...",
-                    worker_id,
-                    e,
-                    symbol,
-                    f"{wait_time:.2f}",
-                )
-                self.circuit_breaker.record_failure()
-                if attempt == self.max_retries - 1:
-                    raise
-                wait_time = (2**attempt) + random.uniform(0, 1)
-                await asyncio.sleep(wait_time)
-
-        logger.warning(
-            "no result for %s after retrying %s times" % (symbol, self.max_retries)
+                        self.rate_limit_manager.set_ban(retry_after)
+                        raise resilience.RateLimited("418", retry_after)
+
+                    response.raise_for_status()
+
+                    logger.info(
+                        "[%s] Request successful. Weight: %s-%s",
+                        worker_id,
+                        self.rate_limiter.weight_1m,
+                        self.rate_limiter.weight_total,
+                    )
+
+                    return await response.json()
+
+        # bounded retries with jittered backoff, fails fast while the
+        # circuit breaker is open
+        return await resilience.calling(
+            requesting,
+            API_ENDPOINT,
+            retries=self.max_retries - 1,
+            breaker=self.circuit_breaker,
         )
-        return []
 
     async def get_ohlcv(
         self, symbol: str, interval: str, start: int, end: int
@@ -459,7 +394,7 @@ class BinanceClient:
                 )
                 for i, (chunk_start, chunk_end) in enumerate(chunks)
             ]
-            results = await asyncio.gather(*tasks)
+            results = await asyncio.gather(*tasks, return_exceptions=True)
 
         # Filter out any exceptions and log them
         filtered_results = []
@@ -17,15 +17,41 @@ import asyncio
 from typing import Dict
 
 # installed
-import aiohttp
-import httpx
 from aiohttp.helpers import BasicAuth
 from dataclassy import dataclass
 from loguru import logger as log
 
 # user defined formula
 from ws_streamer.messaging import telegram_bot as tlgrm
-from ws_streamer.utilities import string_modification as str_mod, time_modification as time_mod
+from ws_streamer.messaging.telegram_bot import alerting
+from ws_streamer.restful_api import request_cache, resilience, session_pool
+from ws_streamer.restful_api.deribit import (
+    history_fetching,
+    ohlc_backfilling,
+    rate_limiting,
+)
+from ws_streamer.utilities import (
+    clock,
+    metrics,
+    string_modification as str_mod,
+)
+
+DERIBIT_URL = "https://www.deribit.com/api/v2/"
+
+REST_SECONDS = metrics.histogram(
+    "ws_streamer_rest_request_seconds",
+    "REST call latency per endpoint",
+    ("endpoint",),
+)
+
+
+def endpoint_label(end_point: str) -> str:
+    """
+    bounded label: the method path without host and query
+    https://deribit.com/api/v2/public/ticker?instrument_name=.. -> public/ticker
+    """
+
+    return end_point.split("?", 1)[0].rsplit("/api/v2/", 1)[-1]
 
 
 async def get_connected(
@@ -36,107 +62,165 @@ async def get_connected(
     params: str = None,
     ) -> None:
     
-    async with aiohttp.ClientSession() as session:
-        
-        connection_endpoint = connection_url + endpoint
+    session = session_pool.aiohttp_session()
 
-        if client_id:
-            
-            if "telegram" in connection_url: 
-                
-                response = await session.get(connection_url + endpoint)
-            
-            if "deribit" in connection_url: 
+    connection_endpoint = connection_url + endpoint
 
-                id = str_mod.id_numbering(
-                    endpoint,
-                    endpoint,
-                )
+    if client_id:
+        
+        if "telegram" in connection_url:
 
-                payload: Dict = {
-                    "jsonrpc": "2.0",
-                    "id": id,
-                    "method": f"{endpoint}",
-                    "params": params,
-                }
-                
-                async with session.post(
-                    connection_endpoint,
-                    auth=BasicAuth(client_id, client_secret),
-                    json=payload,
-                ) as response:
+            # released to the shared pool once read
+            async with session.get(connection_endpoint) as response:
+
+                # RESToverHTTP Response Content
+                response: Dict = await response.json()
 
-                    # RESToverHTTP Status Code
-                    status_code: int = response.status
+        if "deribit" in connection_url: 
 
-                    # RESToverHTTP Response Content
-                    response: Dict = await response.json()
+            id = str_mod.id_numbering(
+                endpoint,
+                endpoint,
+            )
 
-        else:
+            payload: Dict = {
+                "jsonrpc": "2.0",
+                "id": id,
+                "method": f"{endpoint}",
+                "params": params,
+            }
             
-                async with session.get(connection_endpoint) as response:
+            async with session.post(
+                connection_endpoint,
+                auth=BasicAuth(client_id, client_secret),
+                json=payload,
+            ) as response:
 
-                    # RESToverHTTP Response Content
-                    response: Dict = await response.json()
+                # RESToverHTTP Status Code
+                status_code: int = response.status
 
-        return response
+                # RESToverHTTP Response Content
+                response: Dict = await response.json()
+
+    else:
+        
+        async with session.get(connection_endpoint) as response:
+
+            # RESToverHTTP Response Content
+            response: Dict = await response.json()
+
+    return response
         
 
+def is_idempotent(endpoint: str) -> bool:
+    """reads: safe to retry and hedge"""
+
+    return endpoint.startswith(("public/", "private/get_"))
+
+
 async def private_connection(
     endpoint: str,
     client_id: str,
     client_secret: str,
-    connection_url: str = "https://www.deribit.com/api/v2/",
+    connection_url: str = None,
     params: str = {},
+    priority: int = None,
 ) -> None:
+    """
+    priority: rate_limiting priority, by method when None
 
-    id = str_mod.id_numbering(
-        endpoint,
-        endpoint,
-    )
+    reads are retried (resilience), anything else is sent once: an order
+    may have reached the matching engine
+    """
 
-    payload: Dict = {
-        "jsonrpc": "2.0",
-        "id": id,
-        "method": f"{endpoint}",
-        "params": params,
-    }
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            connection_url + endpoint,
-            auth=BasicAuth(client_id, client_secret),
-            json=payload,
-        ) as response:
+    connection_url = connection_url or DERIBIT_URL
 
-            # RESToverHTTP Status Code
-            status_code: int = response.status
+    rate_limiter = rate_limiting.limiter_for(client_id)
 
-            # RESToverHTTP Response Content
-            response: Dict = await response.json()
+    async def requesting() -> Dict:
+
+        await rate_limiter.acquiring(endpoint, priority)
+
+        id = str_mod.id_numbering(
+            endpoint,
+            endpoint,
+        )
+
+        payload: Dict = {
+            "jsonrpc": "2.0",
+            "id": id,
+            "method": f"{endpoint}",
+            "params": params,
+        }
+
+        session = session_pool.aiohttp_session()
+
+        with REST_SECONDS.labels(endpoint_label(endpoint)).timing():
+            async with session.post(
+                connection_url + endpoint,
+                auth=BasicAuth(client_id, client_secret),
+                json=payload,
+            ) as response:
+
+                # RESToverHTTP Status Code
+                status_code: int = response.status
+
+                # RESToverHTTP Response Content
+                response: Dict = await response.json()
+
+            rate_limiter.checking_response(endpoint, response)
+
+            return response
+
+    if not is_idempotent(endpoint):
+        return await requesting()
+
+    async def reading() -> Dict:
+
+        response = await requesting()
+
+        if rate_limiting.is_rejected(response):
+            raise resilience.RateLimited(f"{endpoint} too_many_requests")
 
         return response
 
+    return await resilience.calling(reading, endpoint_label(endpoint))
+
 
 async def public_connection(
     endpoint: str,
-    connection_url: str = "https://www.deribit.com/api/v2/",
+    connection_url: str = None,
 ) -> None:
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(connection_url + endpoint) as response:
+    connection_url = connection_url or DERIBIT_URL
 
-            # RESToverHTTP Response Content
-            response: Dict = await response.json()
+    async def requesting() -> Dict:
 
-        return response
+        session = session_pool.aiohttp_session()
+
+        with REST_SECONDS.labels(endpoint_label(endpoint)).timing():
+            async with session.get(connection_url + endpoint) as response:
+
+                # RESToverHTTP Response Content
+                response: Dict = await response.json()
+
+            if rate_limiting.is_rejected(response):
+                raise resilience.RateLimited(f"{endpoint} too_many_requests")
+
+            return response
+
+    return await resilience.calling(requesting, endpoint_label(endpoint))
 
 
 async def get_currencies() -> list:
     # Set endpoint
     endpoint: str = f"public/get_currencies?"
 
-    return await public_connection(endpoint=endpoint)
+    return await request_cache.fetching(
+        "get_currencies",
+        endpoint,
+        lambda: public_connection(endpoint=endpoint),
+    )
 
 
 async def get_server_time() -> int:
@@ -156,27 +240,57 @@ async def send_requests_to_url(end_point: str) -> list:
 
     try:
 
-        async with httpx.AsyncClient() as client:
-            result = await client.get(
-                end_point,
-                follow_redirects=True,
-            )
+        client = session_pool.httpx_client()
 
-        return result.json()["result"]
+        async def requesting() -> Dict:
+
+            with REST_SECONDS.labels(endpoint_label(end_point)).timing():
+                result = await client.get(
+                    end_point,
+                    follow_redirects=True,
+                )
+
+            return result.json()["result"]
+
+        # public reads: retried, hedged where the policy says so
+        return await resilience.calling(requesting, endpoint_label(end_point))
 
     except Exception as error:
 
-        await tlgrm.telegram_bot_sendtext(
-            f"error send_requests_to_url - {error} {end_point}",
-            "general_error",
-        )
+        # never raises: callers get None once retries are used up
+        await alerting(f"error send_requests_to_url - {error} {end_point}")
 
 
 async def get_instruments(currency) -> list:
     # Set endpoint
     endpoint: str = f"public/get_instruments?currency={currency.upper()}"
 
-    return await public_connection(endpoint=endpoint)
+    return await request_cache.fetching(
+        "get_instruments",
+        endpoint,
+        lambda: public_connection(endpoint=endpoint),
+    )
+
+
+async def get_book_summary_by_currency(
+    currency: str,
+    kind: str = None,
+) -> list:
+    """
+    one summary (mark, last, best bid/ask, 24h stats) per instrument
+    """
+
+    # Set endpoint
+    endpoint: str = f"public/get_book_summary_by_currency?currency={currency.upper()}"
+
+    if kind:
+        endpoint = f"{endpoint}&kind={kind}"
+
+    return await request_cache.fetching(
+        "get_book_summary_by_currency",
+        endpoint,
+        lambda: public_connection(endpoint=endpoint),
+    )
 
 
 def get_tickers(instrument_name: str) -> list:
@@ -186,7 +300,9 @@ def get_tickers(instrument_name: str) -> list:
         f"https://deribit.com/api/v2/public/ticker?instrument_name={instrument_name}"
     )
 
-    with httpx.Client() as client:
+    client = session_pool.httpx_sync_client()
+
+    with REST_SECONDS.labels(endpoint_label(end_point)).timing():
         result = client.get(end_point, follow_redirects=True).json()["result"]
 
     return result
@@ -199,20 +315,24 @@ async def async_get_tickers(instrument_name: str) -> list:
         f"https://deribit.com/api/v2/public/ticker?instrument_name={instrument_name}"
     )
 
-    return await send_requests_to_url(end_point)
+    # tickers are updated in place by the ticker cache: callers get copies
+    return await request_cache.fetching(
+        "ticker",
+        end_point,
+        lambda: send_requests_to_url(end_point),
+        copying=True,
+    )
 
 
-def ohlc_end_point(
-    instrument_name: str,
+def ohlc_range(
     resolution: int,
     qty_or_start_time_stamp: int,
     provided_end_timestamp: int = None,
     qty_as_start_time_stamp: bool = False,
-) -> str:
-
-    url = f"https://deribit.com/api/v2/public/get_tradingview_chart_data?"
+) -> tuple:
+    """(start_timestamp, end_timestamp)"""
 
-    now_unix = time_mod.get_now_unix_time()
+    now_unix = clock.now_ms("deribit")
 
     # start timestamp is provided
     start_timestamp = qty_or_start_time_stamp
@@ -226,6 +346,26 @@ def ohlc_end_point(
     else:
         end_timestamp = now_unix
 
+    return start_timestamp, end_timestamp
+
+
+def ohlc_end_point(
+    instrument_name: str,
+    resolution: int,
+    qty_or_start_time_stamp: int,
+    provided_end_timestamp: int = None,
+    qty_as_start_time_stamp: bool = False,
+) -> str:
+
+    url = f"https://deribit.com/api/v2/public/get_tradingview_chart_data?"
+
+    start_timestamp, end_timestamp = ohlc_range(
+        resolution,
+        qty_or_start_time_stamp,
+        provided_end_timestamp,
+        qty_as_start_time_stamp,
+    )
+
     return f"{url}end_timestamp={end_timestamp}&instrument_name={instrument_name}&resolution={resolution}&start_timestamp={start_timestamp}"
 
 
@@ -245,19 +385,24 @@ async def get_ohlc_data(
     provided_end_timestamp: bool = None,
     qty_as_start_time_stamp: bool = False,
 ) -> list:
+    """
+    any range: fetched as parallel chunks of at most
+    ohlc_backfilling.MAX_CANDLES candles
+    """
 
-    # Set endpoint
-    end_point = ohlc_end_point(
-        instrument_name,
+    start_timestamp, end_timestamp = ohlc_range(
         resolution,
         qty_or_start_time_stamp,
         provided_end_timestamp,
         qty_as_start_time_stamp,
     )
 
-    result = await send_requests_to_url(end_point)
-
-    return str_mod.transform_nested_dict_to_list_ohlc(result)
+    return await ohlc_backfilling.fetching_ohlc(
+        instrument_name,
+        resolution,
+        start_timestamp,
+        end_timestamp,
+    )
 
 
 @dataclass(unsafe_hash=True, slots=True)
@@ -267,7 +412,28 @@ class SendApiRequest:
     sub_account_id: str
     client_id: str
     client_secret: str
-    
+    # ws_rpc.WsRpcTransport: private calls over the authenticated WebSocket
+    transport: object = None
+
+    async def requesting(
+        self,
+        endpoint: str,
+        params: dict = {},
+    ) -> dict:
+        """
+        over the WebSocket when the transport is attached, HTTP otherwise
+        """
+
+        if self.transport is not None and self.transport.connected:
+            return await self.transport.calling(endpoint, params)
+
+        return await private_connection(
+            endpoint,
+            self.client_id,
+            self.client_secret,
+            params=params,
+        )
+
     async def send_order(
         self,
         side: str,
@@ -323,11 +489,9 @@ class SendApiRequest:
 
             endpoint: str = get_end_point_based_on_side(side)
 
-            result = await private_connection(
-            endpoint,
-            self.client_id,
-            self.client_secret,        
-            params,
+            result = await self.requesting(
+                endpoint,
+                params=params,
             )
 
         return result
@@ -343,12 +507,10 @@ class SendApiRequest:
 
         params = {"kind": kind, "type": type}
 
-        result_open_order = await private_connection(
+        result_open_order = await self.requesting(
             endpoint,
-            self.client_id,
-            self.client_secret,        
-            params,
-            )
+            params=params,
+        )
 
         return result_open_order["result"]
 
@@ -444,12 +606,10 @@ class SendApiRequest:
 
         params = {"with_portfolio": True}
 
-        result_sub_account = await private_connection(
+        result_sub_account = await self.requesting(
             endpoint,
-            self.client_id,
-            self.client_secret,        
-            params,
-            )
+            params=params,
+        )
 
         return result_sub_account["result"]
 
@@ -578,13 +738,10 @@ class SendApiRequest:
             "with_open_orders": True,
         }
 
-        result_sub_account = await private_connection(
+        result_sub_account = await self.requesting(
             endpoint,
-            self.client_id,
-            self.client_secret,  
-                        params,
-      
-            )
+            params=params,
+        )
 
         return result_sub_account["result"]
 
@@ -603,12 +760,9 @@ class SendApiRequest:
             "count": count,
         }
 
-        user_trades = await private_connection(
+        user_trades = await self.requesting(
             endpoint,
-            self.client_id,
-            self.client_secret,       
-                        params,
- 
+            params=params,
         )
         
         return [] if user_trades == [] else user_trades["result"]["trades"]
@@ -619,28 +773,20 @@ class SendApiRequest:
         start_timestamp: int,
         count: int = 1000,
     ) -> list:
+        """
+        every trade since start_timestamp, oldest first (all pages, windows
+        fetched concurrently). count: page size
+        """
 
-        # Set endpoint
-        endpoint: str = f"private/get_user_trades_by_instrument_and_time"
-
-        now_unix = time_mod.get_now_unix_time()
-
-        params = {
-            "count": count,
-            "end_timestamp": now_unix,
-            "instrument_name": instrument_name,
-            "start_timestamp": start_timestamp,
-        }
-
-        user_trades = await private_connection(
-            endpoint,
-            self.client_id,
-            self.client_secret,   
-                        params,
-     
-            )
+        now_unix = clock.now_ms("deribit")
 
-        return [] if user_trades == [] else user_trades["result"]["trades"]
+        return await history_fetching.fetching_user_trades(
+            self,
+            instrument_name,
+            start_timestamp,
+            now_unix,
+            count=count,
+        )
 
     async def get_cancel_order_all(self):
 
@@ -649,12 +795,10 @@ class SendApiRequest:
 
         params = {"detailed": False}
 
-        result = await private_connection(
+        result = await self.requesting(
             endpoint,
-            self.client_id,
-            self.client_secret,        
-            params,
-            )
+            params=params,
+        )
 
         return result
 
@@ -674,7 +818,7 @@ class SendApiRequest:
 
         """
 
-        now_unix = time_mod.get_now_unix_time()
+        now_unix = clock.now_ms("deribit")
 
         # Set endpoint
         endpoint: str = f"private/get_transaction_log"
@@ -686,12 +830,10 @@ class SendApiRequest:
             "start_timestamp": start_timestamp,
         }
 
-        result_transaction_log_to_result = await private_connection(
+        result_transaction_log_to_result = await self.requesting(
             endpoint,
-            self.client_id,
-            self.client_secret,        
-            params,
-            )
+            params=params,
+        )
 
         try:
             result = result_transaction_log_to_result["result"]
@@ -715,12 +857,10 @@ class SendApiRequest:
 
         params = {"order_id": order_id}
 
-        result = await private_connection(
+        result = await self.requesting(
             endpoint,
-            self.client_id,
-            self.client_secret,        
-            params,
-            )
+            params=params,
+        )
 
         return result
 
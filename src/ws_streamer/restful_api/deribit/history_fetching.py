@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+"""
+Complete history over a time range, fetched concurrently.
+
+The range is split into windows fetched side by side (at most
+`concurrency` at once, every page still waits for rate-limit credits in
+private_connection / the WebSocket transport). Inside a window pages are
+followed until the exchange has nothing more:
+    get_transaction_log                      `continuation` token
+    get_user_trades_by_instrument_and_time   first page, then
+    get_user_trades_by_instrument            `has_more`, next page starts
+                                             after the last trade_seq seen
+
+Entries are deduplicated by trade_id (window edges, overlapping pages) and
+handed to `on_batch` page by page, so they can be written while the rest
+is still downloading:
+
+    await history_fetching.fetching_transaction_log(
+        private_data,
+        "BTC",
+        start_timestamp,
+        end_timestamp,
+        on_batch=lambda rows: db_mgt.inserting_many(table, rows),
+    )
+"""
+
+# built ins
+import asyncio
+
+# installed
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.utilities import metrics
+
+WINDOW_MS = 24 * 60 * 60 * 1000  # one day
+CONCURRENCY = 4
+
+TRANSACTION_LOG_PAGE = 250  # exchange maximum
+USER_TRADES_PAGE = 1000  # exchange maximum
+
+HISTORY_PAGES = metrics.counter(
+    "ws_streamer_history_pages_total",
+    "history pages fetched, per endpoint",
+    ("endpoint",),
+)
+
+
+def splitting_windows(
+    start_timestamp: int,
+    end_timestamp: int,
+    window_ms: int = WINDOW_MS,
+) -> list:
+    """[(start, end)], consecutive, covering start..end"""
+
+    windows = []
+
+    window_start = start_timestamp
+
+    while window_start < end_timestamp:
+
+        window_end = min(window_start + window_ms, end_timestamp)
+
+        windows.append((window_start, window_end))
+
+        window_start = window_end
+
+    return windows
+
+
+def identifying(entry: dict) -> object:
+    """trade_id, the log id for entries without a trade"""
+
+    return entry.get("trade_id") or entry.get("id")
+
+
+async def paging_transaction_log(
+    private_data: object,
+    currency: str,
+    start_timestamp: int,
+    end_timestamp: int,
+    query: str = "trade",
+):
+    """pages of private/get_transaction_log for one window"""
+
+    endpoint: str = "private/get_transaction_log"
+
+    continuation = None
+
+    while True:
+
+        params = {
+            "count": TRANSACTION_LOG_PAGE,
+            "currency": currency.upper(),
+            "end_timestamp": end_timestamp,
+            "query": query,
+            "start_timestamp": start_timestamp,
+        }
+
+        if continuation:
+            params["continuation"] = continuation
+
+        response = await private_data.requesting(endpoint, params=params)
+
+        HISTORY_PAGES.labels(endpoint).inc()
+
+        if "result" not in response:
+            raise RuntimeError(f"{endpoint} {response.get('error')} {params}")
+
+        result = response["result"] or {}
+
+        yield result.get("logs") or []
+
+        continuation = result.get("continuation")
+
+        if not continuation:
+            return
+
+
+async def paging_user_trades(
+    private_data: object,
+    instrument_name: str,
+    start_timestamp: int,
+    end_timestamp: int,
+    count: int = USER_TRADES_PAGE,
+):
+    """
+    pages of one window's user trades: the first by time, the next ones by
+    trade_seq, so trades sharing a page's last millisecond are neither
+    skipped nor fetched again
+    """
+
+    endpoint: str = "private/get_user_trades_by_instrument_and_time"
+
+    params = {
+        "count": count,
+        "end_timestamp": end_timestamp,
+        "instrument_name": instrument_name,
+        "sorting": "asc",
+        "start_timestamp": start_timestamp,
+    }
+
+    while True:
+
+        response = await private_data.requesting(endpoint, params=params)
+
+        HISTORY_PAGES.labels(endpoint).inc()
+
+        if "result" not in response:
+            raise RuntimeError(f"{endpoint} {response.get('error')} {params}")
+
+        trades = response["result"]["trades"]
+
+        # paging by sequence runs past the window
+        in_window = [o for o in trades if o["timestamp"] <= end_timestamp]
+
+        yield in_window
+
+        if (
+            not response["result"].get("has_more")
+            or not trades
+            or len(in_window) < len(trades)
+        ):
+            return
+
+        endpoint = "private/get_user_trades_by_instrument"
+
+        params = {
+            "count": count,
+            "instrument_name": instrument_name,
+            "sorting": "asc",
+            "start_seq": trades[-1]["trade_seq"] + 1,
+        }
+
+
+async def fetching_windows(
+    paging: callable,
+    windows: list,
+    on_batch: callable = None,
+    concurrency: int = CONCURRENCY,
+) -> list:
+    """
+    paging(window_start, window_end): async generator of pages.
+    on_batch(rows): coroutine function, called with every page's new rows.
+
+    Returns every row, oldest first, when on_batch is None, [] otherwise.
+    A failing window cancels the others, its error is raised as is
+    """
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    seen = set()
+
+    collected = []
+
+    async def fetching_window(window: tuple) -> None:
+
+        async with semaphore:
+
+            async for page in paging(*window):
+
+                rows = []
+
+                for entry in page:
+
+                    entry_id = identifying(entry)
+
+                    if entry_id is not None:
+
+                        if entry_id in seen:
+                            continue
+
+                        seen.add(entry_id)
+
+                    rows.append(entry)
+
+                if not rows:
+                    continue
+
+                if on_batch is None:
+                    collected.extend(rows)
+
+                else:
+                    await on_batch(rows)
+
+    tasks = [asyncio.create_task(fetching_window(o)) for o in windows]
+
+    try:
+        await asyncio.gather(*tasks)
+
+    finally:
+
+        # a window failed (or the caller was cancelled): stop the others
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    log.info(f"history {len(windows)} windows, {len(seen)} entries")
+
+    return sorted(collected, key=lambda o: o.get("timestamp", 0))
+
+
+async def fetching_transaction_log(
+    private_data: object,
+    currency: str,
+    start_timestamp: int,
+    end_timestamp: int,
+    query: str = "trade",
+    on_batch: callable = None,
+    window_ms: int = WINDOW_MS,
+    concurrency: int = CONCURRENCY,
+) -> list:
+    """
+    private_data: api_requests.SendApiRequest
+    """
+
+    return await fetching_windows(
+        lambda window_start, window_end: paging_transaction_log(
+            private_data, currency, window_start, window_end, query
+        ),
+        splitting_windows(start_timestamp, end_timestamp, window_ms),
+        on_batch,
+        concurrency,
+    )
+
+
+async def fetching_user_trades(
+    private_data: object,
+    instrument_name: str,
+    start_timestamp: int,
+    end_timestamp: int,
+    on_batch: callable = None,
+    window_ms: int = WINDOW_MS,
+    concurrency: int = CONCURRENCY,
+    count: int = USER_TRADES_PAGE,
+) -> list:
+    """
+    private_data: api_requests.SendApiRequest
+    count: page size
+    """
+
+    return await fetching_windows(
+        lambda window_start, window_end: paging_user_trades(
+            private_data, instrument_name, window_start, window_end, count
+        ),
+        splitting_windows(start_timestamp, end_timestamp, window_ms),
+        on_batch,
+        concurrency,
+    )
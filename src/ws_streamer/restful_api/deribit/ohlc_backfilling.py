@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+
+"""
+Deribit candles over any range, fetched as parallel chunks.
+
+public/get_tradingview_chart_data answers at most MAX_CANDLES candles per
+call. A range is planned as consecutive chunks of that size (by
+resolution) and the chunks of every job are fetched side by side (at most
+`concurrency` at once, each waiting for rate-limit credits). Failed chunks
+are retried, and skipped while the endpoint's circuit is open
+(restful_api.resilience).
+
+The answers stay columnar (ticks/open/high/low/close/volume/cost arrays)
+until every chunk is in: chunks are concatenated column by column and
+turned into candles once.
+
+    candles = await ohlc_backfilling.fetching_ohlc(
+        "BTC-PERPETUAL", 1, start_timestamp, end_timestamp
+    )
+
+    # many instruments and resolutions, sharing one concurrency budget
+    candles_all = await ohlc_backfilling.backfilling_ohlc(
+        [("BTC-PERPETUAL", 1), ("BTC-PERPETUAL", 60), ("ETH-PERPETUAL", "1D")],
+        start_timestamp,
+        end_timestamp,
+    )
+    candles_all[("ETH-PERPETUAL", "1D")]
+"""
+
+# built ins
+import asyncio
+import time
+
+# installed
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.restful_api import resilience, session_pool
+from ws_streamer.restful_api.deribit import rate_limiting
+from ws_streamer.utilities import metrics, string_modification as str_mod
+
+ENDPOINT = "public/get_tradingview_chart_data"
+OHLC_URL = f"https://www.deribit.com/api/v2/{ENDPOINT}"
+
+MAX_CANDLES = 5_000  # per request
+CONCURRENCY = 8
+
+# public calls count against the IP, not a sub-account
+PUBLIC_LIMITER = "public"
+
+COLUMNS = ("ticks", "open", "high", "low", "close", "volume", "cost")
+
+OHLC_CHUNKS = metrics.counter(
+    "ws_streamer_ohlc_chunks_total",
+    "OHLC backfill chunks: ok, failed (retries used up), rejected (circuit open)",
+    ("result",),
+)
+
+
+def resolution_in_ms(resolution: str | int) -> int:
+    """
+    chart.trades resolution: minutes ("1", "60") or "1D"
+    """
+
+    resolution = str(resolution)
+
+    return (int(resolution) if resolution.isdigit() else 1440) * 60_000
+
+
+def planning_chunks(
+    start_timestamp: int,
+    end_timestamp: int,
+    resolution: str | int,
+    max_candles: int = MAX_CANDLES,
+) -> list:
+    """
+    [(start, end)], consecutive, each at most max_candles candles
+    (both ends inclusive, as the exchange counts them)
+    """
+
+    candle_ms = resolution_in_ms(resolution)
+
+    span = candle_ms * max_candles
+
+    chunks = []
+
+    chunk_start = start_timestamp
+
+    while chunk_start <= end_timestamp:
+
+        chunks.append((chunk_start, min(chunk_start + span - candle_ms, end_timestamp)))
+
+        chunk_start += span
+
+    return chunks
+
+
+def merging_columns(results: list) -> dict:
+    """
+    chunk answers, in any order, to one columnar result in tick order.
+    Ticks already taken (overlapping chunk edges) are skipped
+    """
+
+    merged = {o: [] for o in COLUMNS}
+
+    results = sorted(
+        (o for o in results if o and o.get("ticks")),
+        key=lambda o: o["ticks"][0],
+    )
+
+    last_tick = None
+
+    for result in results:
+
+        ticks = result["ticks"]
+
+        first = 0
+
+        if last_tick is not None:
+
+            while first < len(ticks) and ticks[first] <= last_tick:
+                first += 1
+
+        if first == len(ticks):
+            continue
+
+        for column in COLUMNS:
+            merged[column].extend(result.get(column, [])[first:])
+
+        last_tick = ticks[-1]
+
+    return merged
+
+
+async def requesting_chunk(
+    instrument_name: str,
+    resolution: str | int,
+    start_timestamp: int,
+    end_timestamp: int,
+) -> dict:
+    """one call, the columnar result. Raises on any failure"""
+
+    await rate_limiting.limiter_for(PUBLIC_LIMITER).acquiring(ENDPOINT)
+
+    session = session_pool.aiohttp_session()
+
+    params = dict(
+        end_timestamp=end_timestamp,
+        instrument_name=instrument_name,
+        resolution=str(resolution),
+        start_timestamp=start_timestamp,
+    )
+
+    async with session.get(OHLC_URL, params=params) as response:
+        response = await response.json()
+
+    rate_limiting.limiter_for(PUBLIC_LIMITER).checking_response(ENDPOINT, response)
+
+    if rate_limiting.is_rejected(response):
+        raise resilience.RateLimited(f"{ENDPOINT} too_many_requests")
+
+    if "result" not in response:
+        raise RuntimeError(f"{ENDPOINT} {response.get('error')} {params}")
+
+    return response["result"]
+
+
+async def fetching_chunk(
+    instrument_name: str,
+    resolution: str | int,
+    chunk: tuple,
+    semaphore: asyncio.Semaphore,
+) -> dict:
+    """retried through resilience, None when the chunk could not be fetched"""
+
+    async def requesting() -> dict:
+
+        # backoffs between attempts do not hold a slot
+        async with semaphore:
+            return await requesting_chunk(instrument_name, resolution, *chunk)
+
+    try:
+
+        result = await resilience.calling(requesting, ENDPOINT)
+
+        OHLC_CHUNKS.labels("ok").inc()
+
+        return result
+
+    except resilience.CircuitOpenError as error:
+
+        OHLC_CHUNKS.labels("rejected").inc()
+
+        log.error(f"{instrument_name} {resolution} {chunk} skipped: {error}")
+
+    except Exception as error:
+
+        OHLC_CHUNKS.labels("failed").inc()
+
+        log.error(f"{ENDPOINT} {instrument_name} {resolution} {chunk} failed: {error!r}")
+
+
+async def fetching_columns(
+    instrument_name: str,
+    resolution: str | int,
+    start_timestamp: int,
+    end_timestamp: int,
+    semaphore: asyncio.Semaphore = None,
+    max_candles: int = MAX_CANDLES,
+) -> dict:
+    """columnar candles of one instrument and resolution"""
+
+    semaphore = semaphore or asyncio.Semaphore(CONCURRENCY)
+
+    results = await asyncio.gather(
+        *[
+            fetching_chunk(instrument_name, resolution, chunk, semaphore)
+            for chunk in planning_chunks(
+                start_timestamp, end_timestamp, resolution, max_candles
+            )
+        ]
+    )
+
+    return merging_columns(results)
+
+
+async def fetching_ohlc(
+    instrument_name: str,
+    resolution: str | int,
+    start_timestamp: int,
+    end_timestamp: int,
+    semaphore: asyncio.Semaphore = None,
+    max_candles: int = MAX_CANDLES,
+) -> list:
+    """
+    candles shaped like chart.trades data, oldest first:
+    [{'tick', 'open', 'high', 'low', 'close', 'volume', 'cost'}, ..]
+    """
+
+    return str_mod.transform_nested_dict_to_list_ohlc(
+        await fetching_columns(
+            instrument_name,
+            resolution,
+            start_timestamp,
+            end_timestamp,
+            semaphore,
+            max_candles,
+        )
+    )
+
+
+async def backfilling_ohlc(
+    jobs: list,
+    start_timestamp: int,
+    end_timestamp: int,
+    concurrency: int = CONCURRENCY,
+    columnar: bool = False,
+) -> dict:
+    """
+    jobs: [(instrument_name, resolution)]
+    columnar: keep the ticks/open/high/.. arrays instead of candle dicts
+
+    Returns {(instrument_name, resolution): candles}
+    """
+
+    started = time.perf_counter()
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    fetching = fetching_columns if columnar else fetching_ohlc
+
+    results = await asyncio.gather(
+        *[
+            fetching(
+                instrument_name,
+                resolution,
+                start_timestamp,
+                end_timestamp,
+                semaphore,
+            )
+            for instrument_name, resolution in jobs
+        ]
+    )
+
+    log.info(
+        f"ohlc backfill {len(jobs)} jobs in {time.perf_counter() - started:.1f}s"
+    )
+
+    return dict(zip([tuple(o) for o in jobs], results))
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+
+"""
+Deribit credit-based rate limiting, shared by REST and WebSocket calls.
+
+Deribit keeps two credit pools per sub-account:
+    matching_engine      buy, sell, edit, cancel, close_position, ..
+    non_matching_engine  everything else (queries, subscriptions, auth)
+
+Both are modelled as token buckets (capacity, refill per second, cost per
+request). A call waits until its bucket has the credits; waiting calls are
+served by priority, then arrival, so cancels and orders are never stuck
+behind housekeeping queries:
+
+    await rate_limiting.limiter_for(client_id).acquiring("private/cancel")
+
+A too_many_requests answer (code 10028) empties the bucket, so the calls
+that follow wait for a full refill.
+
+Defaults are Deribit's documented tier-free limits: non matching engine
+50_000 credits, 10_000 per second, 500 per request (20 requests/s, bursts
+of 100); matching engine 20 requests burst, 5 per second.
+"""
+
+# built ins
+import asyncio
+import heapq
+import itertools
+import time
+
+# installed
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.utilities import metrics
+
+MATCHING_ENGINE = "matching_engine"
+NON_MATCHING_ENGINE = "non_matching_engine"
+
+# (capacity, refill per second, cost per request)
+DEFAULT_BUCKETS = {
+    MATCHING_ENGINE: (20, 5, 1),
+    NON_MATCHING_ENGINE: (50_000, 10_000, 500),
+}
+
+MATCHING_ENGINE_METHODS = (
+    "private/buy",
+    "private/sell",
+    "private/edit",
+    "private/cancel",
+    "private/close_position",
+    "private/mass_quote",
+)
+
+TOO_MANY_REQUESTS = 10028
+
+# lower is served first
+CANCELLING = 0
+TRADING = 1
+QUERYING = 2
+HOUSEKEEPING = 3
+
+PRIORITY_NAMES = {
+    CANCELLING: "cancelling",
+    TRADING: "trading",
+    QUERYING: "querying",
+    HOUSEKEEPING: "housekeeping",
+}
+
+RATE_LIMIT_WAIT_SECONDS = metrics.histogram(
+    "ws_streamer_rate_limit_wait_seconds",
+    "time a Deribit call waited for credits",
+    ("bucket", "priority"),
+)
+
+RATE_LIMIT_REJECTIONS = metrics.counter(
+    "ws_streamer_rate_limit_rejections_total",
+    "too_many_requests answers from Deribit",
+    ("bucket",),
+)
+
+
+def bucket_of(method: str) -> str:
+    """ """
+
+    if method.startswith(MATCHING_ENGINE_METHODS):
+        return MATCHING_ENGINE
+
+    return NON_MATCHING_ENGINE
+
+
+def default_priority(method: str) -> int:
+    """
+    cancels first, then orders, queries, and subscriptions/public last
+    """
+
+    if method.startswith(("private/cancel", "private/close_position")):
+        return CANCELLING
+
+    if bucket_of(method) == MATCHING_ENGINE:
+        return TRADING
+
+    if method.startswith("private/get_"):
+        return QUERYING
+
+    return HOUSEKEEPING
+
+
+def is_rejected(response: object) -> bool:
+    """ """
+
+    return (
+        isinstance(response, dict)
+        and isinstance(response.get("error"), dict)
+        and response["error"].get("code") == TOO_MANY_REQUESTS
+    )
+
+
+class CreditBucket:
+    """ """
+
+    def __init__(
+        self,
+        name: str,
+        capacity: float,
+        refill_per_second: float,
+        cost: float,
+    ):
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.cost = cost
+        self.credits = capacity
+        self.updated_at = time.monotonic()
+        self.waiters = []  # heap of (priority, arrival, cost, future)
+        self.arrivals = itertools.count()
+        self.granting_task = None
+
+    def refilling(self) -> None:
+        """ """
+
+        now = time.monotonic()
+
+        self.credits = min(
+            self.capacity,
+            self.credits + (now - self.updated_at) * self.refill_per_second,
+        )
+
+        self.updated_at = now
+
+    def charging(self, cost: float = None) -> None:
+        """spend without waiting (answers the exchange requires, e.g. heartbeat)"""
+
+        self.refilling()
+        self.credits -= self.cost if cost is None else cost
+
+    def emptying(self) -> None:
+        """the exchange disagrees with our count: start from nothing"""
+
+        self.refilling()
+        self.credits = min(self.credits, 0)
+
+    async def acquiring(
+        self,
+        priority: int,
+        cost: float = None,
+    ) -> float:
+        """seconds waited"""
+
+        cost = self.cost if cost is None else cost
+
+        self.refilling()
+
+        # nobody queued: no need to keep an order
+        if not self.waiters and self.credits >= cost:
+            self.credits -= cost
+            return 0.0
+
+        started = time.monotonic()
+
+        future = asyncio.get_running_loop().create_future()
+
+        heapq.heappush(self.waiters, (priority, next(self.arrivals), cost, future))
+
+        if self.granting_task is None or self.granting_task.done():
+            self.granting_task = asyncio.ensure_future(self.granting())
+
+        await future
+
+        return time.monotonic() - started
+
+    async def granting(self) -> None:
+        """serves the waiters, highest priority first, as credits come in"""
+
+        while self.waiters:
+
+            priority, arrival, cost, future = self.waiters[0]
+
+            # the caller gave up (cancelled, timed out)
+            if future.done():
+                heapq.heappop(self.waiters)
+                continue
+
+            self.refilling()
+
+            if self.credits >= cost:
+
+                heapq.heappop(self.waiters)
+
+                self.credits -= cost
+
+                future.set_result(None)
+
+                continue
+
+            await asyncio.sleep((cost - self.credits) / self.refill_per_second)
+
+
+class CreditLimiter:
+    """ """
+
+    def __init__(
+        self,
+        buckets: dict = None,
+    ):
+        self.buckets = {
+            name: CreditBucket(name, *limits)
+            for name, limits in (buckets or DEFAULT_BUCKETS).items()
+        }
+
+    async def acquiring(
+        self,
+        method: str,
+        priority: int = None,
+    ) -> float:
+        """waits for the credits of one method call, seconds waited"""
+
+        bucket = self.buckets[bucket_of(method)]
+
+        priority = default_priority(method) if priority is None else priority
+
+        waited = await bucket.acquiring(priority)
+
+        RATE_LIMIT_WAIT_SECONDS.labels(
+            bucket.name, PRIORITY_NAMES.get(priority, str(priority))
+        ).observe(waited)
+
+        return waited
+
+    def charging(self, method: str) -> None:
+        """ """
+
+        self.buckets[bucket_of(method)].charging()
+
+    def checking_response(
+        self,
+        method: str,
+        response: object,
+    ) -> None:
+        """ """
+
+        if is_rejected(response):
+
+            bucket = self.buckets[bucket_of(method)]
+
+            bucket.emptying()
+
+            RATE_LIMIT_REJECTIONS.labels(bucket.name).inc()
+
+            log.warning(f"too_many_requests {method}, {bucket.name} credits reset")
+
+
+LIMITERS = {}  # client_id: CreditLimiter, Deribit counts per sub-account
+
+
+def limiter_for(client_id: str) -> CreditLimiter:
+    """ """
+
+    limiter = LIMITERS.get(client_id)
+
+    if limiter is None:
+        limiter = LIMITERS[client_id] = CreditLimiter()
+
+    return limiter
+
+
+def collecting_metrics() -> list:
+    """ """
+
+    buckets = [
+        (client_id, bucket)
+        for client_id, limiter in list(LIMITERS.items())
+        for bucket in limiter.buckets.values()
+    ]
+
+    return [
+        (
+            "ws_streamer_rate_limit_credits",
+            "gauge",
+            "credits left per Deribit bucket",
+            {
+                (("client_id", client_id), ("bucket", bucket.name)): bucket.credits
+                for client_id, bucket in buckets
+            },
+        ),
+        (
+            "ws_streamer_rate_limit_waiting",
+            "gauge",
+            "calls waiting for credits per Deribit bucket",
+            {
+                (("client_id", client_id), ("bucket", bucket.name)): len(
+                    bucket.waiters
+                )
+                for client_id, bucket in buckets
+            },
+        ),
+    ]
+
+
+metrics.registering_collector(collecting_metrics)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+JSON-RPC over the authenticated Deribit WebSocket.
+
+Each request gets a unique id and a future. The receive loop of the
+connection (StreamingAccountData.handling_control_message) hands every
+response to `resolving`, which completes the waiting call, so any number
+of calls may be in flight at once.
+
+    transport = WsRpcTransport()
+    streaming = StreamingAccountData(sub_account_id, rpc_transport=transport)
+    private_data = SendApiRequest(sub_account_id, client_id, client_secret,
+                                  transport=transport)
+
+    # over the socket once it is authenticated, HTTP before that
+    await private_data.send_order("buy", "BTC-PERPETUAL", 10, label, price)
+"""
+
+# built ins
+import asyncio
+import itertools
+
+# installed
+import orjson
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.utilities import metrics
+
+DEFAULT_TIMEOUT = 10  # seconds
+
+# above the fixed ids of the connection itself (auth 9929, heartbeat 9098 and
+# 8212) and of id_numbering
+FIRST_RPC_ID = 100_000
+
+WS_RPC_SECONDS = metrics.histogram(
+    "ws_streamer_ws_rpc_seconds",
+    "JSON-RPC round trip over the WebSocket, per method",
+    ("method",),
+)
+
+WS_RPC_FAILURES = metrics.counter(
+    "ws_streamer_ws_rpc_failures_total",
+    "JSON-RPC calls over the WebSocket that timed out or lost the connection",
+    ("method", "reason"),
+)
+
+
+class WsRpcTransport:
+    """ """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.timeout = timeout
+        self.websocket_client = None
+        self.rate_limiter = None
+        self.pending = {}  # id: future
+        self.ids = itertools.count(FIRST_RPC_ID)
+
+    @property
+    def connected(self) -> bool:
+        return self.websocket_client is not None
+
+    def attaching(
+        self,
+        websocket_client: object,
+        rate_limiter: object = None,
+    ) -> None:
+        """
+        connection authenticated: private calls may use it.
+        rate_limiter: rate_limiting.CreditLimiter of the account
+        """
+
+        self.websocket_client = websocket_client
+        self.rate_limiter = rate_limiter
+
+        log.info("ws rpc transport attached")
+
+    def detaching(self) -> None:
+        """connection lost: calls in flight fail, new ones go over HTTP"""
+
+        self.websocket_client = None
+
+        for future in self.pending.values():
+
+            if not future.done():
+                future.set_exception(ConnectionError("websocket closed"))
+
+        self.pending.clear()
+
+    def resolving(self, message: dict) -> bool:
+        """
+        receive loop side. True when message answered one of our calls
+        """
+
+        future = self.pending.pop(message.get("id"), None)
+
+        if future is None:
+            return False
+
+        if not future.done():
+            future.set_result(message)
+
+        return True
+
+    async def calling(
+        self,
+        method: str,
+        params: dict = None,
+        timeout: float = None,
+        priority: int = None,
+    ) -> dict:
+        """
+        the whole response ({"jsonrpc", "id", "result" or "error", ..}), as
+        private_connection returns it.
+
+        raises ConnectionError when not attached or disconnected meanwhile,
+        asyncio.TimeoutError after timeout. Not retried: an order may have
+        reached the matching engine
+        """
+
+        if self.websocket_client is None:
+            raise ConnectionError("websocket not attached")
+
+        if self.rate_limiter:
+            await self.rate_limiter.acquiring(method, priority)
+
+        # may have been detached while waiting for credits
+        websocket_client = self.websocket_client
+
+        if websocket_client is None:
+            raise ConnectionError("websocket not attached")
+
+        id = next(self.ids)
+
+        future = asyncio.get_running_loop().create_future()
+
+        self.pending[id] = future
+
+        msg: dict = {
+            "jsonrpc": "2.0",
+            "id": id,
+            "method": method,
+            "params": params or {},
+        }
+
+        try:
+
+            with WS_RPC_SECONDS.labels(method).timing():
+
+                try:
+                    await websocket_client.send(orjson.dumps(msg).decode())
+
+                except Exception as error:
+                    raise ConnectionError(f"websocket send {error}") from error
+
+                response = await asyncio.wait_for(future, timeout or self.timeout)
+
+            if self.rate_limiter:
+                self.rate_limiter.checking_response(method, response)
+
+            return response
+
+        except asyncio.TimeoutError:
+
+            WS_RPC_FAILURES.labels(method, "timeout").inc()
+            raise
+
+        except ConnectionError:
+
+            WS_RPC_FAILURES.labels(method, "disconnected").inc()
+            raise
+
+        finally:
+            self.pending.pop(id, None)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""
+Single-flight coalescing and TTL cache for public REST lookups.
+
+Concurrent callers asking for the same key share one request in flight.
+Its answer is kept for the endpoint's lifetime (ENDPOINT_TTLS) and can be
+dropped earlier by an event:
+
+    await request_cache.fetching(
+        "get_instruments", endpoint, lambda: public_connection(endpoint)
+    )
+
+    # instruments change when the nearest one expires
+    request_cache.REQUEST_CACHE.expiring_at(
+        "get_instruments", min_expiration_timestamp
+    )
+
+Failed requests (exceptions, None, JSON-RPC errors) are not cached.
+"""
+
+# built ins
+import asyncio
+import copy
+import time
+
+# user defined formula
+from ws_streamer.utilities import clock, metrics
+
+# seconds, 0: coalescing only
+ENDPOINT_TTLS = dict(
+    get_currencies=86_400,
+    get_instruments=3_600,
+    get_book_summary_by_currency=1,
+    ticker=1,
+)
+
+REQUEST_CACHE_LOOKUPS = metrics.counter(
+    "ws_streamer_request_cache_total",
+    "REST cache lookups per endpoint: hit, miss, coalesced (joined a request in flight)",
+    ("endpoint", "result"),
+)
+
+
+def is_cacheable(value: object) -> bool:
+    """ """
+
+    if value is None:
+        return False
+
+    if isinstance(value, dict) and "error" in value:
+        return False
+
+    return True
+
+
+class RequestCache:
+    """ """
+
+    def __init__(
+        self,
+        ttls: dict = None,
+    ):
+        self.ttls = ENDPOINT_TTLS if ttls is None else ttls
+        self.entries = {}  # (endpoint, key): (value, expires_at monotonic)
+        self.in_flight = {}  # (endpoint, key): task
+        self.deadlines = {}  # endpoint: unix ms its entries are dropped at
+
+    def invalidating(self, endpoint: str) -> None:
+        """drop every entry of endpoint"""
+
+        for entry_key in [o for o in self.entries if o[0] == endpoint]:
+            del self.entries[entry_key]
+
+        self.deadlines.pop(endpoint, None)
+
+    def expiring_at(
+        self,
+        endpoint: str,
+        unix_ms: int,
+    ) -> None:
+        """entries of endpoint are dropped once unix_ms has passed"""
+
+        current = self.deadlines.get(endpoint)
+
+        if current is None or unix_ms < current:
+            self.deadlines[endpoint] = unix_ms
+
+    def looking_up(
+        self,
+        endpoint: str,
+        key: str,
+    ) -> tuple:
+        """(found, value)"""
+
+        deadline = self.deadlines.get(endpoint)
+
+        if deadline is not None and clock.now_ms() >= deadline:
+            self.invalidating(endpoint)
+
+        entry = self.entries.get((endpoint, key))
+
+        if entry is None:
+            return False, None
+
+        value, expires_at = entry
+
+        if time.monotonic() >= expires_at:
+            del self.entries[(endpoint, key)]
+            return False, None
+
+        return True, value
+
+    async def fetching(
+        self,
+        endpoint: str,
+        key: str,
+        fetch: callable,
+        copying: bool = False,
+    ) -> object:
+        """
+        fetch: coroutine function without arguments, awaited on a miss.
+        copying: hand out deep copies, for results callers modify in place
+        """
+
+        found, value = self.looking_up(endpoint, key)
+
+        if found:
+
+            REQUEST_CACHE_LOOKUPS.labels(endpoint, "hit").inc()
+
+            return copy.deepcopy(value) if copying else value
+
+        entry_key = (endpoint, key)
+
+        task = self.in_flight.get(entry_key)
+
+        if task is None:
+
+            REQUEST_CACHE_LOOKUPS.labels(endpoint, "miss").inc()
+
+            task = self.in_flight[entry_key] = asyncio.ensure_future(
+                self.storing(endpoint, key, fetch)
+            )
+
+        else:
+            REQUEST_CACHE_LOOKUPS.labels(endpoint, "coalesced").inc()
+
+        # a cancelled caller does not cancel the request the others wait for
+        value = await asyncio.shield(task)
+
+        return copy.deepcopy(value) if copying else value
+
+    async def storing(
+        self,
+        endpoint: str,
+        key: str,
+        fetch: callable,
+    ) -> object:
+        """the single request in flight for (endpoint, key)"""
+
+        try:
+            value = await fetch()
+
+            ttl = self.ttls.get(endpoint, 0)
+
+            if ttl and is_cacheable(value):
+                self.entries[(endpoint, key)] = (value, time.monotonic() + ttl)
+
+            return value
+
+        finally:
+            self.in_flight.pop((endpoint, key), None)
+
+
+REQUEST_CACHE = RequestCache()
+
+
+async def fetching(
+    endpoint: str,
+    key: str,
+    fetch: callable,
+    copying: bool = False,
+) -> object:
+    return await REQUEST_CACHE.fetching(endpoint, key, fetch, copying)
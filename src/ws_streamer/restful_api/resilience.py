@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+
+"""
+Retries, circuit breakers, deadlines and hedged requests for exchange
+clients.
+
+Every call goes through `calling` with the endpoint it targets:
+
+    result = await resilience.calling(
+        lambda: public_connection(endpoint=endpoint),
+        "public/get_instruments",
+    )
+
+    - failed attempts are retried (ENDPOINT_POLICIES, bounded), after an
+      exponential backoff with full jitter. RateLimited carries the wait
+      the exchange asked for (Retry-After) and does not count as a failure
+    - each endpoint has its circuit breaker: after `failures` failures in a
+      row, calls fail fast with CircuitOpenError for `reset` seconds, then
+      a single call probes the endpoint again
+    - a deadline bounds everything below it, retries and backoffs
+      included, across tasks started inside it:
+
+          with resilience.deadline(5):
+              await asyncio.gather(*fetches)
+
+    - hedge_after (idempotent reads only): when the first request is slower
+      than that, a second one is sent and the first answer wins
+
+Only wrap calls that are safe to repeat: orders are never retried.
+"""
+
+# built ins
+import asyncio
+import contextlib
+import contextvars
+import random
+import time
+
+# installed
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.utilities import metrics
+
+# retries: attempts after the first, hedge_after / timeout: seconds per
+# attempt (None: not bounded here)
+DEFAULT_POLICY = dict(
+    retries=2,
+    hedge_after=None,
+    timeout=10,
+)
+
+ENDPOINT_POLICIES = {
+    "public/ticker": dict(hedge_after=0.5, timeout=5),
+    "public/get_tradingview_chart_data": dict(retries=3, timeout=20),
+    # attempts include waiting out Binance weight limits and bans, the
+    # request itself is bounded by the session timeout
+    "/api/v3/klines": dict(retries=4, timeout=None),
+}
+
+BASE_DELAY = 0.5  # seconds
+MAX_DELAY = 30  # seconds
+
+BREAKER_FAILURES = 5
+BREAKER_RESET = 30  # seconds
+
+RESILIENT_CALLS = metrics.counter(
+    "ws_streamer_resilient_calls_total",
+    "attempts per endpoint: ok, retried, failed, rejected (circuit open), hedged",
+    ("endpoint", "result"),
+)
+
+DEADLINE = contextvars.ContextVar("resilience_deadline", default=None)
+
+
+class RateLimited(Exception):
+    """the exchange asked to slow down: retried, not a breaker failure"""
+
+    def __init__(
+        self,
+        message: str,
+        retry_after: float = None,
+    ):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """the endpoint kept failing: not called until its breaker resets"""
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """no time left in the current deadline"""
+
+
+def policy_for(endpoint: str) -> dict:
+    """ """
+
+    return {**DEFAULT_POLICY, **ENDPOINT_POLICIES.get(endpoint, {})}
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = BASE_DELAY,
+    cap: float = MAX_DELAY,
+) -> float:
+    """full jitter: uniform between 0 and min(cap, base * 2 ** attempt)"""
+
+    return random.uniform(0, min(cap, base * 2 ** min(attempt, 16)))
+
+
+@contextlib.contextmanager
+def deadline(seconds: float):
+    """
+    everything awaited inside (and tasks created inside) must be done
+    within seconds. Nested deadlines keep the earliest
+    """
+
+    expires_at = time.monotonic() + seconds
+
+    current = DEADLINE.get()
+
+    token = DEADLINE.set(expires_at if current is None else min(current, expires_at))
+
+    try:
+        yield
+
+    finally:
+        DEADLINE.reset(token)
+
+
+def remaining() -> float:
+    """seconds left in the current deadline, None without one"""
+
+    expires_at = DEADLINE.get()
+
+    if expires_at is None:
+        return None
+
+    return expires_at - time.monotonic()
+
+
+def bounding(timeout: float = None) -> float:
+    """timeout cut to the current deadline. Raises DeadlineExceeded"""
+
+    left = remaining()
+
+    if left is None:
+        return timeout
+
+    if left <= 0:
+        raise DeadlineExceeded("deadline exceeded")
+
+    return left if timeout is None else min(timeout, left)
+
+
+class CircuitBreaker:
+    """opens after `failures` failures in a row, for `reset` seconds"""
+
+    def __init__(
+        self,
+        name: str = "",
+        failures: int = BREAKER_FAILURES,
+        reset: float = BREAKER_RESET,
+    ):
+        self.name = name
+        self.failures = failures
+        self.reset = reset
+        self.failed = 0
+        self.opened_at = None
+        # half open: when the single probe call was let through
+        self.probing_since = None
+
+    def is_open(self) -> bool:
+        """
+        once reset has passed (half open), False for one caller only: its
+        call is the probe. Everyone else is rejected until the probe
+        succeeds (closed) or fails (open again). A probe that never
+        reports back (cancelled, rate limited) is replaced after `reset`
+        """
+
+        if self.opened_at is None:
+            return False
+
+        now = time.monotonic()
+
+        started = self.opened_at if self.probing_since is None else self.probing_since
+
+        if now - started < self.reset:
+            return True
+
+        self.probing_since = now
+
+        return False
+
+    def seconds_to_reset(self) -> float:
+        """ """
+
+        if self.opened_at is None:
+            return 0.0
+
+        started = self.opened_at if self.probing_since is None else self.probing_since
+
+        return max(0.0, started + self.reset - time.monotonic())
+
+    def recording_success(self) -> None:
+
+        self.failed = 0
+        self.opened_at = None
+        self.probing_since = None
+
+    def recording_failure(self) -> None:
+
+        self.failed += 1
+
+        # the probe failed: open for another `reset`
+        if self.probing_since is not None:
+
+            self.probing_since = None
+            self.opened_at = time.monotonic()
+
+            log.warning(f"{self.name} probe failed, circuit open for {self.reset}s")
+
+        elif self.failed >= self.failures and self.opened_at is None:
+
+            self.opened_at = time.monotonic()
+
+            log.warning(f"{self.name} circuit open for {self.reset}s")
+
+
+BREAKERS = {}  # endpoint: CircuitBreaker
+
+
+def breaker_for(endpoint: str) -> CircuitBreaker:
+    """ """
+
+    breaker = BREAKERS.get(endpoint)
+
+    if breaker is None:
+        breaker = BREAKERS[endpoint] = CircuitBreaker(endpoint)
+
+    return breaker
+
+
+async def hedging(
+    fetch: callable,
+    hedge_after: float,
+    endpoint: str = "",
+) -> object:
+    """
+    fetch(), and a second fetch() when the first takes longer than
+    hedge_after. The first success wins, the other one is cancelled
+    """
+
+    tasks = [asyncio.ensure_future(fetch())]
+
+    try:
+
+        done, pending = await asyncio.wait(tasks, timeout=hedge_after)
+
+        if done:
+            return tasks[0].result()
+
+        RESILIENT_CALLS.labels(endpoint, "hedged").inc()
+
+        tasks.append(asyncio.ensure_future(fetch()))
+
+        pending = set(tasks)
+
+        error = None
+
+        while pending:
+
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            for task in done:
+
+                if task.exception() is None:
+                    return task.result()
+
+                error = task.exception()
+
+        raise error
+
+    finally:
+
+        for task in tasks:
+
+            if not task.done():
+                task.cancel()
+
+
+async def calling(
+    fetch: callable,
+    endpoint: str,
+    retries: int = None,
+    hedge_after: float = None,
+    timeout: float = None,
+    breaker: CircuitBreaker = None,
+) -> object:
+    """
+    fetch: coroutine function without arguments, one attempt.
+    retries, hedge_after, timeout: ENDPOINT_POLICIES when None
+
+    Raises the last error once retries are used up, CircuitOpenError,
+    DeadlineExceeded
+    """
+
+    policy = policy_for(endpoint)
+
+    retries = policy["retries"] if retries is None else retries
+    hedge_after = policy["hedge_after"] if hedge_after is None else hedge_after
+    timeout = policy["timeout"] if timeout is None else timeout
+
+    breaker = breaker or breaker_for(endpoint)
+
+    for attempt in range(retries + 1):
+
+        if breaker.is_open():
+
+            RESILIENT_CALLS.labels(endpoint, "rejected").inc()
+
+            raise CircuitOpenError(
+                f"{endpoint} circuit open, {breaker.seconds_to_reset():.0f}s to reset"
+            )
+
+        attempt_timeout = bounding(timeout)
+
+        try:
+
+            if hedge_after:
+                result = await asyncio.wait_for(
+                    hedging(fetch, hedge_after, endpoint), attempt_timeout
+                )
+
+            else:
+                result = await asyncio.wait_for(fetch(), attempt_timeout)
+
+            breaker.recording_success()
+
+            RESILIENT_CALLS.labels(endpoint, "ok").inc()
+
+            return result
+
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
+
+        except RateLimited as error:
+
+            delay = max(backoff_delay(attempt), error.retry_after or 0)
+
+            last_error = error
+
+        except Exception as error:
+
+            breaker.recording_failure()
+
+            delay = backoff_delay(attempt)
+
+            last_error = error
+
+        if attempt == retries:
+
+            RESILIENT_CALLS.labels(endpoint, "failed").inc()
+
+            raise last_error
+
+        left = remaining()
+
+        if left is not None and delay >= left:
+
+            RESILIENT_CALLS.labels(endpoint, "failed").inc()
+
+            raise DeadlineExceeded(f"{endpoint} deadline exceeded") from last_error
+
+        RESILIENT_CALLS.labels(endpoint, "retried").inc()
+
+        log.warning(
+            f"{endpoint} attempt {attempt + 1} failed ({last_error!r}), retrying in {delay:.2f}s"
+        )
+
+        await asyncio.sleep(delay)
+
+
+def collecting_metrics() -> list:
+    """ """
+
+    return [
+        (
+            "ws_streamer_circuit_open",
+            "gauge",
+            "1 while the endpoint's circuit breaker is open",
+            {
+                (("endpoint", endpoint),): int(breaker.opened_at is not None)
+                for endpoint, breaker in list(BREAKERS.items())
+            },
+        ),
+    ]
+
+
+metrics.registering_collector(collecting_metrics)
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shared keep-alive HTTP sessions for the REST helpers.
+
+One aiohttp.ClientSession (TCPConnector with DNS cache and per-host limit)
+and one httpx.AsyncClient per event loop, plus one blocking httpx.Client,
+so repeated calls reuse open TLS connections instead of paying DNS, TCP
+and TLS setup on every request.
+
+    session = session_pool.aiohttp_session()
+    async with session.post(url, json=payload) as response:
+        ...
+
+    # on shutdown, from the loop the sessions were used on
+    await session_pool.closing_sessions()
+"""
+
+# built ins
+import asyncio
+
+# installed
+import aiohttp
+import httpx
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.utilities import metrics
+
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 20
+DNS_CACHE_TTL = 300  # seconds
+KEEPALIVE_TIMEOUT = 30  # seconds an idle connection is kept open
+
+SESSIONS_OPENED = metrics.counter(
+    "ws_streamer_http_sessions_opened_total",
+    "pooled HTTP sessions created",
+    ("client",),
+)
+
+
+class SessionPool:
+    """
+    ssl: passed to the connectors (an ssl.SSLContext to trust a local
+    certificate, False to skip verification), library default when None
+    """
+
+    def __init__(
+        self,
+        limit: int = CONNECTION_LIMIT,
+        limit_per_host: int = CONNECTION_LIMIT_PER_HOST,
+        dns_cache_ttl: int = DNS_CACHE_TTL,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        ssl: object = None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.ssl = ssl
+        self.session = None
+        self.session_loop = None
+        self.async_client = None
+        self.async_client_loop = None
+        self.sync_client = None
+
+    def httpx_limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.limit,
+            max_keepalive_connections=self.limit_per_host,
+            keepalive_expiry=self.keepalive_timeout,
+        )
+
+    def httpx_options(self) -> dict:
+
+        options = dict(limits=self.httpx_limits(), follow_redirects=True)
+
+        if self.ssl is not None:
+            options.update(verify=self.ssl)
+
+        return options
+
+    def aiohttp_session(self) -> aiohttp.ClientSession:
+        """
+        the running loop's session, (re)created when missing, closed or
+        left over from another loop (asyncio.run in scripts and benchmarks)
+        """
+
+        loop = asyncio.get_running_loop()
+
+        if (
+            self.session is None
+            or self.session.closed
+            or self.session_loop is not loop
+        ):
+
+            connector_options = dict(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+
+            if self.ssl is not None:
+                connector_options.update(ssl=self.ssl)
+
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(**connector_options)
+            )
+            self.session_loop = loop
+
+            SESSIONS_OPENED.labels("aiohttp").inc()
+
+        return self.session
+
+    def httpx_client(self) -> httpx.AsyncClient:
+        """ """
+
+        loop = asyncio.get_running_loop()
+
+        if (
+            self.async_client is None
+            or self.async_client.is_closed
+            or self.async_client_loop is not loop
+        ):
+
+            self.async_client = httpx.AsyncClient(**self.httpx_options())
+            self.async_client_loop = loop
+
+            SESSIONS_OPENED.labels("httpx").inc()
+
+        return self.async_client
+
+    def httpx_sync_client(self) -> httpx.Client:
+        """blocking calls, shared across threads"""
+
+        if self.sync_client is None or self.sync_client.is_closed:
+
+            self.sync_client = httpx.Client(**self.httpx_options())
+
+            SESSIONS_OPENED.labels("httpx_sync").inc()
+
+        return self.sync_client
+
+    async def closing(self) -> None:
+        """close everything opened on the running loop and the sync client"""
+
+        loop = asyncio.get_running_loop()
+
+        if self.session is not None and self.session_loop is loop:
+            await self.session.close()
+
+        if self.async_client is not None and self.async_client_loop is loop:
+            await self.async_client.aclose()
+
+        if self.sync_client is not None:
+            self.sync_client.close()
+
+        self.session = self.async_client = self.sync_client = None
+        self.session_loop = self.async_client_loop = None
+
+        log.info("http sessions closed")
+
+
+SESSION_POOL = SessionPool()
+
+
+def aiohttp_session() -> aiohttp.ClientSession:
+    return SESSION_POOL.aiohttp_session()
+
+
+def httpx_client() -> httpx.AsyncClient:
+    return SESSION_POOL.httpx_client()
+
+
+def httpx_sync_client() -> httpx.Client:
+    return SESSION_POOL.httpx_sync_client()
+
+
+async def closing_sessions() -> None:
+    await SESSION_POOL.closing()
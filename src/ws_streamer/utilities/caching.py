@@ -2,7 +2,13 @@
 
 import asyncio
 
-from ws_streamer.restful_api.deribit.api_requests import get_tickers
+from loguru import logger as log
+
+from ws_streamer.restful_api.deribit.api_requests import (
+    async_get_tickers,
+    get_book_summary_by_currency,
+    get_tickers,
+)
 from ws_streamer.utilities.pickling import read_data
 from ws_streamer.utilities.system_tools import (
     provide_path_for_file,
@@ -49,6 +55,101 @@ def combining_ticker_data(instruments_name: str) -> list:
     return result
 
 
+SUMMARY_KINDS = ("future", "future_combo")
+
+
+def summary_currency(instrument_name: str) -> str:
+    """
+    BTC-PERPETUAL -> BTC, BTC_USDC-PERPETUAL -> USDC (linear instruments are
+    listed under their settlement currency)
+    """
+
+    currency = instrument_name.partition("-")[0]
+
+    return currency.rpartition("_")[2]
+
+
+def ticker_from_book_summary(summary: dict) -> dict:
+    """
+    public/get_book_summary_by_currency item in public/ticker shape. Fields
+    the summary lacks (amounts, min/max price) arrive with the first
+    incremental_ticker message
+    """
+
+    ticker = dict(
+        instrument_name=summary["instrument_name"],
+        timestamp=summary["creation_timestamp"],
+        state="open",
+        last_price=summary.get("last"),
+        mark_price=summary.get("mark_price"),
+        best_bid_price=summary.get("bid_price"),
+        best_ask_price=summary.get("ask_price"),
+        index_price=summary.get("estimated_delivery_price"),
+        estimated_delivery_price=summary.get("estimated_delivery_price"),
+        open_interest=summary.get("open_interest"),
+        stats=dict(
+            high=summary.get("high"),
+            low=summary.get("low"),
+            volume=summary.get("volume"),
+            volume_usd=summary.get("volume_usd"),
+            price_change=summary.get("price_change"),
+        ),
+    )
+
+    # perpetuals only
+    for item in ("current_funding", "funding_8h"):
+        if item in summary:
+            ticker[item] = summary[item]
+
+    return ticker
+
+
+async def warming_up_tickers(instruments_name: list) -> list:
+    """
+    tickers for instruments_name without blocking the loop: one book
+    summary request per currency and kind, all concurrent, then
+    public/ticker (concurrent too) only for the instruments not covered.
+    Instruments neither request returned are left out
+    """
+
+    currencies = list(dict.fromkeys(summary_currency(o) for o in instruments_name))
+
+    requests = [(currency, kind) for currency in currencies for kind in SUMMARY_KINDS]
+
+    summaries = await asyncio.gather(
+        *[get_book_summary_by_currency(currency, kind) for currency, kind in requests],
+        return_exceptions=True,
+    )
+
+    tickers = {}
+
+    for (currency, kind), summary in zip(requests, summaries):
+
+        if isinstance(summary, Exception) or "result" not in summary:
+            log.warning(f"book summary {currency} {kind} not received {summary}")
+            continue
+
+        for item in summary["result"]:
+            tickers[item["instrument_name"]] = ticker_from_book_summary(item)
+
+    uncovered = [o for o in instruments_name if o not in tickers]
+
+    if uncovered:
+
+        # send_requests_to_url reports failures and returns None
+        for instrument_name, ticker in zip(
+            uncovered,
+            await asyncio.gather(*[async_get_tickers(o) for o in uncovered]),
+        ):
+            if ticker:
+                tickers[instrument_name] = ticker
+
+            else:
+                log.warning(f"ticker {instrument_name} not received")
+
+    return [tickers[o] for o in instruments_name if o in tickers]
+
+
 async def update_cached_ticker(
     instrument_name: str,
     ticker: list,
@@ -101,6 +202,21 @@ async def update_cached_ticker(
         log.debug(f"instrument_ticker after []-not ok {instrument_ticker}")
 
 
+def removing_cached_order(
+    orders_all: list,
+    order_id: str,
+) -> None:
+    """first cached order whose id contains order_id, if any"""
+
+    for index, o in enumerate(orders_all):
+
+        if order_id in o["order_id"]:
+
+            del orders_all[index]
+
+            break
+
+
 def update_cached_orders(
     orders_all: list,
     sub_account_data: dict,
@@ -132,15 +248,7 @@ def update_cached_orders(
 
                     for trade in trades:
 
-                        order_id = trade["order_id"]
-
-                        selected_order = [
-                            o for o in orders_all if order_id in o["order_id"]
-                        ]
-
-                        if selected_order:
-
-                            orders_all.remove(selected_order[0])
+                        removing_cached_order(orders_all, trade["order_id"])
 
                 if orders:
 
@@ -150,15 +258,7 @@ def update_cached_orders(
 
                         if order_state == "cancelled" or order_state == "filled":
 
-                            order_id = order["order_id"]
-
-                            selected_order = [
-                                o for o in orders_all if order_id in o["order_id"]
-                            ]
-
-                            if selected_order:
-
-                                orders_all.remove(selected_order[0])
+                            removing_cached_order(orders_all, order["order_id"])
 
                         else:
 
@@ -181,13 +281,7 @@ def update_cached_orders(
 
             if order_state == "cancelled" or order_state == "filled":
 
-                order_id = order["order_id"]
-
-                selected_order = [o for o in orders_all if order_id in o["order_id"]]
-
-                if selected_order:
-
-                    orders_all.remove(selected_order[0])
+                removing_cached_order(orders_all, order["order_id"])
 
             else:
 
@@ -220,14 +314,12 @@ def positions_updating_cached(
 
             position_instrument_name = position["instrument_name"]
 
-            selected_position = [
-                o
-                for o in positions_cached
-                if position_instrument_name in o["instrument_name"]
-            ]
+            for index, o in enumerate(positions_cached):
+
+                if position_instrument_name in o["instrument_name"]:
 
-            if selected_position:
+                    del positions_cached[index]
 
-                positions_cached.remove(selected_position[0])
+                    break
 
             positions_cached.append(position)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cheap Unix time, corrected for the exchange clock.
+
+The wall clock is read once and anchored to time.monotonic_ns(); later
+reads only add the monotonic delta. The anchor is renewed every
+`anchor_interval` so NTP adjustments of the host clock are picked up.
+
+Per exchange, an offset (server time - local time, measured at the midpoint
+of the request round trip) is added on top:
+
+    await clock.CLOCK.syncing("deribit", api_requests.get_server_time)
+    await clock.CLOCK.syncing("binance", binance_client.sync_server_time)
+
+    now_unix = clock.now_ms("deribit")
+
+    # long running processes, resync every RESYNC_INTERVAL
+    asyncio.create_task(
+        clock.CLOCK.keeping_synced({"deribit": api_requests.get_server_time})
+    )
+"""
+
+# built ins
+import asyncio
+import time
+
+# installed
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.utilities import metrics
+
+ANCHOR_INTERVAL = 60  # seconds
+RESYNC_INTERVAL = 300  # seconds
+MAX_ROUND_TRIP = 2  # seconds, slower samples are not trusted
+
+CLOCK_OFFSET_MS = metrics.gauge(
+    "ws_streamer_clock_offset_ms",
+    "exchange server time minus local time",
+    ("exchange",),
+)
+
+CLOCK_ROUND_TRIP_MS = metrics.gauge(
+    "ws_streamer_clock_round_trip_ms",
+    "round trip of the last server time request",
+    ("exchange",),
+)
+
+
+class Clock:
+    """ """
+
+    def __init__(
+        self,
+        anchor_interval: float = ANCHOR_INTERVAL,
+    ):
+        self.anchor_interval_ns = int(anchor_interval * 1_000_000_000)
+        self.offsets_ns = {}  # exchange: server - local
+        self.anchoring()
+
+    def anchoring(self) -> None:
+        """ """
+
+        self.anchor_monotonic_ns = time.monotonic_ns()
+        self.anchor_unix_ns = time.time_ns()
+
+    def now_ns(
+        self,
+        exchange: str = None,
+    ) -> int:
+        """local Unix time in ns, plus the exchange offset when known"""
+
+        elapsed = time.monotonic_ns() - self.anchor_monotonic_ns
+
+        if elapsed > self.anchor_interval_ns:
+            self.anchoring()
+            elapsed = 0
+
+        return (
+            self.anchor_unix_ns
+            + elapsed
+            + (self.offsets_ns.get(exchange, 0) if exchange else 0)
+        )
+
+    def unix_ns_at(
+        self,
+        monotonic_ns: int,
+        exchange: str = None,
+    ) -> int:
+        """Unix time in ns of an earlier time.monotonic_ns() reading"""
+
+        return (
+            self.anchor_unix_ns
+            + (monotonic_ns - self.anchor_monotonic_ns)
+            + (self.offsets_ns.get(exchange, 0) if exchange else 0)
+        )
+
+    def now_us(
+        self,
+        exchange: str = None,
+    ) -> int:
+        return self.now_ns(exchange) // 1_000
+
+    def now_ms(
+        self,
+        exchange: str = None,
+    ) -> int:
+        return self.now_ns(exchange) // 1_000_000
+
+    def offset_ms(
+        self,
+        exchange: str,
+    ) -> float:
+        return self.offsets_ns.get(exchange, 0) / 1_000_000
+
+    async def syncing(
+        self,
+        exchange: str,
+        fetching_server_time: callable,
+    ) -> bool:
+        """
+        fetching_server_time: coroutine function returning the server time in
+        ms, as is or as a JSON-RPC response ({"result": ms})
+
+        False when the sample was not used
+        """
+
+        sent_at = self.now_ns()
+
+        server_time = await fetching_server_time()
+
+        received_at = self.now_ns()
+
+        if isinstance(server_time, dict):
+            server_time = server_time["result"]
+
+        round_trip = received_at - sent_at
+
+        CLOCK_ROUND_TRIP_MS.labels(exchange).set(round_trip / 1_000_000)
+
+        if round_trip > MAX_ROUND_TRIP * 1_000_000_000:
+
+            log.warning(
+                f"clock {exchange} sample skipped, round trip {round_trip / 1_000_000:.0f}ms"
+            )
+
+            return False
+
+        self.offsets_ns[exchange] = (
+            int(server_time) * 1_000_000 - (sent_at + round_trip // 2)
+        )
+
+        CLOCK_OFFSET_MS.labels(exchange).set(self.offset_ms(exchange))
+
+        return True
+
+    async def keeping_synced(
+        self,
+        fetchers: dict,
+        interval: float = RESYNC_INTERVAL,
+    ) -> None:
+        """
+        fetchers: {exchange: fetching_server_time}, runs until cancelled
+        """
+
+        while True:
+
+            for exchange, fetching_server_time in fetchers.items():
+
+                try:
+                    await self.syncing(exchange, fetching_server_time)
+
+                except Exception as error:
+                    log.warning(f"clock {exchange} not synced {error}")
+
+            await asyncio.sleep(interval)
+
+
+CLOCK = Clock()
+
+
+def now_ms(exchange: str = None) -> int:
+    return CLOCK.now_ms(exchange)
+
+
+def now_us(exchange: str = None) -> int:
+    return CLOCK.now_us(exchange)
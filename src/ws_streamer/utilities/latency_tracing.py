@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+
+"""
+Frame latency, from the exchange timestamp to the Redis publish.
+
+stamps (monotonic ns unless noted):
+    exchange_timestamp  payload "timestamp", unix ms (exchange clock)
+    received_at         receiver, right after recv
+    dequeued_at         distributor, batch taken from queue_general
+    handler_started     distributor, message handler entered
+    execute_started     distributor, pipeline execute called
+    published_at        distributor, pipeline execute returned
+
+stages:
+    network     exchange_timestamp -> received_at (received_at on the
+                exchange clock, utilities.clock offset once synced)
+    queue       received_at -> dequeued_at
+    dispatch    dequeued_at -> handler_started
+    handler     handler_started -> execute_started
+    publish     execute_started -> published_at
+    in_process  received_at -> published_at (our code, end to end)
+
+Samples go into per channel class HDR-style histograms (log-linear
+buckets, a few percent relative error), exported and reset periodically.
+"""
+
+# built ins
+import asyncio
+import time
+
+# installed
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.utilities import clock, metrics
+from ws_streamer.utilities.lazy_message import LazyMessage, reading_channel
+
+SUB_BUCKET_BITS = 4  # 16 linear sub-buckets per power of two: <= 6.25% error
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+
+EXPORT_INTERVAL = 60  # seconds
+
+STAGES = ("network", "queue", "dispatch", "handler", "publish", "in_process")
+
+FRAMES_RECEIVED = metrics.counter(
+    "ws_streamer_frames_received_total",
+    "subscription frames received, per channel class",
+    ("exchange", "channel"),
+)
+
+
+def bucket_index(value: int) -> int:
+    """ """
+
+    if value < SUB_BUCKET_COUNT:
+        return value
+
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+
+    return ((shift + 1) << SUB_BUCKET_BITS) + ((value >> shift) - SUB_BUCKET_COUNT)
+
+
+def bucket_upper_value(index: int) -> int:
+    """largest value that falls into the bucket"""
+
+    if index < SUB_BUCKET_COUNT:
+        return index
+
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    sub_bucket = (index & (SUB_BUCKET_COUNT - 1)) + SUB_BUCKET_COUNT
+
+    return ((sub_bucket + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of non-negative integers (microseconds here).
+    Buckets are created on demand.
+    """
+
+    __slots__ = ("counts", "count", "total", "max_value")
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max_value = 0
+
+    def recording(self, value: int) -> None:
+
+        if value < 0:
+            value = 0
+
+        index = bucket_index(value)
+
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+
+        if value > self.max_value:
+            self.max_value = value
+
+    def percentile(self, quantile: float) -> int:
+        """ """
+
+        if not self.count:
+            return 0
+
+        rank = quantile * self.count
+
+        seen = 0
+
+        for index in sorted(self.counts):
+
+            seen += self.counts[index]
+
+            if seen >= rank:
+                return min(bucket_upper_value(index), self.max_value)
+
+        return self.max_value
+
+    def summary(self) -> dict:
+        """values in ms"""
+
+        return dict(
+            count=self.count,
+            mean_ms=(self.total / self.count / 1000) if self.count else 0,
+            p50_ms=self.percentile(0.50) / 1000,
+            p90_ms=self.percentile(0.90) / 1000,
+            p99_ms=self.percentile(0.99) / 1000,
+            p999_ms=self.percentile(0.999) / 1000,
+            max_ms=self.max_value / 1000,
+        )
+
+
+def channel_class(channel: str) -> str:
+    """
+    histograms are kept per channel class, instruments and currencies
+    left out to bound their number:
+        incremental_ticker.BTC-PERPETUAL -> incremental_ticker
+        chart.trades.BTC-PERPETUAL.1     -> chart.trades
+        user.orders.any.any.raw          -> user.orders
+        btcusdt@kline_1m                 -> kline (binance streams)
+    """
+
+    if "@" in channel:
+        return channel.partition("@")[2].partition("_")[0]
+
+    parts = channel.split(".", 2)
+
+    if parts[0] in ("user", "chart") and len(parts) > 1:
+        return f"{parts[0]}.{parts[1]}"
+
+    return parts[0]
+
+
+def counting_frame(
+    exchange: str,
+    channel: str,
+) -> None:
+    """FRAMES_RECEIVED, labelled by channel class (bounded)"""
+
+    FRAMES_RECEIVED.labels(exchange, channel_class(channel)).inc()
+
+
+def reading_exchange_timestamp(message_params: dict) -> int:
+    """
+    payload "timestamp" (unix ms), None if absent. Undecoded frames are
+    searched as bytes, so stamping does not force a decode
+    """
+
+    if isinstance(message_params, LazyMessage):
+
+        frame = message_params.frame
+
+        start = frame.find(b'"timestamp":')
+
+        if start < 0:
+            return None
+
+        start += 12
+        end = start
+
+        while end < len(frame) and 48 <= frame[end] <= 57:
+            end += 1
+
+        return int(frame[start:end]) if end > start else None
+
+    data = message_params.get("data")
+
+    if isinstance(data, list):
+        data = data[0] if data else None
+
+    return data.get("timestamp") if isinstance(data, dict) else None
+
+
+def stamping_frame(
+    message_params: dict,
+    received_at: int,
+    with_exchange_timestamp: bool = False,
+) -> None:
+    """
+    receiver side stamps. exchange_timestamp is always set (None when not
+    read), so tracing finds every stamp without decoding the payload
+    """
+
+    message_params["received_at"] = received_at
+
+    message_params["exchange_timestamp"] = (
+        reading_exchange_timestamp(message_params)
+        if with_exchange_timestamp
+        else None
+    )
+
+
+class LatencyTracer:
+    """
+    Per channel class, per stage histograms (microseconds).
+
+    distributor usage, per batch:
+        dequeued_at = time.monotonic_ns()
+        traces.append(latency_tracer.tracing(message_params, dequeued_at))
+        ...
+        latency_tracer.recording_batch(traces, execute_started, published_at)
+    """
+
+    def __init__(self, export_interval: float = EXPORT_INTERVAL):
+        self.export_interval = export_interval
+        self.histograms = {}  # (channel class, stage): LatencyHistogram
+        self.started_at = time.monotonic()
+
+    def histogram(
+        self,
+        channel: str,
+        stage: str,
+    ) -> LatencyHistogram:
+
+        key = (channel, stage)
+
+        histogram = self.histograms.get(key)
+
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+
+        return histogram
+
+    def tracing(
+        self,
+        message_params: dict,
+        dequeued_at: int,
+    ) -> tuple:
+        """
+        taken when the handler starts, None for unstamped messages
+        (backfills, replays). Stamps of a LazyMessage are read from its
+        extras: tracing never decodes a frame
+        """
+
+        stamps = (
+            message_params.extras
+            if isinstance(message_params, LazyMessage)
+            else message_params
+        )
+
+        received_at = stamps.get("received_at")
+
+        if received_at is None:
+            return None
+
+        exchange_timestamp = stamps.get("exchange_timestamp")
+
+        # in us, received_at put on the exchange clock
+        network = (
+            clock.CLOCK.unix_ns_at(received_at, stamps.get("exchange")) // 1000
+            - exchange_timestamp * 1000
+            if exchange_timestamp
+            else None
+        )
+
+        return (
+            channel_class(reading_channel(message_params)),
+            network,
+            received_at,
+            dequeued_at,
+            time.monotonic_ns(),
+        )
+
+    def recording_batch(
+        self,
+        traces: list,
+        execute_started: int,
+        published_at: int,
+    ) -> None:
+        """ """
+
+        for trace in traces:
+
+            if trace is None:
+                continue
+
+            channel, network, received_at, dequeued_at, started = trace
+
+            if network is not None:
+                self.histogram(channel, "network").recording(network)
+
+            self.histogram(channel, "queue").recording(
+                (dequeued_at - received_at) // 1000
+            )
+            self.histogram(channel, "dispatch").recording(
+                (started - dequeued_at) // 1000
+            )
+            self.histogram(channel, "handler").recording(
+                (execute_started - started) // 1000
+            )
+            self.histogram(channel, "publish").recording(
+                (published_at - execute_started) // 1000
+            )
+            self.histogram(channel, "in_process").recording(
+                (published_at - received_at) // 1000
+            )
+
+    def snapshot(self, resetting: bool = True) -> dict:
+        """
+        {channel class: {stage: summary}}, stages in pipeline order
+        """
+
+        result = {}
+
+        for channel, stage in sorted(
+            self.histograms, key=lambda o: (o[0], STAGES.index(o[1]))
+        ):
+            result.setdefault(channel, {})[stage] = self.histograms[
+                (channel, stage)
+            ].summary()
+
+        if resetting:
+            self.histograms = {}
+            self.started_at = time.monotonic()
+
+        return result
+
+    async def exporting(self) -> None:
+        """log a snapshot every export_interval seconds"""
+
+        while True:
+
+            await asyncio.sleep(self.export_interval)
+
+            for channel, stages in self.snapshot().items():
+
+                log.info(
+                    f"latency {channel} "
+                    + " | ".join(
+                        f"{stage} n={o['count']} p50={o['p50_ms']:.3f}"
+                        f" p99={o['p99_ms']:.3f} max={o['max_ms']:.3f}ms"
+                        for stage, o in stages.items()
+                    )
+                )
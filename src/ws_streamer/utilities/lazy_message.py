@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+"""
+Header-only, lazily decoded WebSocket messages.
+
+Only the channel and method are read from the raw frame (a couple of byte
+searches, no JSON parsing). The original buffer is kept: handlers that read
+the payload trigger one full decode, passthrough channels are published
+with their payload spliced into the outgoing envelope byte-for-byte.
+
+supported layouts (compact JSON, as sent by the exchanges):
+    deribit  {"jsonrpc":"2.0","method":"subscription","params":{"channel":"..","data":..}}
+    binance  {"stream":"..","data":..}
+"""
+
+# installed
+import orjson
+
+RAW_DATA_PLACEHOLDER = "__raw_data__"
+ENCODED_PLACEHOLDER = orjson.dumps(RAW_DATA_PLACEHOLDER)
+
+DATA_KEY = b'"data":'
+
+
+def reading_string_value(
+    frame: bytes,
+    key: bytes,
+) -> str:
+    """
+    value of the first "key":"value" pair in frame, None if absent
+    """
+
+    start = frame.find(key)
+
+    if start < 0:
+        return None
+
+    start += len(key)
+
+    end = frame.find(b'"', start)
+
+    return frame[start:end].decode() if end > 0 else None
+
+
+class LazyMessage:
+    """
+    Stands in for the params dict the receivers queue: message["channel"],
+    .get, `in`, .update and item assignment all work, and only reading
+    anything else from the payload decodes the frame.
+    """
+
+    __slots__ = (
+        "frame",
+        "channel",
+        "channel_key",
+        "nesting",
+        "extras",
+        "decoded",
+    )
+
+    def __init__(
+        self,
+        frame: bytes,
+        channel: str,
+        channel_key: str = "channel",
+        nesting: int = 2,
+    ):
+        self.frame = frame
+        self.channel = channel
+        self.channel_key = channel_key
+        self.nesting = nesting  # closing braces after the payload
+        self.extras = {}
+        self.decoded = None
+
+    @property
+    def params(self) -> dict:
+        """full decode, once"""
+
+        if self.decoded is None:
+
+            message = orjson.loads(self.frame)
+
+            self.decoded = message["params"] if self.nesting == 2 else message
+
+            self.decoded.update(self.extras)
+
+        return self.decoded
+
+    def raw_data(self) -> bytes:
+        """
+        the payload exactly as received, None when the frame layout is
+        not the expected one
+        """
+
+        frame = self.frame.rstrip()
+
+        if not frame.endswith(b"}" * self.nesting):
+            return None
+
+        start = frame.find(DATA_KEY)
+
+        if start < 0:
+            return None
+
+        end = len(frame) - self.nesting
+
+        # params were sent as {"data":..,"channel":".."}
+        channel_suffix = f',"{self.channel_key}":"{self.channel}"'.encode()
+
+        if frame.endswith(channel_suffix, 0, end):
+            end -= len(channel_suffix)
+
+        return frame[start + len(DATA_KEY) : end]
+
+    def __getitem__(self, key: str):
+
+        if key == self.channel_key:
+            return self.channel
+
+        if self.decoded is None and key in self.extras:
+            return self.extras[key]
+
+        return self.params[key]
+
+    def get(self, key: str, default=None):
+
+        try:
+            return self[key]
+
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+
+        if key == self.channel_key or key in self.extras:
+            return True
+
+        return key in self.params
+
+    def __setitem__(self, key: str, value) -> None:
+
+        self.extras[key] = value
+
+        if self.decoded is not None:
+            self.decoded[key] = value
+
+    def update(self, other: dict) -> None:
+
+        for key, value in other.items():
+            self[key] = value
+
+    def __repr__(self) -> str:
+        return f"LazyMessage({self.channel!r}, decoded={self.decoded is not None})"
+
+
+def reading_channel(message_params: dict) -> str:
+    """
+    channel (deribit) or stream (binance) of a queued message, read from
+    the header for a LazyMessage: no decode
+    """
+
+    if isinstance(message_params, LazyMessage):
+        return message_params.channel
+
+    return message_params.get("channel") or message_params.get("stream")
+
+
+def parsing_deribit_frame(frame: bytes) -> LazyMessage | dict:
+    """
+    subscription frames stay lazy, everything else (auth, heartbeat,
+    responses) is decoded right away
+    """
+
+    if reading_string_value(frame, b'"method":"') == "subscription":
+
+        channel = reading_string_value(frame, b'"channel":"')
+
+        if channel:
+            return LazyMessage(frame, channel)
+
+    return orjson.loads(frame)
+
+
+def parsing_binance_frame(frame: bytes) -> LazyMessage | dict:
+    """
+    combined stream frames stay lazy
+    """
+
+    channel = reading_string_value(frame, b'"stream":"')
+
+    if channel:
+        return LazyMessage(frame, channel, channel_key="stream", nesting=1)
+
+    return orjson.loads(frame)
+
+
+def parsing_subscription_frame(
+    frame: bytes,
+    exchange: str,
+    account_id: str,
+) -> LazyMessage | dict:
+    """
+    the message a receiver queues for frame, tagged with exchange and
+    account_id. None for control frames (auth, heartbeat, acks): the
+    live receivers answer them, replay skips them
+    """
+
+    if "binance" in exchange:
+
+        message = parsing_binance_frame(frame)
+
+        message_params = message if isinstance(message, LazyMessage) else None
+
+    else:
+
+        message = parsing_deribit_frame(frame)
+
+        if isinstance(message, LazyMessage):
+            message_params = message
+
+        elif message.get("method") == "subscription":
+            message_params = message.get("params")
+
+        else:
+            message_params = None
+
+    if message_params:
+
+        message_params["exchange"] = exchange
+        message_params["account_id"] = account_id
+
+    return message_params
+
+
+def splicing_raw_data(
+    envelope: dict,
+    raw_data: bytes,
+) -> bytes:
+    """
+    encode envelope, whose payload field holds RAW_DATA_PLACEHOLDER,
+    with the original payload bytes put in its place
+    """
+
+    return orjson.dumps(envelope).replace(ENCODED_PLACEHOLDER, raw_data, 1)
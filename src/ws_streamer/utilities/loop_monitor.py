@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+"""
+Event-loop lag monitor and slow-callback detector.
+
+A heartbeat coroutine wakes up every `interval` and measures how late it
+was woken (loop lag). A watchdog thread checks the heartbeat: once it is
+overdue by more than `threshold`, the loop is stuck in one callback, so the
+thread samples the loop thread's stack and the task being run. When the
+heartbeat comes back the stall gets its duration and is kept for a rolling
+top-N report (grouped by the innermost ws_streamer frame), logged every
+`report_interval` and exported as metrics.
+
+Usage:
+    loop_monitor = LoopMonitor()
+    asyncio.create_task(loop_monitor.monitoring())
+"""
+
+# built ins
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+# installed
+from loguru import logger as log
+
+# user defined formula
+from ws_streamer.utilities import metrics
+
+HEARTBEAT_INTERVAL = 0.1  # seconds
+STALL_THRESHOLD = 0.1  # seconds the loop may be blocked before sampling
+REPORT_WINDOW = 600  # seconds of stalls kept for the top-N report
+REPORT_INTERVAL = 60  # seconds
+TOP_N = 10
+STACK_DEPTH = 12  # frames kept per sample
+
+PACKAGE_MARKER = "ws_streamer"
+
+LOOP_LAG_SECONDS = metrics.gauge(
+    "ws_streamer_event_loop_lag_seconds",
+    "delay of the last loop heartbeat",
+)
+
+LOOP_LAG_HISTOGRAM = metrics.histogram(
+    "ws_streamer_event_loop_lag_histogram_seconds",
+    "delay of loop heartbeats",
+)
+
+SLOW_CALLBACKS = metrics.counter(
+    "ws_streamer_slow_callbacks_total",
+    "loop stalls over the threshold, per culprit",
+    ("culprit",),
+)
+
+SLOW_CALLBACK_SECONDS = metrics.histogram(
+    "ws_streamer_slow_callback_seconds",
+    "duration of loop stalls over the threshold",
+)
+
+
+def culprit_of(stack: list) -> str:
+    """
+    innermost frame of our own code (module:function:line), the innermost
+    frame at all when the stall is inside a library
+    """
+
+    for frame in reversed(stack):
+
+        if PACKAGE_MARKER in frame.filename and __file__ != frame.filename:
+
+            module = frame.filename.rsplit(PACKAGE_MARKER, 1)[-1].strip("/\\")
+
+            return f"{module}:{frame.name}:{frame.lineno}"
+
+    if stack:
+        return f"{stack[-1].filename}:{stack[-1].name}:{stack[-1].lineno}"
+
+    return "unknown"
+
+
+def describing_task(task: asyncio.Task) -> str:
+    """ """
+
+    if task is None:
+        return "callback (no task)"
+
+    coro = task.get_coro()
+
+    return f"{task.get_name()} {getattr(coro, '__qualname__', coro)}"
+
+
+class LoopMonitor:
+    """ """
+
+    def __init__(
+        self,
+        interval: float = HEARTBEAT_INTERVAL,
+        threshold: float = STALL_THRESHOLD,
+        report_window: float = REPORT_WINDOW,
+        report_interval: float = REPORT_INTERVAL,
+        top_n: int = TOP_N,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.report_window = report_window
+        self.report_interval = report_interval
+        self.top_n = top_n
+        self.loop = None
+        self.loop_thread_id = None
+        self.last_beat = time.perf_counter()
+        self.pending_sample = None  # taken by the watchdog, closed by the heartbeat
+        self.stalls = deque()  # (finished_at, duration, culprit, task, stack)
+        self.watchdog = None
+        self.stopping = threading.Event()
+
+    def sampling_stack(self) -> None:
+        """watchdog thread: what is the loop thread running right now"""
+
+        frame = sys._current_frames().get(self.loop_thread_id)
+
+        if frame is None:
+            return
+
+        stack = traceback.extract_stack(frame)[-STACK_DEPTH:]
+
+        try:
+            task = describing_task(asyncio.current_task(self.loop))
+
+        except RuntimeError:
+            task = "unknown"
+
+        self.pending_sample = (culprit_of(stack), task, stack)
+
+    def watching(self) -> None:
+        """watchdog thread body"""
+
+        while not self.stopping.wait(self.interval):
+
+            overdue = time.perf_counter() - self.last_beat - self.interval
+
+            if overdue > self.threshold and self.pending_sample is None:
+                self.sampling_stack()
+
+    def recording_stall(self, duration: float) -> None:
+        """heartbeat side: the stall is over"""
+
+        sample, self.pending_sample = self.pending_sample, None
+
+        # shorter than a watchdog tick: no stack was taken
+        culprit, task, stack = sample or ("unsampled", "unknown", [])
+
+        SLOW_CALLBACKS.labels(culprit).inc()
+        SLOW_CALLBACK_SECONDS.observe(duration)
+
+        now = time.monotonic()
+
+        self.stalls.append((now, duration, culprit, task, stack))
+
+        while self.stalls and now - self.stalls[0][0] > self.report_window:
+            self.stalls.popleft()
+
+    def report(self) -> list:
+        """
+        stalls in the window grouped by culprit, worst total first
+        """
+
+        grouped = {}
+
+        for _, duration, culprit, task, stack in self.stalls:
+
+            entry = grouped.get(culprit)
+
+            if entry is None:
+                entry = grouped[culprit] = dict(
+                    culprit=culprit,
+                    count=0,
+                    total_ms=0,
+                    max_ms=0,
+                    task=task,
+                    stack=stack,
+                )
+
+            entry["count"] += 1
+            entry["total_ms"] += duration * 1000
+
+            if duration * 1000 > entry["max_ms"]:
+                entry["max_ms"] = duration * 1000
+                entry["task"] = task
+                entry["stack"] = stack
+
+        return sorted(grouped.values(), key=lambda o: o["total_ms"], reverse=True)[
+            : self.top_n
+        ]
+
+    def logging_report(self) -> None:
+        """ """
+
+        for entry in self.report():
+
+            log.warning(
+                f"slow callback {entry['culprit']} x{entry['count']}"
+                f" total {entry['total_ms']:.0f}ms max {entry['max_ms']:.0f}ms"
+                f" task {entry['task']}\n"
+                + "".join(traceback.format_list(entry["stack"]))
+            )
+
+    async def monitoring(self) -> None:
+        """heartbeat, runs until cancelled"""
+
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.perf_counter()
+
+        self.stopping.clear()
+        self.watchdog = threading.Thread(
+            target=self.watching,
+            name="loop-watchdog",
+            daemon=True,
+        )
+        self.watchdog.start()
+
+        reported_at = time.monotonic()
+
+        try:
+
+            while True:
+
+                await asyncio.sleep(self.interval)
+
+                now = time.perf_counter()
+
+                lag = max(0.0, now - self.last_beat - self.interval)
+
+                self.last_beat = now
+
+                LOOP_LAG_SECONDS.set(lag)
+                LOOP_LAG_HISTOGRAM.observe(lag)
+
+                if lag > self.threshold:
+                    self.recording_stall(lag)
+
+                if time.monotonic() - reported_at > self.report_interval:
+
+                    reported_at = time.monotonic()
+
+                    self.logging_report()
+
+        finally:
+            self.stopping.set()
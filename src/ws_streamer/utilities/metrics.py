@@ -0,0 +1,555 @@
+# -*- coding: utf-8 -*-
+
+"""
+Lightweight metrics registry (counters, gauges, histograms) and a
+Prometheus text-format endpoint served from the running event loop.
+
+Usage:
+    FRAMES = metrics.counter("ws_streamer_frames_total", "frames", ("channel",))
+    FRAMES.labels("incremental_ticker").inc()
+
+    with REST_SECONDS.labels("public/ticker").timing():
+        ...
+
+    metrics.starting_server("deribit")  # once per process, from every entrypoint
+    # curl http://localhost:9108/metrics
+
+The endpoint is unauthenticated: it listens on 127.0.0.1 unless
+WS_STREAMER_METRICS_HOST says otherwise. Each exchange's processes have
+their own port (DEFAULT_PORTS), WS_STREAMER_METRICS_PORT sets another one
+per process.
+
+Values computed on scrape (queue depth, dedup stats) are added with
+registering_collector, under a name: registering again (reconnection,
+second instance) replaces the collector instead of adding one. Event-loop
+lag comes from loop_monitor.
+"""
+
+# built ins
+import asyncio
+import math
+import os
+import time
+
+# installed
+from loguru import logger as log
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9108
+DEFAULT_PORTS = {"deribit": 9108, "binance": 9109}
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def formatting_labels(
+    labelnames: tuple,
+    labelvalues: tuple,
+    extra: str = "",
+) -> str:
+    """ """
+
+    labels = [f'{name}="{value}"' for name, value in zip(labelnames, labelvalues)]
+
+    if extra:
+        labels.append(extra)
+
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def formatting_value(value: float) -> str:
+    """ """
+
+    if value == math.inf:
+        return "+Inf"
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class CounterChild:
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class GaugeChild:
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+
+class Timer:
+    """context manager observing the elapsed seconds"""
+
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: object):
+        self.histogram = histogram
+        self.started = 0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class HistogramChild:
+
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+
+        self.total += value
+        self.count += 1
+
+        for i, bound in enumerate(self.buckets):
+
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def timing(self) -> Timer:
+        return Timer(self)
+
+
+class Metric:
+    """
+    One metric family. Children are kept per label values tuple; a metric
+    without labels is its own single child (inc/set/observe directly).
+    """
+
+    child_class = CounterChild
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+
+        if not self.labelnames:
+            self.default = self.labels()
+
+    def creating_child(self):
+        return self.child_class()
+
+    def labels(self, *labelvalues):
+
+        child = self.children.get(labelvalues)
+
+        if child is None:
+            child = self.children[labelvalues] = self.creating_child()
+
+        return child
+
+    def __getattr__(self, item):
+        # unlabelled metric: forward inc/set/observe/timing to the only child
+        default = self.__dict__.get("default")
+
+        if default is None:
+            raise AttributeError(item)
+
+        return getattr(default, item)
+
+    def rendering(self) -> list:
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+        for labelvalues, child in list(self.children.items()):
+            lines.append(
+                f"{self.name}{formatting_labels(self.labelnames, labelvalues)}"
+                f" {formatting_value(child.value)}"
+            )
+
+        return lines
+
+
+class Counter(Metric):
+
+    child_class = CounterChild
+    kind = "counter"
+
+
+class Gauge(Metric):
+
+    child_class = GaugeChild
+    kind = "gauge"
+
+
+class Histogram(Metric):
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def creating_child(self):
+        return HistogramChild(self.buckets)
+
+    def rendering(self) -> list:
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+        for labelvalues, child in list(self.children.items()):
+
+            cumulative = 0
+
+            for bound, count in zip(self.buckets + (math.inf,), child.counts + [0]):
+
+                cumulative = child.count if bound == math.inf else cumulative + count
+
+                labels = formatting_labels(
+                    self.labelnames,
+                    labelvalues,
+                    f'le="{formatting_value(bound)}"',
+                )
+
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+            labels = formatting_labels(self.labelnames, labelvalues)
+
+            lines.append(f"{self.name}_sum{labels} {formatting_value(child.total)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+
+        return lines
+
+
+class MetricsRegistry:
+    """ """
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = {}  # name: collector
+
+    def registering(
+        self,
+        metric_class: type,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        **kwargs,
+    ) -> Metric:
+        """get or create: modules may declare the same metric"""
+
+        metric = self.metrics.get(name)
+
+        if metric is None:
+            metric = self.metrics[name] = metric_class(
+                name, documentation, labelnames, **kwargs
+            )
+
+        return metric
+
+    def registering_collector(
+        self,
+        collector: callable,
+        name: str = None,
+    ) -> None:
+        """
+        collector() -> list of (name, kind, documentation, {labels: value})
+        called on every scrape. name (default: the collector's qualified
+        name) identifies it: registering it again replaces the previous one
+        """
+
+        if name is None:
+            name = f"{collector.__module__}.{collector.__qualname__}"
+
+        self.collectors[name] = collector
+
+    def rendering(self) -> bytes:
+        """
+        one block per family: samples of collectors reporting the same
+        family are merged, families already declared as metrics skipped
+        """
+
+        lines = []
+
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.rendering())
+
+        families = {}
+
+        for name, collector in list(self.collectors.items()):
+
+            try:
+                collected = collector()
+
+            except Exception as error:
+                log.warning(f"metrics collector {name} {error}")
+                continue
+
+            for family, kind, documentation, samples in collected:
+
+                if family in self.metrics:
+                    continue
+
+                if family not in families:
+                    families[family] = (kind, documentation, {})
+
+                families[family][2].update(samples)
+
+        for family, (kind, documentation, samples) in families.items():
+
+            lines.append(f"# HELP {family} {documentation}")
+            lines.append(f"# TYPE {family} {kind}")
+
+            for labels, value in samples.items():
+                lines.append(
+                    f"{family}{formatting_labels(*zip(*labels)) if labels else ''}"
+                    f" {formatting_value(value)}"
+                )
+
+        return ("\n".join(lines) + "\n").encode()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(
+    name: str,
+    documentation: str,
+    labelnames: tuple = (),
+) -> Counter:
+    return REGISTRY.registering(Counter, name, documentation, labelnames)
+
+
+def gauge(
+    name: str,
+    documentation: str,
+    labelnames: tuple = (),
+) -> Gauge:
+    return REGISTRY.registering(Gauge, name, documentation, labelnames)
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: tuple = (),
+    buckets: tuple = LATENCY_BUCKETS,
+) -> Histogram:
+    return REGISTRY.registering(
+        Histogram, name, documentation, labelnames, buckets=buckets
+    )
+
+
+def registering_collector(
+    collector: callable,
+    name: str = None,
+) -> None:
+    REGISTRY.registering_collector(collector, name)
+
+
+def registering_queue(queue_general: object) -> None:
+    """
+    queue_general depth on every scrape: per lane for PriorityLaneQueue
+    (plus drops, merges and wait), qsize for a plain asyncio.Queue
+    """
+
+    def collecting() -> list:
+
+        lane_metrics = getattr(queue_general, "metrics", None)
+
+        if lane_metrics is None:
+            return [
+                (
+                    "ws_streamer_queue_depth",
+                    "gauge",
+                    "messages waiting in queue_general",
+                    {(("lane", "all"),): queue_general.qsize()},
+                )
+            ]
+
+        lanes = lane_metrics()
+
+        return [
+            (
+                f"ws_streamer_queue_{item}",
+                kind,
+                documentation,
+                {(("lane", lane),): lanes[lane][key] for lane in lanes},
+            )
+            for item, key, kind, documentation in (
+                ("depth", "depth", "gauge", "messages waiting in queue_general"),
+                ("dropped_total", "dropped", "counter", "messages dropped, lane full"),
+                ("coalesced_total", "coalesced", "counter", "ticker frames merged"),
+                ("wait_max_ms", "wait_max_ms", "gauge", "longest queue wait"),
+            )
+        ]
+
+    # one queue_general per process: the latest registration is the one
+    registering_collector(collecting, "queue_general")
+
+
+async def handling_scrape(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    """minimal HTTP/1.0: GET /metrics, anything else 404"""
+
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+
+        # skip the headers
+        while (await asyncio.wait_for(reader.readline(), 5)).strip():
+            pass
+
+        parts = request_line.decode(errors="replace").split()
+
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].startswith("/metrics"):
+            status = b"200 OK"
+            body = REGISTRY.rendering()
+
+        else:
+            status = b"404 Not Found"
+            body = b"not found\n"
+
+        writer.write(
+            b"HTTP/1.0 " + status + b"\r\n"
+            b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+            b"Connection: close\r\n\r\n" + body
+        )
+
+        await writer.drain()
+
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+
+    finally:
+        writer.close()
+
+
+async def serving_metrics(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+) -> None:
+    """
+    serve /metrics on the current loop until cancelled
+    """
+
+    server = await asyncio.start_server(handling_scrape, host, port)
+
+    log.info(f"metrics on http://{host}:{port}/metrics")
+
+    async with server:
+        await server.serve_forever()
+
+
+SERVER_TASK = None
+
+
+def server_address(
+    exchange: str = None,
+    host: str = None,
+    port: int = None,
+) -> tuple:
+    """
+    (host, port) of this process: the arguments, else
+    WS_STREAMER_METRICS_HOST / WS_STREAMER_METRICS_PORT, else DEFAULT_HOST
+    and the exchange's port
+    """
+
+    host = host or os.environ.get("WS_STREAMER_METRICS_HOST") or DEFAULT_HOST
+
+    port = (
+        port
+        or os.environ.get("WS_STREAMER_METRICS_PORT")
+        or DEFAULT_PORTS.get(exchange, DEFAULT_PORT)
+    )
+
+    return host, int(port)
+
+
+def starting_server(
+    exchange: str = None,
+    host: str = None,
+    port: int = None,
+) -> asyncio.Task:
+    """
+    serving_metrics in the background, once per process however many
+    entrypoints (receivers, distributors) call it
+    """
+
+    global SERVER_TASK
+
+    host, port = server_address(exchange, host, port)
+
+    if SERVER_TASK is None or SERVER_TASK.done():
+        SERVER_TASK = asyncio.get_running_loop().create_task(
+            keeping_served(host, port)
+        )
+
+    return SERVER_TASK
+
+
+async def keeping_served(
+    host: str,
+    port: int,
+) -> None:
+    """ """
+
+    try:
+        await serving_metrics(host, port)
+
+    except OSError as error:
+        # another process of this deployment serves the port
+        log.warning(f"metrics not served on {host}:{port}: {error}")
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+"""
+Bounded, prioritised replacement for the unbounded queue_general.
+
+lanes (served in this order):
+    private     user.* frames and control.* messages (subscription changes).
+                Never dropped: a full lane makes put() wait
+    market      chart.trades, notices, backfills. Full: oldest frame dropped
+    ticker      incremental_ticker.*. Full: a frame for an instrument already
+                waiting is merged into that one (newest values win), otherwise
+                the oldest instrument's frame is dropped
+
+Usage:
+    queue_general = PriorityLaneQueue()
+    await queue_general.put(message_params)
+    message_params = await queue_general.get()
+"""
+
+# built ins
+import asyncio
+import time
+from collections import deque
+
+# user defined formula
+from ws_streamer.utilities.lazy_message import reading_channel
+
+PRIVATE_LANE = "private"
+MARKET_LANE = "market"
+TICKER_LANE = "ticker"
+
+LANES_BY_PRIORITY = (PRIVATE_LANE, MARKET_LANE, TICKER_LANE)
+
+DEFAULT_LANE_SIZES = {
+    PRIVATE_LANE: 10_000,
+    MARKET_LANE: 5_000,
+    TICKER_LANE: 1_000,
+}
+
+
+def classifying_lane(message_params: dict) -> str:
+    """ """
+
+    channel: str = reading_channel(message_params) or ""
+
+    if channel.startswith(("user.", "control.")):
+        return PRIVATE_LANE
+
+    if channel.startswith("incremental_ticker"):
+        return TICKER_LANE
+
+    return MARKET_LANE
+
+
+def merging_ticker_data(
+    pending_data: dict,
+    newer_data: dict,
+) -> None:
+    """
+    incremental_ticker frames are deltas: fold the newer one into the
+    waiting one so no changed field is lost
+    """
+
+    for item, value in newer_data.items():
+
+        if item == "stats" and isinstance(pending_data.get("stats"), dict):
+            pending_data["stats"].update(value)
+
+        else:
+            pending_data[item] = value
+
+
+class Lane:
+    """One bounded FIFO with its own counters."""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.items = deque()  # (enqueued_at_ns, message_params)
+        self.pending_by_channel = {}  # ticker lane only
+        self.put_count = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.wait_count = 0
+        self.wait_total_ns = 0
+        self.wait_max_ns = 0
+
+    def full(self) -> bool:
+        return len(self.items) >= self.maxsize
+
+    def recording_wait(self, enqueued_at: int) -> None:
+
+        waited = time.monotonic_ns() - enqueued_at
+
+        self.wait_count += 1
+        self.wait_total_ns += waited
+
+        if waited > self.wait_max_ns:
+            self.wait_max_ns = waited
+
+    def metrics(self) -> dict:
+
+        return dict(
+            depth=len(self.items),
+            maxsize=self.maxsize,
+            put=self.put_count,
+            dropped=self.dropped,
+            coalesced=self.coalesced,
+            wait_avg_ms=(
+                self.wait_total_ns / self.wait_count / 1_000_000
+                if self.wait_count
+                else 0
+            ),
+            wait_max_ms=self.wait_max_ns / 1_000_000,
+        )
+
+
+class PriorityLaneQueue:
+    """
+    Drop-in for asyncio.Queue as used by the receivers and distributors
+    (put, put_nowait, get, get_nowait, qsize, empty), plus put_batch and
+    get_batch for the batched receive path
+    """
+
+    def __init__(self, lane_sizes: dict = None):
+
+        lane_sizes = {**DEFAULT_LANE_SIZES, **(lane_sizes or {})}
+
+        self.lanes = {o: Lane(o, lane_sizes[o]) for o in LANES_BY_PRIORITY}
+
+        self.not_empty = asyncio.Event()
+        self.private_not_full = asyncio.Event()
+        self.private_not_full.set()
+
+    def qsize(self) -> int:
+        return sum(len(o.items) for o in self.lanes.values())
+
+    def empty(self) -> bool:
+        return not any(o.items for o in self.lanes.values())
+
+    async def put(self, message_params: dict) -> None:
+        """ """
+
+        lane = self.lanes[classifying_lane(message_params)]
+
+        # private frames are never dropped: wait for the consumer instead
+        while lane.name == PRIVATE_LANE and lane.full():
+            self.private_not_full.clear()
+            await self.private_not_full.wait()
+
+        self.put_nowait(message_params, lane)
+
+    async def put_batch(self, message_batch: list) -> None:
+        """
+        a whole receive batch in one call, each frame to its own lane
+        """
+
+        for message_params in message_batch:
+
+            lane = self.lanes[classifying_lane(message_params)]
+
+            while lane.name == PRIVATE_LANE and lane.full():
+                self.private_not_full.clear()
+                await self.private_not_full.wait()
+
+            self.put_nowait(message_params, lane)
+
+    def put_nowait(
+        self,
+        message_params: dict,
+        lane: Lane = None,
+    ) -> None:
+        """ """
+
+        if lane is None:
+            lane = self.lanes[classifying_lane(message_params)]
+
+        if lane.name == PRIVATE_LANE and lane.full():
+            raise asyncio.QueueFull
+
+        now = time.monotonic_ns()
+
+        lane.put_count += 1
+
+        if lane.name == TICKER_LANE:
+
+            channel = message_params["channel"]
+
+            if lane.full():
+
+                pending = lane.pending_by_channel.get(channel)
+
+                if pending is not None:
+                    merging_ticker_data(pending["data"], message_params["data"])
+                    lane.coalesced += 1
+                    return
+
+                self.dropping_oldest(lane)
+
+            lane.pending_by_channel[channel] = message_params
+
+        elif lane.name == MARKET_LANE and lane.full():
+            self.dropping_oldest(lane)
+
+        lane.items.append((now, message_params))
+
+        self.not_empty.set()
+
+    def dropping_oldest(self, lane: Lane) -> None:
+        """ """
+
+        _, message_params = lane.items.popleft()
+
+        lane.dropped += 1
+
+        self.forgetting_pending(lane, message_params)
+
+    def forgetting_pending(
+        self,
+        lane: Lane,
+        message_params: dict,
+    ) -> None:
+        """ """
+
+        if lane.pending_by_channel:
+
+            channel = message_params["channel"]
+
+            if lane.pending_by_channel.get(channel) is message_params:
+                del lane.pending_by_channel[channel]
+
+    def get_nowait(self) -> dict:
+        """ """
+
+        for lane in self.lanes.values():
+
+            if lane.items:
+
+                enqueued_at, message_params = lane.items.popleft()
+
+                lane.recording_wait(enqueued_at)
+
+                self.forgetting_pending(lane, message_params)
+
+                if lane.name == PRIVATE_LANE:
+                    self.private_not_full.set()
+
+                return message_params
+
+        raise asyncio.QueueEmpty
+
+    async def get(self) -> dict:
+        """ """
+
+        while self.empty():
+            self.not_empty.clear()
+            await self.not_empty.wait()
+
+        return self.get_nowait()
+
+    async def get_batch(self, max_items: int = 512) -> list:
+        """
+        everything waiting (up to max_items), highest priority first
+        """
+
+        while self.empty():
+            self.not_empty.clear()
+            await self.not_empty.wait()
+
+        message_batch = []
+
+        while len(message_batch) < max_items and not self.empty():
+            message_batch.append(self.get_nowait())
+
+        return message_batch
+
+    def metrics(self) -> dict:
+        """
+        depth, drops, merges and wait time (ms) per lane
+        """
+
+        return {name: lane.metrics() for name, lane in self.lanes.items()}
+
+
+async def putting_batch(
+    queue_general: object,
+    message_batch: list,
+) -> None:
+    """
+    PriorityLaneQueue spreads the batch over its lanes,
+    a plain asyncio.Queue gets the list as one item
+    """
+
+    put_batch = getattr(queue_general, "put_batch", None)
+
+    if put_batch:
+        await put_batch(message_batch)
+
+    else:
+        await queue_general.put(message_batch)
+
+
+async def getting_batch(queue_general: object) -> list:
+    """
+    Everything the dispatcher can take in one go, as a list.
+    Works for single messages and batches alike.
+    """
+
+    get_batch = getattr(queue_general, "get_batch", None)
+
+    if get_batch:
+        return await get_batch()
+
+    message_params = await queue_general.get()
+
+    return message_params if isinstance(message_params, list) else [message_params]
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+"""
+On-demand sampling profiler for a running streamer.
+
+While active, a background thread samples the event-loop thread's Python
+stack every `interval` seconds and tracemalloc traces allocations. After
+`duration` seconds (or when toggled off) two files are written:
+    {output_dir}/profile-{time}.collapsed   collapsed stacks, one
+        "frame;frame;frame count" line per stack (flamegraph.pl, speedscope)
+    {output_dir}/profile-{time}.allocations top allocating lines
+
+Triggers, no restart needed, once an entrypoint called
+starting_control(client_redis):
+    kill -USR1 <pid>        start a run, or end the current one
+    redis PUBLISH ws_streamer_control '{"command": "profile", "duration": 30}'
+"""
+
+# built ins
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# installed
+import orjson
+from loguru import logger as log
+
+SAMPLE_INTERVAL = 0.005  # seconds
+DEFAULT_DURATION = 30  # seconds
+TOP_ALLOCATORS = 25
+CONTROL_CHANNEL = "ws_streamer_control"
+
+
+def collapsing_stack(frame: object) -> str:
+    """root first, frames as module:function"""
+
+    names = []
+
+    while frame is not None:
+
+        code = frame.f_code
+
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+
+        frame = frame.f_back
+
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """ """
+
+    def __init__(
+        self,
+        output_dir: str = "profiles",
+        interval: float = SAMPLE_INTERVAL,
+        duration: float = DEFAULT_DURATION,
+        all_threads: bool = False,
+    ):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.duration = duration
+        self.all_threads = all_threads
+        # the thread running the event loop (the one creating the profiler)
+        self.target_thread_id = threading.get_ident()
+        self.stopping = threading.Event()
+        self.worker = None
+
+    @property
+    def running(self) -> bool:
+        return self.worker is not None and self.worker.is_alive()
+
+    def starting(self, duration: float = None) -> bool:
+        """
+        False if a run is already going on. Safe to call from a signal
+        handler: only a thread is started
+        """
+
+        if self.running:
+            return False
+
+        self.stopping.clear()
+
+        self.worker = threading.Thread(
+            target=self.profiling,
+            args=(duration or self.duration,),
+            name="sampling-profiler",
+            daemon=True,
+        )
+        self.worker.start()
+
+        return True
+
+    def stopping_early(self) -> None:
+        self.stopping.set()
+
+    def toggling(self, duration: float = None) -> None:
+        """start a run, or end the current one now"""
+
+        if self.running:
+            self.stopping_early()
+
+        else:
+            self.starting(duration)
+
+    def sampling(self, stacks: Counter) -> None:
+        """ """
+
+        current_frames = sys._current_frames()
+
+        if self.all_threads:
+            frames = [
+                frame
+                for thread_id, frame in current_frames.items()
+                if thread_id != threading.get_ident()
+            ]
+
+        else:
+            frame = current_frames.get(self.target_thread_id)
+            frames = [frame] if frame is not None else []
+
+        for frame in frames:
+            stacks[collapsing_stack(frame)] += 1
+
+    def profiling(self, duration: float) -> None:
+        """worker thread body"""
+
+        log.warning(f"profiling for {duration}s")
+
+        tracing_already = tracemalloc.is_tracing()
+
+        if not tracing_already:
+            tracemalloc.start(10)
+
+        stacks = Counter()
+        samples = 0
+
+        started = time.monotonic()
+
+        while (
+            time.monotonic() - started < duration
+            and not self.stopping.wait(self.interval)
+        ):
+            self.sampling(stacks)
+            samples += 1
+
+        snapshot = tracemalloc.take_snapshot()
+
+        if not tracing_already:
+            tracemalloc.stop()
+
+        try:
+            paths = self.writing_results(stacks, snapshot)
+
+            log.warning(
+                f"profile done: {samples} samples in"
+                f" {time.monotonic() - started:.1f}s -> {paths}"
+            )
+
+        except Exception as error:
+            log.error(f"profile not written {error}")
+
+    def writing_results(
+        self,
+        stacks: Counter,
+        snapshot: tracemalloc.Snapshot,
+    ) -> list:
+        """ """
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        prefix = os.path.join(
+            self.output_dir, time.strftime("profile-%Y%m%d-%H%M%S")
+        )
+
+        collapsed_path = f"{prefix}.collapsed"
+
+        with open(collapsed_path, "w") as handle:
+            for stack, count in stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+
+        allocations_path = f"{prefix}.allocations"
+
+        snapshot = snapshot.filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+
+        with open(allocations_path, "w") as handle:
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATORS]:
+                handle.write(f"{stat}\n")
+
+        return [collapsed_path, allocations_path]
+
+
+async def listening_profiler_control(
+    client_redis: object,
+    profiler: SamplingProfiler,
+    channel: str = CONTROL_CHANNEL,
+) -> None:
+    """
+    control messages (JSON):
+        {"command": "profile", "duration": 30}   start a run
+        {"command": "profile_stop"}             end the current run
+    """
+
+    pubsub = client_redis.pubsub()
+
+    await pubsub.subscribe(channel)
+
+    async for message in pubsub.listen():
+
+        if message.get("type") != "message":
+            continue
+
+        try:
+            control = orjson.loads(message["data"])
+
+        except orjson.JSONDecodeError:
+            continue
+
+        command = control.get("command") if isinstance(control, dict) else None
+
+        if command == "profile":
+            profiler.starting(control.get("duration"))
+
+        elif command == "profile_stop":
+            profiler.stopping_early()
+
+
+async def keeping_controlled(
+    client_redis: object,
+    profiler: SamplingProfiler,
+) -> None:
+    """ """
+
+    try:
+        await listening_profiler_control(client_redis, profiler)
+
+    except Exception as error:
+        # the next starting_control call listens again
+        log.warning(f"profiler control not listened to: {error}")
+
+
+PROFILER = None
+CONTROL_TASK = None
+
+
+def starting_control(client_redis: object = None) -> SamplingProfiler:
+    """
+    the process profiler, once per process however many entrypoints call
+    it: SIGUSR1 toggles a run, CONTROL_CHANNEL messages are listened to
+    when client_redis is given. Called from the event loop thread
+    """
+
+    global PROFILER, CONTROL_TASK
+
+    loop = asyncio.get_running_loop()
+
+    if PROFILER is None:
+
+        PROFILER = SamplingProfiler()
+
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, PROFILER.toggling)
+
+        except (AttributeError, NotImplementedError, RuntimeError, ValueError) as error:
+            # no SIGUSR1 (windows) or not the main thread
+            log.warning(f"profiler not toggled by SIGUSR1: {error}")
+
+    if client_redis is not None and (CONTROL_TASK is None or CONTROL_TASK.done()):
+        CONTROL_TASK = loop.create_task(keeping_controlled(client_redis, PROFILER))
+
+    return PROFILER
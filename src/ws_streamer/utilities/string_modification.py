@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
 
+# built ins
+from functools import lru_cache
 
+# installed
+import orjson
+
+@lru_cache(maxsize=4096)
 def extract_currency_from_text(words: str) -> str:
     """
 
@@ -32,7 +38,7 @@ def extract_currency_from_text(words: str) -> str:
 
 def id_numbering(
     operation: str,
-    ws_channel: str,
+    ws_channel: str | list,
 ) -> str:
     """
 
@@ -67,7 +73,23 @@ def id_numbering(
     instruments	        4	    2	    02
     positions	        4	    1	    03
 
+    ws_channel: one channel, or a list of them (subscribed together)
     """
+
+    # a list is not hashable: cached on the same channels as a tuple
+    if isinstance(ws_channel, list):
+        ws_channel = tuple(ws_channel)
+
+    return numbering_id(operation, ws_channel)
+
+
+@lru_cache(maxsize=1024)
+def numbering_id(
+    operation: str,
+    ws_channel: str | tuple,
+) -> str:
+    """id_numbering, ws_channel hashable"""
+
     id_auth = 1
     if "user" in ws_channel:
         id_auth = 9
@@ -147,11 +169,61 @@ def remove_double_brackets_in_list(data: list) -> list:
 
 
 
+def transform_nested_dict_to_list_ohlc(data: dict) -> list:
+    """
+    public/get_tradingview_chart_data result (one array per field)
+    to one dict per candle, shaped like chart.trades data
+
+    Args:
+        data (dict): instance: {
+                                'ticks': [1738407420000, 1738407480000],
+                                'open': [101650.5, 101650.5],
+                                'high': [101650.5, 101655.0],
+                                'low': [101650.5, 101650.5],
+                                'close': [101650.5, 101655.0],
+                                'volume': [0.0, 0.01],
+                                'cost': [0.0, 1020.0],
+                                'status': 'ok'
+                                }
+
+    Returns:
+        list: [{'tick': 1738407420000, 'open': 101650.5, 'high': 101650.5,
+                'low': 101650.5, 'close': 101650.5, 'volume': 0.0, 'cost': 0.0}, ...]
+    """
+
+    if not data or not data.get("ticks"):
+        return []
+
+    candle_keys = ("tick", "open", "high", "low", "close", "volume", "cost")
+
+    columns = [data["ticks"]] + [data[o] for o in candle_keys[1:]]
+
+    return [dict(zip(candle_keys, o)) for o in zip(*columns)]
+
+
 def remove_apostrophes_from_json(json_load: list) -> int:
-    """ """
+    """
+    JSON text (sqlite data columns) goes through orjson, anything else
+    through literal_eval as before
+    """
     import ast
 
-    return [ast.literal_eval(str(i)) for i in json_load]
+    result = []
+
+    for i in json_load:
+
+        if isinstance(i, str):
+
+            try:
+                result.append(orjson.loads(i))
+                continue
+
+            except orjson.JSONDecodeError:
+                pass
+
+        result.append(ast.literal_eval(str(i)))
+
+    return result
 
 
 def remove_redundant_elements(data: list) -> list:
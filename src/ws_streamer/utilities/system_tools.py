@@ -355,11 +355,17 @@ class SignalHandler:
 
     KEEP_PROCESSING = True
 
-    def __init__(self):
+    def __init__(self, profiler: object = None):
         signal.signal(signal.SIGINT, self.exit_gracefully)
 
         signal.signal(signal.SIGTERM, self.exit_gracefully)
 
+        # kill -USR1 <pid>: start/stop a sampling profiler run (see profiling)
+        self.profiler = profiler
+
+        if profiler is not None and hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, self.toggle_profiling)
+
     def exit_gracefully(self, signum, frame):
 
         print(f"signum {signum} frame {frame}")
@@ -367,6 +373,10 @@ class SignalHandler:
 
         self.KEEP_PROCESSING = False
 
+    def toggle_profiling(self, signum, frame):
+
+        self.profiler.toggling()
+
 
 def handle_ctrl_c() -> None:
     """
@@ -300,8 +300,9 @@ def resampling_time_frame(ohlc_data: list, time_frame: str = "5min"):
 
 
 def get_now_unix_time() -> int:
-    """ """
-
-    now_utc = convert_time_to_utc()["utc_now"]
+    """
+    milliseconds since the UNIX epoch (UTC), truncated like the former
+    convert_time_to_unix(convert_time_to_utc()["utc_now"]) round trip
+    """
 
-    return int(convert_time_to_unix(now_utc))
+    return time.time_ns() // 1_000_000
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+
+# installed
+import pytest
+
+for module in ("aiohttp", "dataclassy", "httpx", "loguru", "orjson"):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.messaging import telegram_bot
+from ws_streamer.restful_api import resilience, session_pool
+from ws_streamer.restful_api.deribit import api_requests
+
+END_POINT = "https://www.deribit.com/api/v2/public/get_instruments?currency=BTC"
+
+
+def test_failed_public_request_is_reported_and_returns_none(monkeypatch):
+
+    attempts = []
+
+    class FailingClient:
+
+        async def get(self, end_point: str, follow_redirects: bool):
+            attempts.append(end_point)
+            raise ConnectionError("exchange unreachable")
+
+    async def failing_send(*args) -> None:
+        raise RuntimeError("telegram unreachable")
+
+    monkeypatch.setattr(session_pool, "httpx_client", lambda: FailingClient())
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(resilience, "BREAKERS", {})
+
+    # the alert fails too: still no exception for the caller
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "token")
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "chat")
+    monkeypatch.setattr(telegram_bot, "telegram_bot_sendtext", failing_send)
+
+    assert asyncio.run(api_requests.send_requests_to_url(END_POINT)) is None
+
+    # the first attempt and DEFAULT_POLICY retries
+    assert len(attempts) == resilience.DEFAULT_POLICY["retries"] + 1
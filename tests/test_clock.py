@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+import time
+
+# installed
+import pytest
+
+for module in ("loguru",):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.utilities import clock
+
+
+def test_offset_is_taken_at_the_round_trip_midpoint():
+
+    exchange_clock = clock.Clock()
+
+    async def fetching_server_time() -> dict:
+        # one second ahead of us
+        return {"result": time.time_ns() // 1_000_000 + 1_000}
+
+    assert asyncio.run(exchange_clock.syncing("binance", fetching_server_time))
+
+    assert abs(exchange_clock.offset_ms("binance") - 1_000) < 50
+    assert abs(exchange_clock.now_ms("binance") - exchange_clock.now_ms() - 1_000) < 50
+    assert exchange_clock.offset_ms("deribit") == 0
+
+
+def test_slow_samples_are_skipped(monkeypatch):
+
+    monkeypatch.setattr(clock, "MAX_ROUND_TRIP", 0)
+
+    exchange_clock = clock.Clock()
+
+    async def fetching_server_time() -> int:
+        await asyncio.sleep(0.01)
+        return time.time_ns() // 1_000_000 + 1_000
+
+    assert not asyncio.run(exchange_clock.syncing("binance", fetching_server_time))
+    assert exchange_clock.offset_ms("binance") == 0
+
+
+def test_keeping_synced_survives_a_failed_sample():
+
+    exchange_clock = clock.Clock()
+
+    samples = []
+
+    async def fetching_server_time() -> int:
+
+        samples.append(len(samples))
+
+        if len(samples) == 1:
+            raise ConnectionError("server time unavailable")
+
+        return time.time_ns() // 1_000_000 + 500
+
+    async def main() -> None:
+
+        syncing = asyncio.create_task(
+            exchange_clock.keeping_synced({"binance": fetching_server_time}, 0)
+        )
+
+        while len(samples) < 2:
+            await asyncio.sleep(0)
+
+        syncing.cancel()
+
+    asyncio.run(main())
+
+    assert abs(exchange_clock.offset_ms("binance") - 500) < 50
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# installed
+import pytest
+
+for module in ("dataclassy",):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.data_receiver import deduplication
+
+
+def ticker(change_id: int) -> dict:
+    """ """
+    return dict(
+        channel="incremental_ticker.BTC-PERPETUAL",
+        data=dict(change_id=change_id, last_price=100),
+    )
+
+
+def trades(*trade_ids) -> dict:
+    """ """
+    return dict(
+        channel="user.trades.any.any.raw",
+        data=[dict(trade_id=o) for o in trade_ids],
+    )
+
+
+def test_first_copy_wins_and_the_twin_is_dropped():
+
+    deduplicator = deduplication.FirstArrivalDeduplicator()
+
+    assert deduplicator.is_first_arrival(ticker(1), "ws-0", 1_000)
+    assert not deduplicator.is_first_arrival(ticker(1), "ws-1", 4_000)
+
+    assert deduplicator.is_first_arrival(ticker(2), "ws-1", 5_000)
+    assert not deduplicator.is_first_arrival(ticker(2), "ws-0", 7_000)
+
+    # the key is consumed: a later copy is a new event
+    assert deduplicator.is_first_arrival(ticker(1), "ws-1", 8_000)
+
+    stats = deduplicator.stats()
+
+    assert stats["first_arrivals"] == {"ws-0": 1, "ws-1": 2}
+    assert stats["duplicates"] == 2
+    assert stats["win_rate"]["ws-1"] == pytest.approx(2 / 3)
+    assert stats["advantage_us"] == dict(p50=3.0, p99=3.0, max=3.0)
+
+
+def test_repeats_on_one_connection_and_single_channels_pass():
+
+    deduplicator = deduplication.FirstArrivalDeduplicator()
+
+    assert deduplicator.is_first_arrival(ticker(1), "ws-0", 1_000)
+    assert deduplicator.is_first_arrival(ticker(1), "ws-0", 2_000)
+
+    # the first arrival is still waiting for its twin
+    assert not deduplicator.is_first_arrival(ticker(1), "ws-1", 3_000)
+    assert deduplicator.advantages_ns[-1] == 2_000
+
+    # subscribed over one connection only: never deduplicated
+    book = dict(channel="book.BTC-PERPETUAL.raw", data=dict(change_id=1))
+
+    assert deduplicator.is_first_arrival(book, "ws-0")
+    assert deduplicator.is_first_arrival(book, "ws-0")
+    assert deduplicator.pending == {}
+
+
+def test_pending_keys_are_bounded():
+
+    deduplicator = deduplication.FirstArrivalDeduplicator(max_pending_keys=2)
+
+    for change_id in range(3):
+        deduplicator.is_first_arrival(ticker(change_id), "ws-0")
+
+    assert len(deduplicator.pending) == 2
+
+    # the oldest twin was forgotten: its late copy goes through
+    assert deduplicator.is_first_arrival(ticker(0), "ws-1")
+    assert not deduplicator.is_first_arrival(ticker(2), "ws-1")
+
+
+def test_backfilled_trades_never_repeat_a_live_fill(monkeypatch):
+
+    deduplicator = deduplication.FirstArrivalDeduplicator()
+
+    assert deduplicator.is_first_arrival(trades(1, 2), "ws-0")
+
+    backfilled = [dict(trade_id=o) for o in (1, 2, 3, 4)]
+
+    assert deduplicator.claiming_trades(backfilled) == backfilled[2:]
+
+    # claimed once: a second backfill over the same gap adds nothing
+    assert deduplicator.claiming_trades(backfilled) == []
+
+    monkeypatch.setattr(deduplication, "MAX_SEEN_TRADES", 3)
+
+    deduplicator.claiming_trades([dict(trade_id=5)])
+
+    # oldest trade ids forgotten first
+    assert list(deduplicator.seen_trades) == [3, 4, 5]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+# installed
+import pytest
+
+# user defined formula
+from ws_streamer.data_receiver import deribit_sharding
+
+CHANNELS = [
+    "user.orders.any.any.raw",
+    "user.trades.any.any.raw",
+    "incremental_ticker.BTC-PERPETUAL",
+    "chart.trades.BTC-PERPETUAL.1",
+    "incremental_ticker.ETH-PERPETUAL",
+    "chart.trades.ETH-PERPETUAL.1",
+    "incremental_ticker.BTC-4OCT24",
+]
+
+
+def instrument_of_each_shard(shards: list) -> list:
+    """ """
+    return [
+        {deribit_sharding.extract_instrument_from_channel(o) for o in shard}
+        for shard in shards
+    ]
+
+
+@pytest.mark.parametrize(
+    "channel, instrument",
+    [
+        ("chart.trades.BTC-PERPETUAL.1", "BTC-PERPETUAL"),
+        ("incremental_ticker.BTC-4OCT24", "BTC-4OCT24"),
+        ("user.portfolio.btc", "user.portfolio.btc"),
+        ("announcements", "announcements"),
+    ],
+)
+def test_instrument_is_extracted_from_channel(channel, instrument):
+
+    assert deribit_sharding.extract_instrument_from_channel(channel) == instrument
+
+
+def test_private_channels_get_a_dedicated_connection():
+
+    shards = deribit_sharding.allocating_channels(CHANNELS, 3)
+
+    assert shards[0] == ["user.orders.any.any.raw", "user.trades.any.any.raw"]
+
+    # every channel lands on exactly one connection
+    assert sorted(o for shard in shards for o in shard) == sorted(CHANNELS)
+
+    # one instrument never spans two connections
+    instruments = instrument_of_each_shard(shards[1:])
+    assert instruments[0].isdisjoint(instruments[1])
+
+    # heaviest instrument groups first, each to the lightest connection
+    assert [len(o) for o in shards[1:]] == [3, 2]
+
+
+def test_by_instrument_keeps_private_channels_on_the_first_connection():
+
+    shards = deribit_sharding.allocating_channels(CHANNELS, 2, "by_instrument")
+
+    assert shards[0][:2] == ["user.orders.any.any.raw", "user.trades.any.any.raw"]
+    assert sorted(o for shard in shards for o in shard) == sorted(CHANNELS)
+
+    instruments = instrument_of_each_shard(shards)
+    assert not any(o.startswith("user.") for o in instruments[1])
+    assert (instruments[0] - set(CHANNELS[:2])).isdisjoint(instruments[1])
+
+
+def test_callable_policy_and_single_connection():
+
+    shards = deribit_sharding.allocating_channels(
+        CHANNELS, 2, lambda channel: int("ETH" in channel)
+    )
+
+    assert shards == [
+        [o for o in CHANNELS if "ETH" not in o],
+        [o for o in CHANNELS if "ETH" in o],
+    ]
+
+    assert deribit_sharding.allocating_channels(CHANNELS, 0) == [CHANNELS]
+
+
+def test_empty_shards_are_dropped_and_unknown_policy_rejected():
+
+    # no private channels: no dedicated connection left empty
+    shards = deribit_sharding.allocating_channels(CHANNELS[2:], 4)
+
+    assert all(shards)
+    assert len(shards) == 3
+
+    with pytest.raises(ValueError):
+        deribit_sharding.allocating_channels(CHANNELS, 2, "round_robin")
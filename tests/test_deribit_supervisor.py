@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+import importlib.util
+import json
+import sys
+import types
+
+# installed
+import pytest
+
+for module in ("uvloop", "websockets", "dataclassy", "loguru", "orjson"):
+    pytest.importorskip(module)
+
+# deployment settings, not part of this repository: the connections below
+# are given their credentials, nothing is read from them
+if importlib.util.find_spec("ws_streamer.configuration") is None:
+
+    for name in ("config", "config_oci"):
+        sys.modules[f"ws_streamer.configuration.{name}"] = types.ModuleType(name)
+
+    sys.modules["ws_streamer.configuration"] = types.ModuleType(
+        "ws_streamer.configuration"
+    )
+
+    for name in ("config", "config_oci"):
+        setattr(
+            sys.modules["ws_streamer.configuration"],
+            name,
+            sys.modules[f"ws_streamer.configuration.{name}"],
+        )
+
+# user defined formula
+from ws_streamer.messaging import telegram_bot
+
+# StreamingAccountData takes the current event loop when defined, there is
+# none outside the entrypoint: each test sets its running loop instead
+with pytest.MonkeyPatch.context() as patching:
+    patching.setattr(asyncio, "get_event_loop", lambda: None)
+    from ws_streamer.data_receiver import deribit
+
+CHANNELS = [
+    "user.orders.any.any.raw",
+    "incremental_ticker.BTC-PERPETUAL",
+]
+
+TICKER_FRAME = (
+    b'{"jsonrpc":"2.0","method":"subscription","params":{"channel":'
+    b'"incremental_ticker.BTC-PERPETUAL","data":{"timestamp":1738407481107}}}'
+)
+
+
+class FakeSocket:
+    """
+    delivers frames, then either drops (recv fails) or waits for frames
+    forever
+    """
+
+    def __init__(
+        self,
+        dropped: bool,
+        frames: list = (),
+    ):
+        self.dropped = dropped
+        self.frames = list(frames)
+        self.subscribed = asyncio.Event()
+        self.channels = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def send(self, message: str) -> None:
+
+        message = json.loads(message)
+
+        if message["method"] == "private/subscribe":
+            self.channels.extend(message["params"]["channels"])
+            self.subscribed.set()
+
+    async def recv(self, decode: bool = None) -> bytes:
+
+        if self.frames:
+            return self.frames.pop(0)
+
+        # the backfill task gets a chance to start before the drop
+        await asyncio.sleep(0)
+
+        if self.dropped:
+            raise ConnectionError("socket dropped")
+
+        await asyncio.Event().wait()
+
+
+@pytest.fixture
+def supervising(monkeypatch):
+    """
+    runs one connection's supervisor over sockets until the last one is
+    subscribed. Returns (connection, backoff attempts, backfills)
+    """
+
+    attempts = []
+    backfills = []
+
+    async def nothing(self) -> None:
+        pass
+
+    async def backfilling_gap(self, exchange, queue_general, ws_channels, *gap):
+
+        backfills.append(dict(gap=gap, task=asyncio.current_task()))
+
+        await asyncio.Event().wait()
+
+    async def failing_send(*args) -> None:
+        raise RuntimeError("telegram unreachable")
+
+    def reconnect_delay(attempt: int, max_delay: float) -> float:
+        attempts.append(attempt)
+        return 0
+
+    monkeypatch.setattr(deribit, "reconnect_delay", reconnect_delay)
+    monkeypatch.setattr(deribit.StreamingAccountData, "ws_auth", nothing)
+    monkeypatch.setattr(deribit.StreamingAccountData, "establish_heartbeat", nothing)
+    monkeypatch.setattr(deribit.StreamingAccountData, "ws_refresh_auth", nothing)
+    monkeypatch.setattr(
+        deribit.StreamingAccountData, "backfilling_gap", backfilling_gap
+    )
+
+    # the outage alert fails too: it must not end the supervisor
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "token")
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "chat")
+    monkeypatch.setattr(telegram_bot, "telegram_bot_sendtext", failing_send)
+
+    def running(sockets: list) -> tuple:
+
+        connecting = iter(sockets)
+
+        monkeypatch.setattr(
+            deribit.websockets, "connect", lambda *a, **k: next(connecting)
+        )
+
+        async def main() -> object:
+
+            monkeypatch.setattr(
+                deribit.StreamingAccountData, "loop", asyncio.get_running_loop()
+            )
+
+            connection = deribit.StreamingAccountData(
+                "test", "client_id", "client_secret"
+            )
+
+            supervisor = asyncio.create_task(
+                connection.streaming_channels("deribit", asyncio.Queue(), CHANNELS)
+            )
+
+            try:
+                await asyncio.wait_for(sockets[-1].subscribed.wait(), 5)
+
+            finally:
+                supervisor.cancel()
+                await asyncio.gather(supervisor, return_exceptions=True)
+
+            return connection
+
+        return asyncio.run(main()), attempts, backfills
+
+    return running
+
+
+def test_dropped_socket_is_reconnected_and_resubscribed(supervising):
+
+    sockets = [FakeSocket(dropped=True), FakeSocket(dropped=False)]
+
+    connection, attempts, backfills = supervising(sockets)
+
+    assert sockets[0].channels == CHANNELS
+    assert sockets[1].channels == CHANNELS
+    assert attempts == [0]
+    # nothing was received before the drop: no gap to fill
+    assert backfills == []
+    assert connection.refresh_task is None
+
+
+def test_backoff_grows_and_backfill_is_cancelled_on_disconnect(supervising):
+
+    sockets = [
+        FakeSocket(dropped=True, frames=[TICKER_FRAME]),
+        FakeSocket(dropped=True),
+        FakeSocket(dropped=False),
+    ]
+
+    connection, attempts, backfills = supervising(sockets)
+
+    assert [o.channels for o in sockets] == [CHANNELS] * 3
+
+    # one outage: the delay keeps growing until a connection holds
+    assert attempts == [0, 1]
+
+    assert len(backfills) == 2
+
+    # the second drop cancelled the first backfill, the next one covers its gap
+    assert backfills[0]["task"].cancelled()
+    assert backfills[1]["gap"][0] <= backfills[0]["gap"][0]
+    assert backfills[1]["task"].cancelled()
+
+    assert connection.backfill_task is None
+    assert connection.refresh_task is None
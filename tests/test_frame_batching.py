@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+import types
+
+# installed
+import pytest
+
+for module in ("orjson",):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.data_receiver import frame_batching
+
+
+class FakeSocket:
+    """
+    recv_messages.frames mimics the buffer of the websockets asyncio client
+    """
+
+    def __init__(self, frames: list):
+        self.recv_messages = types.SimpleNamespace(frames=list(frames))
+
+    async def recv(self, decode: bool = None) -> bytes:
+
+        assert decode is False
+
+        return self.recv_messages.frames.pop(0)
+
+
+def test_buffered_frames_are_drained_in_one_batch():
+
+    frames = [f'{{"n":{o}}}'.encode() for o in range(5)]
+
+    websocket_client = FakeSocket(frames)
+
+    first_batch = asyncio.run(frame_batching.draining_frames(websocket_client, 3))
+
+    assert first_batch == frames[:3]
+
+    # whatever is left goes in the next batch
+    assert asyncio.run(frame_batching.draining_frames(websocket_client)) == frames[3:]
+
+
+def test_unknown_buffer_degrades_to_one_frame_per_batch():
+
+    class PlainSocket:
+        """ """
+
+        async def recv(self, decode: bool = None) -> bytes:
+            return b"{}"
+
+    assert frame_batching.buffered_frame_count(PlainSocket()) == 0
+    assert asyncio.run(frame_batching.draining_frames(PlainSocket())) == [b"{}"]
+
+
+def test_batch_is_decoded_in_order():
+
+    frames = [b'{"n":0}', b'{"n":[1,2]}', b'{"n":"2"}']
+
+    assert frame_batching.decoding_frames(frames) == [
+        dict(n=0),
+        dict(n=[1, 2]),
+        dict(n="2"),
+    ]
+
+    assert frame_batching.decoding_frames(frames[:1]) == [dict(n=0)]
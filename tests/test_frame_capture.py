@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+import time
+import types
+
+# installed
+import pytest
+
+for module in ("dataclassy", "loguru", "orjson"):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.data_receiver import frame_capture
+from ws_streamer.utilities.lazy_message import LazyMessage
+
+TICKER_FRAME = (
+    b'{"jsonrpc":"2.0","method":"subscription","params":{"channel":'
+    b'"incremental_ticker.BTC-PERPETUAL","data":{"timestamp":1738407481107}}}'
+)
+HEARTBEAT_FRAME = b'{"jsonrpc":"2.0","method":"heartbeat","params":{"type":"test_request"}}'
+AUTH_FRAME = b'{"jsonrpc":"2.0","id":9929,"result":{"access_token":"x"}}'
+NOTICE_FRAME = b'{"stream":"abnormaltradingnotices","data":{"symbol":"BTCUSDT"}}'
+
+
+def test_frames_round_trip_across_rotated_files(tmp_path):
+
+    capture_path = str(tmp_path / "captures" / "deribit")
+
+    frames = [f'{{"n":{o}}}'.encode() for o in range(20)]
+
+    # a few records per file
+    recorder = frame_capture.FrameRecorder(capture_path, max_file_size=64)
+
+    for frame in frames[:10]:
+        recorder.record(frame)
+
+    # str frames are stored as sent
+    recorder.record(frames[10].decode())
+
+    recorder.closing()
+
+    files = frame_capture.listing_capture_files(capture_path)
+
+    assert len(files) > 1
+    assert [o for _, o in frame_capture.reading_frames(capture_path)] == frames[:11]
+
+    # a second session continues after the highest index, nothing overwritten
+    recorder = frame_capture.FrameRecorder(capture_path)
+
+    for frame in frames[11:]:
+        recorder.record(frame)
+
+    recorder.closing()
+
+    assert recorder.file_index == len(files)
+    assert [o for _, o in frame_capture.reading_frames(capture_path)] == frames
+
+
+def test_truncated_last_record_ends_the_file_quietly(tmp_path):
+
+    capture_path = str(tmp_path / "deribit")
+
+    recorder = frame_capture.FrameRecorder(capture_path)
+    recorder.record(TICKER_FRAME)
+    recorder.record(HEARTBEAT_FRAME)
+    recorder.closing()
+
+    file_name = frame_capture.listing_capture_files(capture_path)[0]
+
+    with open(file_name, "r+b") as handle:
+        handle.truncate(handle.seek(0, 2) - 5)
+
+    assert [o for _, o in frame_capture.reading_frames(file_name)] == [TICKER_FRAME]
+
+
+def test_replay_offsets_follow_each_file_and_bound_the_gap(tmp_path, monkeypatch):
+
+    capture_path = str(tmp_path / "deribit")
+
+    wall_clock = [10_000_000_000]
+
+    # the second session starts a minute after the first
+    monkeypatch.setattr(
+        frame_capture,
+        "time",
+        types.SimpleNamespace(
+            time_ns=lambda: wall_clock[0], monotonic_ns=time.monotonic_ns
+        ),
+    )
+
+    for session in range(2):
+
+        recorder = frame_capture.FrameRecorder(capture_path)
+
+        recorder.rotating()
+
+        started = time.monotonic_ns()
+
+        for delay_ms in (0, 5, 20):
+            recorder.record(TICKER_FRAME, started + delay_ms * 1_000_000)
+
+        recorder.closing()
+
+        wall_clock[0] += 60_000_000_000
+
+    offsets = [o for o, _ in frame_capture.timing_frames(capture_path)]
+
+    first_file = [0, 5_000_000, 20_000_000]
+
+    assert offsets[:3] == first_file
+
+    # joined on the anchors, the minute pause cut to MAX_FILE_GAP
+    assert offsets[3] - offsets[2] == frame_capture.MAX_FILE_GAP
+    assert [o - offsets[3] for o in offsets[3:]] == first_file
+
+
+def test_replay_queues_what_the_receivers_queue(tmp_path):
+
+    deribit_path = str(tmp_path / "deribit")
+
+    recorder = frame_capture.FrameRecorder(deribit_path)
+
+    for frame in (AUTH_FRAME, TICKER_FRAME, HEARTBEAT_FRAME, TICKER_FRAME):
+        recorder.record(frame)
+
+    recorder.closing()
+
+    binance_path = str(tmp_path / "binance")
+
+    recorder = frame_capture.FrameRecorder(binance_path)
+    recorder.record(NOTICE_FRAME)
+    recorder.record(b'{"result":null,"id":1}')
+    recorder.closing()
+
+    async def main() -> list:
+
+        queue_general = asyncio.Queue()
+
+        queued = await frame_capture.replaying_frames(
+            queue_general, deribit_path, "deribit", speed=0
+        )
+
+        queued += await frame_capture.replaying_frames(
+            queue_general, binance_path, "binance", "binance-replay", speed=0
+        )
+
+        assert queued == queue_general.qsize()
+
+        return [queue_general.get_nowait() for _ in range(queued)]
+
+    messages = asyncio.run(main())
+
+    assert [o.channel for o in messages] == [
+        "incremental_ticker.BTC-PERPETUAL",
+        "incremental_ticker.BTC-PERPETUAL",
+        "abnormaltradingnotices",
+    ]
+
+    assert all(isinstance(o, LazyMessage) and o.decoded is None for o in messages)
+
+    assert messages[0]["exchange"] == "deribit"
+    assert messages[0]["account_id"] == "replay"
+    assert messages[2]["account_id"] == "binance-replay"
+
+    # payloads decode on first read
+    assert messages[0]["data"] == {"timestamp": 1738407481107}
+    assert messages[2]["data"] == {"symbol": "BTCUSDT"}
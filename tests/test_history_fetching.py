@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+
+# installed
+import pytest
+
+for module in ("loguru",):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.restful_api.deribit import history_fetching
+
+
+class FakePrivateData:
+    """user trades of one instrument, served like the exchange does"""
+
+    def __init__(self, trades: list):
+        self.trades = trades
+        self.requests = []
+
+    async def requesting(self, endpoint: str, params: dict) -> dict:
+
+        self.requests.append((endpoint, dict(params)))
+
+        if "start_seq" in params:
+            matching = [o for o in self.trades if o["trade_seq"] >= params["start_seq"]]
+
+        else:
+            matching = [
+                o
+                for o in self.trades
+                if params["start_timestamp"] <= o["timestamp"] <= params["end_timestamp"]
+            ]
+
+        page = matching[: params["count"]]
+
+        return dict(result=dict(trades=page, has_more=len(matching) > len(page)))
+
+
+def test_trades_sharing_the_page_boundary_millisecond_are_kept():
+
+    # five fills in the same millisecond, then one past the window
+    trades = [
+        dict(trade_id=f"t{seq}", trade_seq=seq, timestamp=1_000 if seq < 6 else 5_000)
+        for seq in range(1, 7)
+    ]
+
+    private_data = FakePrivateData(trades)
+
+    fetched = asyncio.run(
+        history_fetching.fetching_user_trades(
+            private_data, "BTC-PERPETUAL", 0, 2_000, count=2
+        )
+    )
+
+    assert [o["trade_seq"] for o in fetched] == [1, 2, 3, 4, 5]
+
+    assert private_data.requests[0][0] == (
+        "private/get_user_trades_by_instrument_and_time"
+    )
+    assert [o[1].get("start_seq") for o in private_data.requests[1:]] == [3, 5]
+
+
+def test_splitting_windows_covers_the_range():
+
+    assert history_fetching.splitting_windows(0, 25, 10) == [
+        (0, 10),
+        (10, 20),
+        (20, 25),
+    ]
+
+
+def test_failing_window_cancels_the_others():
+
+    cancelled = []
+
+    async def paging(window_start: int, window_end: int):
+
+        if window_start == 0:
+            yield [dict(trade_id="a")]
+            raise ConnectionError("window failed")
+
+        try:
+            await asyncio.Event().wait()
+            yield []
+
+        except asyncio.CancelledError:
+            cancelled.append(window_start)
+            raise
+
+    async def main() -> None:
+
+        with pytest.raises(ConnectionError):
+            await history_fetching.fetching_windows(paging, [(0, 10), (10, 20)])
+
+        # before the loop closes, which would cancel it anyway
+        assert cancelled == [10]
+
+    asyncio.run(main())
+
+
+def test_rows_are_deduplicated_and_sorted():
+
+    async def paging(window_start: int, window_end: int):
+        yield [
+            dict(trade_id=window_start, timestamp=window_start),
+            dict(trade_id=10, timestamp=10),
+        ]
+
+    rows = asyncio.run(history_fetching.fetching_windows(paging, [(10, 20), (0, 10)]))
+
+    assert [o["trade_id"] for o in rows] == [0, 10]
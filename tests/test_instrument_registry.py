@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+
+# installed
+import pytest
+
+for module in ("aiohttp", "dataclassy", "httpx", "loguru", "orjson"):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.data_announcer.deribit import get_instrument_summary
+from ws_streamer.data_announcer.deribit.instrument_registry import InstrumentRegistry
+
+SETTLEMENT_PERIODS = ["week", "month", "perpetual"]
+
+
+def instrument(
+    instrument_name: str,
+    settlement_period: str,
+    expiration_timestamp: int,
+    kind: str = "future",
+) -> dict:
+
+    return dict(
+        instrument_name=instrument_name,
+        kind=kind,
+        settlement_period=settlement_period,
+        expiration_timestamp=expiration_timestamp,
+    )
+
+
+def btc_instruments() -> list:
+    """as get_instruments lists them: settlement periods interleaved"""
+
+    return [
+        instrument("BTC", "", 0, "spot"),
+        instrument("BTC-27DEC24", "month", 300),
+        instrument("BTC-25OCT24", "week", 100),
+        instrument("BTC-FS-27DEC24_PERP", "month", 300, "future_combo"),
+        instrument("BTC-PERPETUAL", "perpetual", 32503708800000),
+        instrument("BTC-25OCT24-60000-C", "week", 100, "option"),
+        instrument("BTC-1NOV24", "week", 200),
+        instrument("BTC-FS-1NOV24_27DEC24", "week", 200, "future_combo"),
+    ]
+
+
+def test_lookups_keep_the_exchange_order():
+
+    registry = InstrumentRegistry()
+
+    listed, removed = registry.refreshing("btc", btc_instruments())
+
+    assert len(listed) == 7
+    assert removed == []
+
+    assert [
+        o.instrument_name
+        for o in registry.instruments_of("BTC", ("future",), SETTLEMENT_PERIODS)
+    ] == ["BTC-27DEC24", "BTC-25OCT24", "BTC-PERPETUAL", "BTC-1NOV24"]
+
+    # futures first, then the combos against the perpetual
+    assert [o.instrument_name for o in registry.futures_of(["BTC"], SETTLEMENT_PERIODS)] == [
+        "BTC-27DEC24",
+        "BTC-25OCT24",
+        "BTC-PERPETUAL",
+        "BTC-1NOV24",
+        "BTC-FS-27DEC24_PERP",
+    ]
+
+
+def test_refreshing_is_incremental():
+
+    registry = InstrumentRegistry()
+
+    instruments = btc_instruments()
+
+    registry.refreshing("BTC", instruments)
+
+    perpetual_id = registry.id_of("BTC-PERPETUAL")
+
+    # the same response object again: nothing to do
+    assert registry.refreshing("BTC", instruments) == ([], [])
+
+    # 25OCT24 expired, 8NOV24 listed, 27DEC24 changed (and moved last)
+    refreshed = [o for o in btc_instruments() if "25OCT24" not in o["instrument_name"]]
+    changed = refreshed.pop(1)
+    refreshed.append(dict(changed, expiration_timestamp=400))
+    refreshed.append(instrument("BTC-8NOV24", "week", 250))
+
+    listed, removed = registry.refreshing("BTC", refreshed)
+
+    assert listed == ["BTC-8NOV24"]
+    assert sorted(removed) == ["BTC-25OCT24", "BTC-25OCT24-60000-C"]
+
+    assert registry.id_of("BTC-PERPETUAL") == perpetual_id
+    assert registry.record_of("BTC-27DEC24").expiration_timestamp == 400
+
+    assert [
+        o.instrument_name
+        for o in registry.instruments_of("BTC", ("future",), SETTLEMENT_PERIODS)
+    ] == ["BTC-PERPETUAL", "BTC-1NOV24", "BTC-27DEC24", "BTC-8NOV24"]
+
+    # heap entries of the removed and changed records are skipped
+    assert registry.next_expiration() == 200
+    assert registry.expiring(300) == [
+        "BTC-1NOV24",
+        "BTC-FS-1NOV24_27DEC24",
+        "BTC-8NOV24",
+        "BTC-FS-27DEC24_PERP",
+    ]
+    assert "BTC-27DEC24" in registry
+
+
+def test_nearest_expiry_tie_goes_to_the_first_listed(monkeypatch):
+
+    instruments = [
+        instrument("ETH-27DEC24", "month", 300),
+        instrument("ETH-25OCT24", "week", 100),
+        instrument("ETH-FS-25OCT24_PERP", "week", 100, "future_combo"),
+        instrument("ETH-PERPETUAL", "perpetual", 32503708800000),
+    ]
+
+    async def get_instruments(currency: str) -> dict:
+        return dict(result=instruments)
+
+    monkeypatch.setattr(get_instrument_summary, "get_instruments", get_instruments)
+    monkeypatch.setattr(
+        get_instrument_summary, "INSTRUMENT_REGISTRY", InstrumentRegistry()
+    )
+
+    futures_instruments = asyncio.run(
+        get_instrument_summary.get_futures_instruments(["ETH"], SETTLEMENT_PERIODS)
+    )
+
+    assert futures_instruments["instruments_name"] == [
+        "ETH-27DEC24",
+        "ETH-25OCT24",
+        "ETH-PERPETUAL",
+        "ETH-FS-25OCT24_PERP",
+    ]
+    assert futures_instruments["min_expiration_timestamp"] == 100
+    assert (
+        futures_instruments["instruments_name_with_min_expiration_timestamp"]
+        == "ETH-25OCT24"
+    )
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import time
+
+# installed
+import pytest
+
+for module in ("loguru", "orjson"):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.utilities import clock
+from ws_streamer.utilities.latency_tracing import LatencyTracer, stamping_frame
+from ws_streamer.utilities.lazy_message import parsing_deribit_frame
+
+CHART_FRAME = (
+    b'{"jsonrpc":"2.0","method":"subscription","params":{"channel":'
+    b'"chart.trades.BTC-PERPETUAL.1","data":{"close":101650.5,"high":101650.5,'
+    b'"low":101650.5,"open":101650.5,"tick":1738407480000,"cost":0.0,'
+    b'"volume":0.0,"timestamp":1738407481107}}}'
+)
+
+
+def tracing_frame(with_exchange_timestamp: bool) -> tuple:
+
+    message_params = parsing_deribit_frame(CHART_FRAME)
+
+    message_params["exchange"] = "deribit"
+    message_params["account_id"] = "test"
+
+    received_at = time.monotonic_ns()
+
+    stamping_frame(message_params, received_at, with_exchange_timestamp)
+
+    tracer = LatencyTracer()
+
+    trace = tracer.tracing(message_params, received_at + 1_000)
+
+    tracer.recording_batch([trace], received_at + 2_000, received_at + 3_000)
+
+    return message_params, trace, tracer.snapshot()
+
+
+def test_traced_chart_frame_stays_undecoded():
+
+    message_params, trace, snapshot = tracing_frame(False)
+
+    assert message_params.decoded is None
+    assert trace[0] == "chart.trades"
+    assert trace[1] is None
+    assert "network" not in snapshot["chart.trades"]
+    assert snapshot["chart.trades"]["in_process"]["count"] == 1
+
+
+def test_network_stage_is_read_from_the_frame_bytes():
+
+    message_params, trace, snapshot = tracing_frame(True)
+
+    assert message_params.decoded is None
+    assert message_params.extras["exchange_timestamp"] == 1738407481107
+    assert snapshot["chart.trades"]["network"]["count"] == 1
+
+
+def test_received_at_is_put_on_the_exchange_clock(monkeypatch):
+
+    monkeypatch.setitem(clock.CLOCK.offsets_ns, "deribit", 250_000_000)
+
+    received_at = time.monotonic_ns()
+
+    local = clock.CLOCK.unix_ns_at(received_at)
+
+    assert clock.CLOCK.unix_ns_at(received_at, "deribit") - local == 250_000_000
+    assert abs(local - time.time_ns()) < 50_000_000
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+# installed
+import pytest
+
+for module in ("orjson",):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.utilities import lazy_message
+
+CHART_FRAME = (
+    b'{"jsonrpc":"2.0","method":"subscription","params":{"channel":'
+    b'"chart.trades.BTC-PERPETUAL.1","data":{"tick":1738407480000,"open":1.5}}}'
+)
+# params sent data first
+REORDERED_FRAME = (
+    b'{"jsonrpc":"2.0","method":"subscription","params":{"data":[1,2],'
+    b'"channel":"user.trades.any.any.raw"}}\n'
+)
+NOTICE_FRAME = b'{"stream":"abnormaltradingnotices","data":{"symbol":"BTCUSDT"}}'
+HEARTBEAT_FRAME = b'{"jsonrpc":"2.0","method":"heartbeat","params":{"type":"test_request"}}'
+
+
+def test_header_and_payload_are_read_without_decoding():
+
+    message_params = lazy_message.parsing_deribit_frame(CHART_FRAME)
+
+    assert message_params["channel"] == "chart.trades.BTC-PERPETUAL.1"
+    assert lazy_message.reading_channel(message_params) == message_params.channel
+    assert message_params.raw_data() == b'{"tick":1738407480000,"open":1.5}'
+
+    reordered = lazy_message.parsing_deribit_frame(REORDERED_FRAME)
+
+    assert reordered.raw_data() == b"[1,2]"
+
+    notice = lazy_message.parsing_binance_frame(NOTICE_FRAME)
+
+    assert notice["stream"] == "abnormaltradingnotices"
+    assert notice.raw_data() == b'{"symbol":"BTCUSDT"}'
+
+    assert all(o.decoded is None for o in (message_params, reordered, notice))
+
+    # not the expected layout: no raw payload, decoding still works
+    unexpected = lazy_message.LazyMessage(b'{"params":{"result":1}}', "chart")
+
+    assert unexpected.raw_data() is None
+    assert unexpected["result"] == 1
+
+
+def test_payload_is_decoded_once_with_the_tags_set_before():
+
+    message_params = lazy_message.parsing_subscription_frame(
+        CHART_FRAME, "deribit", "test"
+    )
+
+    # tags are read back without a decode
+    assert message_params["account_id"] == "test"
+    assert "exchange" in message_params
+    assert message_params.decoded is None
+
+    assert message_params["data"]["open"] == 1.5
+
+    decoded = message_params.decoded
+
+    assert decoded["exchange"] == "deribit"
+
+    message_params.update(dict(account_id="other"))
+
+    assert message_params.params is decoded
+    assert decoded["account_id"] == "other"
+    assert message_params.get("missing") is None
+
+
+def test_control_frames_are_not_queued():
+
+    for frame, exchange in (
+        (HEARTBEAT_FRAME, "deribit"),
+        (b'{"result":null,"id":1}', "binance"),
+    ):
+        assert lazy_message.parsing_subscription_frame(frame, exchange, "test") is None
+
+    # answered by the receiver, decoded right away
+    assert lazy_message.parsing_deribit_frame(HEARTBEAT_FRAME)["params"] == dict(
+        type="test_request"
+    )
+
+
+def test_raw_payload_is_spliced_into_the_envelope():
+
+    message_params = lazy_message.parsing_binance_frame(NOTICE_FRAME)
+
+    envelope = dict(
+        channel=message_params.channel,
+        data=lazy_message.RAW_DATA_PLACEHOLDER,
+    )
+
+    published = lazy_message.splicing_raw_data(envelope, message_params.raw_data())
+
+    assert published == (
+        b'{"channel":"abnormaltradingnotices","data":{"symbol":"BTCUSDT"}}'
+    )
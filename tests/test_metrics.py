@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+import socket
+
+# installed
+import pytest
+
+for module in ("loguru",):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.utilities import metrics
+
+
+def free_port() -> int:
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def test_each_exchange_process_has_its_own_local_port(monkeypatch):
+
+    monkeypatch.delenv("WS_STREAMER_METRICS_HOST", raising=False)
+    monkeypatch.delenv("WS_STREAMER_METRICS_PORT", raising=False)
+
+    assert metrics.server_address("deribit") == ("127.0.0.1", 9108)
+    assert metrics.server_address("binance") == ("127.0.0.1", 9109)
+
+    monkeypatch.setenv("WS_STREAMER_METRICS_HOST", "0.0.0.0")
+    monkeypatch.setenv("WS_STREAMER_METRICS_PORT", "9200")
+
+    assert metrics.server_address("binance") == ("0.0.0.0", 9200)
+    assert metrics.server_address("binance", port=9300) == ("0.0.0.0", 9300)
+
+
+def test_metrics_are_served_once_per_process(monkeypatch):
+
+    monkeypatch.setattr(metrics, "SERVER_TASK", None)
+    monkeypatch.setattr(metrics, "REGISTRY", metrics.MetricsRegistry())
+
+    frames = metrics.counter("test_frames_total", "frames", ("channel",))
+    frames.labels("chart.trades").inc(2)
+
+    # registered twice under one name: rendered once, the latest wins
+    metrics.registering_collector(
+        lambda: [("test_depth", "gauge", "depth", {(): 1})], "depth"
+    )
+    metrics.registering_collector(
+        lambda: [("test_depth", "gauge", "depth", {(): 3})], "depth"
+    )
+
+    port = free_port()
+
+    async def main() -> bytes:
+
+        server = metrics.starting_server("deribit", port=port)
+
+        # a second entrypoint of the same process
+        assert metrics.starting_server("binance") is server
+
+        for _ in range(100):
+
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                break
+
+            except ConnectionError:
+                await asyncio.sleep(0.01)
+
+        writer.write(b"GET /metrics HTTP/1.0\r\n\r\n")
+
+        response = await reader.read()
+
+        writer.close()
+        server.cancel()
+
+        return response
+
+    response = asyncio.run(main())
+
+    assert response.startswith(b"HTTP/1.0 200 OK")
+    assert b'test_frames_total{channel="chart.trades"} 2' in response
+    assert response.count(b"\ntest_depth ") == 1
+    assert b"test_depth 3" in response
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+
+# installed
+import pytest
+
+for module in ("aiohttp", "httpx", "loguru", "orjson"):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.restful_api import resilience
+from ws_streamer.restful_api.deribit import ohlc_backfilling
+
+MINUTE = 60_000
+
+
+def columns(ticks: list) -> dict:
+    """a chart data answer whose prices are the ticks themselves"""
+
+    return {column: list(ticks) for column in ohlc_backfilling.COLUMNS}
+
+
+def test_range_is_planned_as_consecutive_chunks():
+
+    chunks = ohlc_backfilling.planning_chunks(0, 12 * MINUTE, 1, max_candles=5)
+
+    assert chunks == [
+        (0, 4 * MINUTE),
+        (5 * MINUTE, 9 * MINUTE),
+        (10 * MINUTE, 12 * MINUTE),
+    ]
+
+    day = ohlc_backfilling.resolution_in_ms("1D")
+
+    assert day == 1440 * MINUTE
+    assert ohlc_backfilling.planning_chunks(0, day, "1D") == [(0, day)]
+    assert ohlc_backfilling.planning_chunks(day, 0, "1D") == []
+
+
+def test_chunks_are_merged_in_tick_order_without_overlaps():
+
+    merged = ohlc_backfilling.merging_columns(
+        [columns([4, 5, 6]), None, columns([1, 2, 3, 4]), dict(ticks=[])]
+    )
+
+    assert merged == columns([1, 2, 3, 4, 5, 6])
+
+
+def test_chunks_are_fetched_side_by_side_and_failures_skipped(monkeypatch):
+
+    requested = []
+    running = dict(now=0, peak=0)
+
+    async def requesting_chunk(instrument_name, resolution, start, end) -> dict:
+
+        requested.append(start)
+
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+
+        try:
+            await asyncio.sleep(0.01)
+
+        finally:
+            running["now"] -= 1
+
+        if start == 5 * MINUTE:
+            raise RuntimeError("chunk lost")
+
+        return columns(range(start, end + 1, MINUTE))
+
+    monkeypatch.setattr(ohlc_backfilling, "requesting_chunk", requesting_chunk)
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(resilience, "BREAKERS", {})
+
+    async def main() -> dict:
+
+        return await ohlc_backfilling.fetching_columns(
+            "BTC-PERPETUAL",
+            1,
+            0,
+            17 * MINUTE,
+            asyncio.Semaphore(2),
+            max_candles=5,
+        )
+
+    ticks = asyncio.run(main())["ticks"]
+
+    # the failed chunk is missing, the others are complete
+    assert ticks == [o * MINUTE for o in (0, 1, 2, 3, 4, *range(10, 18))]
+
+    assert running["peak"] == 2
+
+    retries = resilience.policy_for(ohlc_backfilling.ENDPOINT)["retries"]
+
+    assert requested.count(5 * MINUTE) == retries + 1
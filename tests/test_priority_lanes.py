@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+
+# installed
+import pytest
+
+for module in ("orjson",):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.utilities import priority_lanes
+from ws_streamer.utilities.lazy_message import parsing_subscription_frame
+
+TRADES_FRAME = (
+    b'{"stream":"btcusdt@aggTrade","data":{"e":"aggTrade","s":"BTCUSDT","p":"1"}}'
+)
+
+
+def ticker(instrument: str, **data) -> dict:
+    """ """
+    return dict(channel=f"incremental_ticker.{instrument}", data=data)
+
+
+def test_private_frames_are_served_first_and_never_dropped():
+
+    async def main() -> None:
+
+        queue_general = priority_lanes.PriorityLaneQueue({"private": 1})
+
+        await queue_general.put(ticker("BTC-PERPETUAL", last_price=1))
+        await queue_general.put(dict(channel="chart.trades.BTC-PERPETUAL.1"))
+        await queue_general.put(dict(channel="user.orders.any.any.raw", data=1))
+
+        # the private lane is full: the receiver waits for the dispatcher
+        waiting = asyncio.create_task(
+            queue_general.put(dict(channel="control.subscribing", data=2))
+        )
+
+        await asyncio.sleep(0)
+
+        assert not waiting.done()
+
+        with pytest.raises(asyncio.QueueFull):
+            queue_general.put_nowait(dict(channel="user.trades.any.any.raw"))
+
+        assert (await queue_general.get())["data"] == 1
+
+        await asyncio.wait_for(waiting, 1)
+
+        channels = [o["channel"] for o in await queue_general.get_batch()]
+
+        assert channels == [
+            "control.subscribing",
+            "chart.trades.BTC-PERPETUAL.1",
+            "incremental_ticker.BTC-PERPETUAL",
+        ]
+
+        assert queue_general.metrics()["private"]["dropped"] == 0
+
+    asyncio.run(main())
+
+
+def test_full_market_lane_drops_the_oldest_frame():
+
+    queue_general = priority_lanes.PriorityLaneQueue({"market": 2})
+
+    for minute in range(3):
+        queue_general.put_nowait(dict(channel="chart.trades.BTC-PERPETUAL.1", n=minute))
+
+    assert [queue_general.get_nowait()["n"] for _ in range(2)] == [1, 2]
+    assert queue_general.metrics()["market"]["dropped"] == 1
+    assert queue_general.empty()
+
+
+def test_full_ticker_lane_merges_frames_of_a_waiting_instrument():
+
+    queue_general = priority_lanes.PriorityLaneQueue({"ticker": 2})
+
+    queue_general.put_nowait(
+        ticker("BTC-PERPETUAL", last_price=1, stats=dict(high=5, low=1))
+    )
+    queue_general.put_nowait(ticker("ETH-PERPETUAL", last_price=2))
+
+    # BTC is still waiting: folded into it, newest values win
+    queue_general.put_nowait(ticker("BTC-PERPETUAL", last_price=3, stats=dict(high=6)))
+
+    assert queue_general.qsize() == 2
+
+    # no frame waiting for this one: the oldest instrument gives way
+    queue_general.put_nowait(ticker("BTC-4OCT24", last_price=4))
+
+    lane = queue_general.metrics()["ticker"]
+
+    assert (lane["coalesced"], lane["dropped"]) == (1, 1)
+
+    assert [queue_general.get_nowait()["channel"] for _ in range(2)] == [
+        "incremental_ticker.ETH-PERPETUAL",
+        "incremental_ticker.BTC-4OCT24",
+    ]
+
+    # the dropped frame had been merged into: nothing of it is left pending
+    assert queue_general.lanes["ticker"].pending_by_channel == {}
+
+    pending = dict(last_price=1, stats=dict(high=5, low=1))
+
+    priority_lanes.merging_ticker_data(pending, dict(last_price=3, stats=dict(high=6)))
+
+    assert pending == dict(last_price=3, stats=dict(high=6, low=1))
+
+
+def test_lazy_binance_frames_are_queued_undecoded():
+
+    message_params = parsing_subscription_frame(TRADES_FRAME, "binance", "test")
+
+    assert priority_lanes.classifying_lane(message_params) == "market"
+
+    async def main() -> list:
+
+        queue_general = priority_lanes.PriorityLaneQueue()
+
+        await priority_lanes.putting_batch(queue_general, [message_params])
+
+        return await priority_lanes.getting_batch(queue_general)
+
+    assert asyncio.run(main()) == [message_params]
+    assert message_params.decoded is None
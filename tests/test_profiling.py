@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+import os
+import signal
+
+# installed
+import orjson
+import pytest
+
+for module in ("loguru",):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.utilities import profiling
+
+
+class FakeProfiler:
+    """ """
+
+    def __init__(self):
+        self.calls = []
+
+    def toggling(self, duration: float = None) -> None:
+        self.calls.append("toggling")
+
+    def starting(self, duration: float = None) -> bool:
+        self.calls.append(("starting", duration))
+        return True
+
+    def stopping_early(self) -> None:
+        self.calls.append("stopping_early")
+
+
+class FakeRedis:
+    """one control channel, the messages published on it"""
+
+    def __init__(self, messages: list):
+        self.messages = messages
+        self.channels = []
+
+    def pubsub(self) -> "FakeRedis":
+        return self
+
+    async def subscribe(self, channel: str) -> None:
+        self.channels.append(channel)
+
+    async def listen(self):
+
+        yield dict(type="subscribe", data=1)
+
+        for message in self.messages:
+            yield dict(type="message", data=orjson.dumps(message))
+
+        await asyncio.Event().wait()
+
+
+@pytest.fixture
+def controlling(monkeypatch):
+
+    monkeypatch.setattr(profiling, "SamplingProfiler", FakeProfiler)
+    monkeypatch.setattr(profiling, "PROFILER", None)
+    monkeypatch.setattr(profiling, "CONTROL_TASK", None)
+
+
+def test_redis_control_messages_reach_the_process_profiler(controlling):
+
+    client_redis = FakeRedis(
+        [
+            dict(command="profile", duration=5),
+            dict(command="unknown"),
+            dict(command="profile_stop"),
+        ]
+    )
+
+    async def main() -> FakeProfiler:
+
+        profiler = profiling.starting_control(client_redis)
+
+        # a second entrypoint of the same process
+        assert profiling.starting_control(client_redis) is profiler
+
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+        profiling.CONTROL_TASK.cancel()
+
+        return profiler
+
+    profiler = asyncio.run(main())
+
+    assert client_redis.channels == [profiling.CONTROL_CHANNEL]
+    assert profiler.calls == [("starting", 5), "stopping_early"]
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="no SIGUSR1")
+def test_sigusr1_toggles_the_process_profiler(controlling):
+
+    async def main() -> FakeProfiler:
+
+        profiler = profiling.starting_control()
+
+        os.kill(os.getpid(), signal.SIGUSR1)
+
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+
+            if profiler.calls:
+                break
+
+        return profiler
+
+    profiler = asyncio.run(main())
+
+    assert profiler.calls == ["toggling"]
+    assert profiling.CONTROL_TASK is None
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+
+# installed
+import pytest
+
+for module in ("loguru",):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.restful_api.deribit import rate_limiting
+
+
+@pytest.mark.parametrize(
+    "method, bucket, priority",
+    [
+        ("private/cancel_all", "matching_engine", rate_limiting.CANCELLING),
+        ("private/buy", "matching_engine", rate_limiting.TRADING),
+        ("private/get_positions", "non_matching_engine", rate_limiting.QUERYING),
+        ("public/subscribe", "non_matching_engine", rate_limiting.HOUSEKEEPING),
+    ],
+)
+def test_methods_are_mapped_to_their_bucket_and_priority(method, bucket, priority):
+
+    assert rate_limiting.bucket_of(method) == bucket
+    assert rate_limiting.default_priority(method) == priority
+
+
+def test_waiting_calls_are_served_by_priority_then_arrival():
+
+    async def main() -> list:
+
+        # one credit, refilled every 10 ms
+        bucket = rate_limiting.CreditBucket("test", 1, 100, 1)
+
+        assert await bucket.acquiring(rate_limiting.HOUSEKEEPING) == 0
+
+        served = []
+
+        async def calling(name: str, priority: int) -> None:
+            await bucket.acquiring(priority)
+            served.append(name)
+
+        calls = {
+            name: asyncio.create_task(calling(name, priority))
+            for name, priority in (
+                ("subscribing", rate_limiting.HOUSEKEEPING),
+                ("querying", rate_limiting.QUERYING),
+                ("given up", rate_limiting.CANCELLING),
+                ("buying", rate_limiting.TRADING),
+                ("selling", rate_limiting.TRADING),
+                ("cancelling", rate_limiting.CANCELLING),
+            )
+        }
+
+        await asyncio.sleep(0)
+
+        # a caller that timed out does not hold the others back
+        calls["given up"].cancel()
+
+        await asyncio.wait_for(
+            asyncio.gather(*calls.values(), return_exceptions=True), 5
+        )
+
+        return served
+
+    assert asyncio.run(main()) == [
+        "cancelling",
+        "buying",
+        "selling",
+        "querying",
+        "subscribing",
+    ]
+
+
+def test_rejection_empties_the_bucket():
+
+    limiter = rate_limiting.CreditLimiter({"matching_engine": (20, 5, 1)})
+
+    bucket = limiter.buckets["matching_engine"]
+
+    limiter.checking_response("private/buy", dict(result=dict(order=1)))
+
+    assert bucket.credits == 20
+
+    limiter.checking_response("private/buy", dict(error=dict(code=10028)))
+
+    assert bucket.credits <= 0.1
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+
+# user defined formula
+from ws_streamer.restful_api import request_cache
+from ws_streamer.utilities import clock
+
+
+class FakeEndpoint:
+    """counts requests, each one answered once released"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.requests = 0
+        self.released = asyncio.Event()
+
+    async def fetch(self) -> object:
+
+        self.requests += 1
+
+        await self.released.wait()
+
+        return self.answers.pop(0)
+
+
+def test_concurrent_callers_share_one_request():
+
+    async def main() -> None:
+
+        cache = request_cache.RequestCache(dict(get_instruments=60))
+
+        endpoint = FakeEndpoint(dict(result=[1, 2]))
+
+        callers = [
+            asyncio.create_task(
+                cache.fetching("get_instruments", "BTC", endpoint.fetch, copying)
+            )
+            for copying in (False, False, True)
+        ]
+
+        await asyncio.sleep(0)
+
+        # a caller giving up does not cancel the request the others wait for
+        callers[0].cancel()
+
+        endpoint.released.set()
+
+        first, second, copied = await asyncio.gather(
+            *callers, return_exceptions=True
+        )
+
+        assert isinstance(first, asyncio.CancelledError)
+        assert endpoint.requests == 1
+
+        assert copied == second and copied is not second
+
+        # kept for the endpoint's ttl
+        assert await cache.fetching("get_instruments", "BTC", endpoint.fetch) is second
+        assert endpoint.requests == 1
+        assert cache.in_flight == {}
+
+    asyncio.run(main())
+
+
+def test_entries_expire_and_failures_are_not_cached():
+
+    async def main() -> None:
+
+        cache = request_cache.RequestCache(dict(ticker=0.01, get_instruments=60))
+
+        endpoint = FakeEndpoint(
+            dict(result=1),
+            dict(result=2),
+            dict(error=dict(code=10028)),
+            None,
+            dict(result=3),
+        )
+        endpoint.released.set()
+
+        assert await cache.fetching("ticker", "BTC", endpoint.fetch) == dict(result=1)
+
+        await asyncio.sleep(0.02)
+
+        assert await cache.fetching("ticker", "BTC", endpoint.fetch) == dict(result=2)
+
+        for _ in range(2):
+            await cache.fetching("get_instruments", "BTC", endpoint.fetch)
+
+        assert cache.entries.get(("get_instruments", "BTC")) is None
+
+        assert await cache.fetching("get_instruments", "BTC", endpoint.fetch) == dict(
+            result=3
+        )
+
+        assert endpoint.requests == 5
+
+    asyncio.run(main())
+
+
+def test_entries_are_dropped_when_an_instrument_expires(monkeypatch):
+
+    now = [1_000]
+
+    monkeypatch.setattr(clock, "now_ms", lambda *args: now[0])
+
+    cache = request_cache.RequestCache(dict(get_instruments=60))
+
+    cache.entries[("get_instruments", "BTC")] = ("instruments", float("inf"))
+
+    # the nearest expiry wins
+    cache.expiring_at("get_instruments", 3_000)
+    cache.expiring_at("get_instruments", 2_000)
+    cache.expiring_at("get_instruments", 4_000)
+
+    assert cache.looking_up("get_instruments", "BTC") == (True, "instruments")
+
+    now[0] = 2_000
+
+    assert cache.looking_up("get_instruments", "BTC") == (False, None)
+    assert cache.deadlines == {}
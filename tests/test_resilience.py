@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+import types
+
+# installed
+import pytest
+
+for module in ("loguru",):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.restful_api import resilience
+
+
+@pytest.fixture
+def now(monkeypatch):
+    """the breakers' clock, in seconds, moved by hand"""
+
+    now = [1_000.0]
+
+    monkeypatch.setattr(
+        resilience, "time", types.SimpleNamespace(monotonic=lambda: now[0])
+    )
+
+    return now
+
+
+def test_half_open_breaker_lets_a_single_probe_through(now):
+
+    breaker = resilience.CircuitBreaker("test", failures=2, reset=30)
+
+    breaker.recording_failure()
+
+    assert not breaker.is_open()
+
+    breaker.recording_failure()
+
+    assert breaker.is_open()
+    assert breaker.seconds_to_reset() == 30
+
+    now[0] += 30
+
+    # half open: the first caller probes, everyone else is still rejected
+    assert not breaker.is_open()
+    assert breaker.is_open()
+
+    # the probe failed: open for another reset
+    breaker.recording_failure()
+
+    now[0] += 29
+
+    assert breaker.is_open()
+
+    now[0] += 1
+
+    assert not breaker.is_open()
+
+    breaker.recording_success()
+
+    assert not breaker.is_open()
+    assert (breaker.failed, breaker.opened_at) == (0, None)
+
+
+def test_probe_that_never_reports_back_is_replaced(now):
+
+    breaker = resilience.CircuitBreaker("test", failures=1, reset=30)
+
+    breaker.recording_failure()
+
+    now[0] += 30
+
+    assert not breaker.is_open()
+
+    # the probe was cancelled: nobody else may probe until reset has passed
+    now[0] += 29
+
+    assert breaker.is_open()
+
+    now[0] += 1
+
+    assert not breaker.is_open()
+
+
+def test_calls_are_retried_then_rejected_while_open(monkeypatch):
+
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+
+    attempts = []
+
+    async def fetch() -> dict:
+
+        attempts.append(len(attempts))
+
+        if len(attempts) < 3:
+            raise ConnectionError("reset by peer")
+
+        return dict(result="ok")
+
+    async def failing() -> None:
+
+        attempts.append(len(attempts))
+
+        raise ConnectionError("reset by peer")
+
+    async def main() -> None:
+
+        breaker = resilience.CircuitBreaker("test", failures=3, reset=30)
+
+        assert await resilience.calling(
+            fetch, "test", retries=2, breaker=breaker
+        ) == dict(result="ok")
+
+        assert len(attempts) == 3
+        assert breaker.failed == 0
+
+        # the breaker opens on the third failure: no more retries
+        with pytest.raises(resilience.CircuitOpenError):
+            await resilience.calling(failing, "test", retries=5, breaker=breaker)
+
+        assert len(attempts) == 6
+
+        # fails fast without calling
+        with pytest.raises(resilience.CircuitOpenError):
+            await resilience.calling(fetch, "test", breaker=breaker)
+
+        assert len(attempts) == 6
+
+    asyncio.run(main())
+
+
+def test_rate_limited_calls_wait_and_do_not_open_the_breaker(monkeypatch):
+
+    attempts = []
+
+    monkeypatch.setattr(
+        resilience, "backoff_delay", lambda attempt: attempts.append(attempt) or 0
+    )
+
+    async def limited() -> None:
+        raise resilience.RateLimited("too_many_requests", retry_after=0.02)
+
+    async def main() -> float:
+
+        breaker = resilience.CircuitBreaker("test", failures=1)
+
+        started = asyncio.get_running_loop().time()
+
+        with pytest.raises(resilience.RateLimited):
+            await resilience.calling(limited, "test", retries=2, breaker=breaker)
+
+        assert breaker.failed == 0
+
+        return asyncio.get_running_loop().time() - started
+
+    # Retry-After is waited out before each retry
+    assert asyncio.run(main()) >= 0.035
+    assert attempts == [0, 1, 2]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+
+# installed
+import pytest
+
+for module in ("aiohttp", "httpx"):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.restful_api import session_pool
+
+
+def test_sessions_are_shared_within_a_loop_and_closed_on_shutdown():
+
+    pool = session_pool.SessionPool(limit=10, limit_per_host=2)
+
+    async def main() -> tuple:
+
+        session = pool.aiohttp_session()
+        async_client = pool.httpx_client()
+        sync_client = pool.httpx_sync_client()
+
+        assert pool.aiohttp_session() is session
+        assert pool.httpx_client() is async_client
+        assert pool.httpx_sync_client() is sync_client
+
+        assert session.connector.limit_per_host == 2
+
+        await pool.closing()
+
+        return session, async_client, sync_client
+
+    session, async_client, sync_client = asyncio.run(main())
+
+    assert session.closed
+    assert async_client.is_closed
+    assert sync_client.is_closed
+    assert pool.session is pool.async_client is pool.sync_client is None
+
+
+def test_a_new_loop_gets_its_own_session():
+
+    pool = session_pool.SessionPool()
+
+    async def opening() -> tuple:
+        return pool.aiohttp_session(), pool.httpx_client()
+
+    first = asyncio.run(opening())
+
+    # asyncio.run in scripts and benchmarks: the old loop is gone
+    second = asyncio.run(opening())
+
+    assert first[0] is not second[0]
+    assert first[1] is not second[1]
+
+    async def closing() -> None:
+
+        # the pooled session belongs to another loop: left alone
+        await pool.closing()
+
+        assert not second[0].closed
+
+        for session, async_client in (first, second):
+            await session.close()
+            await async_client.aclose()
+
+    asyncio.run(closing())
+
+    assert pool.session is None
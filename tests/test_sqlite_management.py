@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+import sqlite3
+
+# installed
+import pytest
+
+for module in ("aiosqlite", "loguru", "redis"):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.db_management import sqlite_management as db_mgt
+from ws_streamer.messaging import telegram_bot
+
+TABLE = "my_trades_all_btc_json"
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """the trading database, in a temporary working directory"""
+
+    monkeypatch.chdir(tmp_path)
+
+    (tmp_path / "databases").mkdir()
+
+    with sqlite3.connect(tmp_path / "databases" / "trading.sqlite3") as db:
+        db.execute(
+            f"CREATE TABLE {TABLE} (data TEXT,"
+            " trade_id TEXT GENERATED ALWAYS AS (json_extract(data, '$.trade_id'))"
+            " VIRTUAL UNIQUE)"
+        )
+
+    published = []
+
+    async def publishing_trading_update(table_name: str) -> None:
+        published.append(table_name)
+
+    monkeypatch.setattr(
+        db_mgt, "publishing_trading_update", publishing_trading_update
+    )
+
+    return published
+
+
+def test_inserting_many_publishes_only_new_rows(database):
+
+    rows = [dict(trade_id="1"), dict(trade_id="2")]
+
+    assert asyncio.run(db_mgt.inserting_many(TABLE, rows)) == 2
+    assert database == [TABLE]
+
+    # already there: nothing inserted, nothing published
+    assert asyncio.run(db_mgt.inserting_many(TABLE, rows)) == 0
+    assert database == [TABLE]
+
+    # page by page: the caller publishes once
+    assert asyncio.run(
+        db_mgt.inserting_many(TABLE, [dict(trade_id="3")], publishing=False)
+    ) == 1
+    assert database == [TABLE]
+
+
+def test_failed_insert_does_not_raise(database, monkeypatch):
+
+    async def failing_send(*args) -> None:
+        raise RuntimeError("telegram unreachable")
+
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "token")
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "chat")
+    monkeypatch.setattr(telegram_bot, "telegram_bot_sendtext", failing_send)
+
+    assert asyncio.run(db_mgt.inserting_many("missing_json", [dict(a=1)])) == 0
+    assert database == []
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+
+# installed
+import pytest
+
+for module in ("loguru", "orjson", "httpx"):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.data_receiver import subscription_reconciler
+from ws_streamer.messaging import telegram_bot
+
+
+class FakeConnection:
+    """ """
+
+    def __init__(self, ws_channels: list):
+        self.connection_name = "ws-0"
+        self.ws_channels = ws_channels
+        self.instruments_name = None
+        self.operations = []
+
+    async def ws_operation(
+        self,
+        operation: str,
+        ws_channel: list,
+        source: str,
+    ) -> None:
+        self.operations.append((operation, list(ws_channel)))
+
+
+def building_channels(futures_instruments: dict) -> list:
+    return [f"incremental_ticker.{o}" for o in futures_instruments["instruments_name"]]
+
+
+def test_failed_pass_does_not_stop_the_reconciler(monkeypatch):
+
+    passes = []
+
+    async def fetching_instruments() -> dict:
+
+        passes.append(len(passes))
+
+        if len(passes) == 1:
+            raise ConnectionError("instruments unavailable")
+
+        return dict(instruments_name=["BTC-PERPETUAL", "BTC-1NOV26"])
+
+    async def failing_send(*args) -> None:
+        raise RuntimeError("telegram unreachable")
+
+    # the error alert fails too: it must not end the loop
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "token")
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "chat")
+    monkeypatch.setattr(telegram_bot, "telegram_bot_sendtext", failing_send)
+
+    connection = FakeConnection(["incremental_ticker.BTC-PERPETUAL"])
+
+    queue_general = asyncio.Queue()
+
+    reconciler = subscription_reconciler.SubscriptionReconciler(
+        [connection],
+        fetching_instruments,
+        building_channels,
+        queue_general,
+        interval=0,
+    )
+
+    async def main() -> dict:
+
+        running = asyncio.create_task(reconciler.running())
+
+        try:
+            return await asyncio.wait_for(queue_general.get(), 5)
+
+        finally:
+            running.cancel()
+            await asyncio.gather(running, return_exceptions=True)
+
+    message = asyncio.run(main())
+
+    assert len(passes) >= 2
+    assert message["channel"] == subscription_reconciler.CONTROL_INSTRUMENTS
+    assert message["data"] == dict(listed=["BTC-1NOV26"], expired=[])
+    assert connection.operations == [("subscribe", ["incremental_ticker.BTC-1NOV26"])]
+    assert connection.ws_channels == [
+        "incremental_ticker.BTC-PERPETUAL",
+        "incremental_ticker.BTC-1NOV26",
+    ]
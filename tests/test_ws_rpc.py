@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+# built ins
+import asyncio
+import json
+
+# installed
+import pytest
+
+for module in ("orjson", "loguru"):
+    pytest.importorskip(module)
+
+# user defined formula
+from ws_streamer.restful_api.deribit.ws_rpc import WsRpcTransport
+
+
+class FakeSocket:
+    """ """
+
+    def __init__(self):
+        self.sent = []
+        self.sending = asyncio.Event()
+
+    async def send(self, message: str) -> None:
+        self.sent.append(json.loads(message))
+        self.sending.set()
+
+
+def test_concurrent_calls_get_their_own_response():
+
+    async def main() -> None:
+
+        transport = WsRpcTransport()
+        websocket_client = FakeSocket()
+
+        transport.attaching(websocket_client)
+
+        calls = [
+            asyncio.create_task(transport.calling("private/buy", dict(amount=o)))
+            for o in (10, 20)
+        ]
+
+        while len(websocket_client.sent) < 2:
+            await asyncio.sleep(0)
+
+        first, second = websocket_client.sent
+
+        assert first["id"] != second["id"]
+        assert second["params"] == dict(amount=20)
+
+        # answered out of order, unknown ids are left to the receive loop
+        assert not transport.resolving(dict(id=9929, result="auth"))
+        assert transport.resolving(dict(id=second["id"], result="second"))
+        assert transport.resolving(dict(id=first["id"], result="first"))
+
+        responses = await asyncio.gather(*calls)
+
+        assert [o["result"] for o in responses] == ["first", "second"]
+        assert transport.pending == {}
+
+    asyncio.run(main())
+
+
+def test_unanswered_call_times_out_and_is_forgotten():
+
+    async def main() -> None:
+
+        transport = WsRpcTransport(timeout=0.01)
+        websocket_client = FakeSocket()
+
+        transport.attaching(websocket_client)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await transport.calling("private/get_positions")
+
+        assert transport.pending == {}
+
+        # a late answer is not ours anymore
+        assert not transport.resolving(dict(id=websocket_client.sent[0]["id"]))
+
+    asyncio.run(main())
+
+
+def test_disconnect_fails_calls_in_flight():
+
+    async def main() -> None:
+
+        transport = WsRpcTransport()
+
+        with pytest.raises(ConnectionError):
+            await transport.calling("private/buy")
+
+        websocket_client = FakeSocket()
+
+        transport.attaching(websocket_client)
+
+        call = asyncio.create_task(transport.calling("private/buy"))
+
+        await websocket_client.sending.wait()
+
+        transport.detaching()
+
+        assert not transport.connected
+
+        with pytest.raises(ConnectionError):
+            await call
+
+    asyncio.run(main())